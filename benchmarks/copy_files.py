@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark copying the binary and copy-only files of a template.
+
+Compares ``shutil.copytree``, which generation used to copy dirs with,
+against `cookiecutter.fastcopy` with and without hard links::
+
+    $ python benchmarks/copy_files.py --files 500 --size 262144
+
+Files are created in a temporary dir, pass ``--dir`` to benchmark a given
+filesystem, e.g. a Btrfs or XFS mount supporting reflinks.
+"""
+
+from __future__ import print_function, unicode_literals
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from cookiecutter import fastcopy
+
+
+def make_tree(path, files, size):
+    """Create a dir of `files` random files of `size` bytes each."""
+    os.makedirs(path)
+    for i in range(files):
+        subdir = os.path.join(path, 'dir{}'.format(i % 10))
+        if not os.path.isdir(subdir):
+            os.mkdir(subdir)
+        with open(os.path.join(subdir, 'file{}.bin'.format(i)), 'wb') as f:
+            f.write(os.urandom(size))
+
+
+def bench(name, copy, src, work_dir, repeat):
+    """Time copying `src` with `copy`, into a new dir every time."""
+    runs = []
+
+    def run():
+        dst = os.path.join(work_dir, 'copy{}'.format(len(runs)))
+        runs.append(dst)
+        copy(src, dst)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    for dst in runs:
+        shutil.rmtree(dst)
+    print('{:<20} {:>10.1f} ms'.format(name, best * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--size', type=int, default=1024 * 1024)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        src = os.path.join(work_dir, 'template')
+        make_tree(src, args.files, args.size)
+        print('{} files of {} bytes'.format(args.files, args.size))
+        bench('shutil.copytree', shutil.copytree, src, work_dir, args.repeat)
+        bench('fastcopy', fastcopy.copy_tree, src, work_dir, args.repeat)
+        bench(
+            'fastcopy (links)',
+            lambda s, d: fastcopy.copy_tree(s, d, link=True),
+            src, work_dir, args.repeat
+        )
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main()
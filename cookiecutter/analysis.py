@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+
+"""
+Static analysis of the variables used by a project template.
+
+The name and contents of every file of a template, and its hooks, are
+parsed without being rendered to find the context variables they use.
+Variables are named after their place in the context, e.g.
+``cookiecutter.project_name``. A file which uses the ``cookiecutter`` dict
+as a whole, e.g. ``{{ cookiecutter | jsonify }}`` or
+``{{ cookiecutter.get('license') }}``, uses the plain ``cookiecutter``
+variable, i.e. every variable.
+
+Variables which are only used behind an ``is defined`` test or a
+``default`` filter, or only in a branch of an ``if`` or the body of a
+``for``, are optional: leaving them undefined is not an error, unless the
+branch is rendered.
+
+An analysis only depends on the files of the template, so it is cached per
+revision of the template when enabled with ``template_analysis`` in the
+user config.
+"""
+
+from __future__ import unicode_literals
+import hashlib
+import io
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from jinja2 import meta, nodes
+
+from .binary import get_binary_classifier
+from .config import get_cache_dir
+from .environment import StrictEnvironment
+from .hooks import HookRegistry
+from .source import get_template_source
+from .utils import make_sure_path_exists
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the results of the analysis change for the same template,
+# so that cached analyses are not reused.
+ANALYSIS_VERSION = 3
+
+# Tests and filters which make a variable optional.
+_OPTIONAL_TESTS = ('defined', 'undefined')
+_OPTIONAL_FILTERS = ('default', 'd')
+
+
+def _get_key(node):
+    """Return the key of the ``cookiecutter`` dict accessed by a node.
+
+    Jinja2 looks attributes up before items, so ``cookiecutter.get`` or
+    ``cookiecutter.items`` are methods of the dict, not keys of it.
+
+    :return: The key, None if the node does not access a constant key of
+        the ``cookiecutter`` dict.
+    """
+    if not isinstance(node, (nodes.Getattr, nodes.Getitem)) or \
+            not isinstance(node.node, nodes.Name) or \
+            node.node.name != 'cookiecutter':
+        return None
+    if isinstance(node, nodes.Getattr):
+        if hasattr(OrderedDict, node.attr):
+            return None
+        return node.attr
+    if isinstance(node.arg, nodes.Const):
+        return node.arg.value
+    return None
+
+
+def find_variables(ast, context_names=('cookiecutter',)):
+    """Return the context variables used by a parsed template.
+
+    :param ast: Template parsed with ``Environment.parse``.
+    :param context_names: Names of the top-level context variables. Other
+        undeclared names, e.g. globals of extensions, are not variables.
+    """
+    names = meta.find_undeclared_variables(ast) & set(context_names)
+    variables = set(names)
+    if 'cookiecutter' not in names:
+        return variables
+    variables.discard('cookiecutter')
+
+    keyed_uses = 0
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        key = _get_key(node)
+        if key is not None:
+            variables.add('cookiecutter.{}'.format(key))
+            keyed_uses += 1
+
+    uses = sum(
+        1 for node in ast.find_all(nodes.Name)
+        if node.name == 'cookiecutter' and node.ctx == 'load'
+    )
+    if uses > keyed_uses:
+        # Used as a whole, or with keys only known at render time
+        variables.add('cookiecutter')
+    return variables
+
+
+def _iter_keyed_uses(node, conditional=False):
+    """Yield the keys of the ``cookiecutter`` dict accessed under a node.
+
+    Every key comes with whether it is accessed in a branch of an ``if``,
+    an inline if or the body of a ``for``, i.e. not on every render.
+    """
+    key = _get_key(node)
+    if key is not None:
+        yield key, conditional
+    # Evaluated on every render of the node, unlike its other children
+    always = None
+    if isinstance(node, (nodes.If, nodes.CondExpr)):
+        always = node.test
+    elif isinstance(node, nodes.For):
+        always = node.iter
+    for child in node.iter_child_nodes():
+        child_conditional = conditional or (
+            always is not None and child is not always
+        )
+        for use in _iter_keyed_uses(child, child_conditional):
+            yield use
+
+
+def find_optional_variables(ast):
+    """Return the variables tested with ``is defined``, given a default, or
+    only used conditionally.
+    """
+    required, conditional = set(), set()
+    for key, is_conditional in _iter_keyed_uses(ast):
+        (conditional if is_conditional else required).add(key)
+    optional = set(
+        'cookiecutter.{}'.format(key) for key in conditional - required
+    )
+    for node in ast.find_all((nodes.Test, nodes.Filter)):
+        if isinstance(node, nodes.Test) and node.name in _OPTIONAL_TESTS or \
+                isinstance(node, nodes.Filter) and \
+                node.name in _OPTIONAL_FILTERS:
+            key = _get_key(node.node)
+            if key is not None:
+                optional.add('cookiecutter.{}'.format(key))
+    return optional
+
+
+class TemplateAnalyzer(object):
+    """Parse the files of a template source, following their includes.
+
+    Results are kept, so every template is parsed at most once.
+    """
+
+    def __init__(self, env, source, context_names=('cookiecutter',)):
+        """Initialize the analyzer.
+
+        :param env: Jinja2 environment the template is rendered with.
+        :param source: Template source, see `cookiecutter.source`.
+        :param context_names: Names of the top-level context variables.
+        """
+        self.env = env
+        self.source = source
+        self.context_names = context_names
+        self._analyzed = {}
+
+    def analyze_path(self, name):
+        """Return the variables used by the name of a file of the template.
+
+        :param name: Jinja2 template name of the file.
+        """
+        return find_variables(self.env.parse(name), self.context_names)
+
+    def analyze(self, name):
+        """Return the variables used by the contents of a template.
+
+        Templates it includes, imports or extends are followed, so their
+        variables and sources are part of the result.
+
+        :param name: Jinja2 template name of the file.
+        :return: Tuple of the variables, the optional variables, and the
+            names of the templates used. The latter is None if a template
+            is only known at render time.
+        """
+        if name in self._analyzed:
+            return self._analyzed[name]
+        # Guard against templates including each other
+        self._analyzed[name] = (set(), set(), {name})
+
+        with self.source.open(os.path.join(*name.split('/'))) as f:
+            ast = self.env.parse(f.read().decode('utf-8'))
+        variables = find_variables(ast, self.context_names)
+        optional = find_optional_variables(ast)
+        required = variables - optional
+        sources = {name}
+        for referenced in meta.find_referenced_templates(ast):
+            if referenced is None:
+                variables.add('cookiecutter')
+                sources = None
+                continue
+            (referenced_variables, referenced_optional,
+             referenced_sources) = self.analyze(referenced)
+            variables |= referenced_variables
+            optional |= referenced_optional
+            required |= referenced_variables - referenced_optional
+            if sources is not None and referenced_sources is not None:
+                sources |= referenced_sources
+            else:
+                sources = None
+
+        # Optional in one template but required by another is required
+        optional -= required
+        self._analyzed[name] = (variables, optional, sources)
+        return variables, optional, sources
+
+
+class TemplateAnalysis(object):
+    """Variables used by the files and hooks of a template.
+
+    Every file and hook maps to a dict of ``path`` variables, used by its
+    name, ``content`` variables, used by its contents, and ``optional``
+    variables. Binary files use no content variables.
+    """
+
+    def __init__(self, files, hooks, root=None):
+        """Initialize the analysis.
+
+        :param files: Dict of the files of the template, by template name.
+        :param hooks: Dict of the hooks of the template, by file name.
+        :param root: Dict of the ``name`` of the template dir, which becomes
+            the project dir, and of the ``path`` variables it uses.
+        """
+        self.files = files
+        self.hooks = hooks
+        self.root = root or {'name': '', 'path': []}
+
+    def to_dict(self):
+        """Return the analysis as a JSON serializable dict."""
+        return {'files': self.files, 'hooks': self.hooks, 'root': self.root}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an analysis from the result of `to_dict`."""
+        return cls(data['files'], data['hooks'], data['root'])
+
+    def get_file_variables(self, name, copy_only=False):
+        """Return the variables a file of the template is generated with.
+
+        :param copy_only: Whether the file is copied without rendering.
+        """
+        usage = self.files[name]
+        if copy_only:
+            return set(usage['path'])
+        return set(usage['path']) | set(usage['content'])
+
+    def get_index(self, is_copy_only=None):
+        """Return the files using every variable.
+
+        :param is_copy_only: Callable telling whether a file, given its path
+            relative to the template dir, is copied without rendering.
+        :return: Dict of variables to sorted lists of the template names of
+            the files which use them. Hooks are listed as ``hooks/`` and
+            their file name, the template dir by its name.
+        """
+        index = {}
+        for variable in self.root['path']:
+            index.setdefault(variable, []).append(self.root['name'])
+        for name in self.files:
+            copy_only = is_copy_only is not None and is_copy_only(
+                os.path.join(*name.split('/'))
+            )
+            for variable in self.get_file_variables(name, copy_only):
+                index.setdefault(variable, []).append(name)
+        for name, usage in self.hooks.items():
+            for variable in usage['content']:
+                index.setdefault(variable, []).append('hooks/' + name)
+        for names in index.values():
+            names.sort()
+        return index
+
+    def find_used_keys(self, cookiecutter_dict, env):
+        """Return the keys of ``cookiecutter.json`` the template uses.
+
+        Keys used by the files or hooks of the template are used, as are the
+        keys used by the default values of used keys. Private keys, which
+        start with an underscore, are always used.
+
+        :param cookiecutter_dict: The ``cookiecutter`` dict of the context.
+        :param env: Jinja2 environment to parse default values with.
+        :return: Set of keys, or None if every key is used.
+        """
+        variables = set(self.root['path'])
+        for usage in list(self.files.values()) + list(self.hooks.values()):
+            variables.update(usage.get('path', ()))
+            variables.update(usage['content'])
+
+        used = set(key for key in cookiecutter_dict if key.startswith('_'))
+        pending = variables
+        while pending:
+            variable = pending.pop()
+            if variable == 'cookiecutter':
+                return None
+            key = variable.split('.', 1)[-1]
+            if not variable.startswith('cookiecutter.') or key in used or \
+                    key not in cookiecutter_dict:
+                continue
+            used.add(key)
+            for raw in _iter_strings(cookiecutter_dict[key]):
+                pending |= find_variables(env.parse(raw))
+        return used
+
+    def find_undefined(self, context, is_copy_only=None):
+        """Return the variables the template uses but the context lacks.
+
+        Optional variables are never undefined.
+
+        :param context: Context the template is rendered with.
+        :param is_copy_only: Callable telling whether a file, given its path
+            relative to the template dir, is copied without rendering.
+        :return: Sorted list of tuples of the template name of a file and a
+            variable it uses which is undefined.
+        """
+        cookiecutter_dict = context.get('cookiecutter', {})
+        undefined = []
+        for name in sorted(self.files):
+            copy_only = is_copy_only is not None and is_copy_only(
+                os.path.join(*name.split('/'))
+            )
+            optional = set(self.files[name]['optional'])
+            for variable in sorted(
+                    self.get_file_variables(name, copy_only) - optional):
+                if variable.startswith('cookiecutter.'):
+                    defined = variable.split('.', 1)[1] in cookiecutter_dict
+                else:
+                    defined = variable in context
+                if not defined:
+                    undefined.append((name, variable))
+        return undefined
+
+
+def _iter_strings(raw):
+    """Yield the strings of a raw value of ``cookiecutter.json``."""
+    if isinstance(raw, dict):
+        for key, value in raw.items():
+            for s in _iter_strings(key):
+                yield s
+            for s in _iter_strings(value):
+                yield s
+    elif isinstance(raw, list):
+        for value in raw:
+            for s in _iter_strings(value):
+                yield s
+    elif isinstance(raw, type('')):
+        yield raw
+
+
+def _find_hooks(repo_dir):
+    """Return the paths to the hook scripts of a template, by their path
+    relative to its hooks dir.
+    """
+    registry = HookRegistry.from_repo_dir(repo_dir)
+    return dict((registry.get_name(path), path) for path in registry)
+
+
+def get_template_revision(source, repo_dir, context):
+    """Return a digest identifying a revision of a template.
+
+    It changes with the names and contents of the files of the template, its
+    hooks and the Jinja2 extensions it uses.
+    """
+    digest = hashlib.sha256()
+    digest.update('{}\0'.format(ANALYSIS_VERSION).encode('utf-8'))
+    extensions = context.get('cookiecutter', {}).get('_extensions', [])
+    digest.update(json.dumps(extensions).encode('utf-8'))
+    for root, dirs, files in source.walk():
+        dirs.sort()
+        for f in sorted(files):
+            infile = os.path.normpath(os.path.join(root, f))
+            digest.update('\0{}\0{}'.format(
+                infile.replace(os.sep, '/'), source.get_checksum(infile)
+            ).encode('utf-8'))
+    for name, path in sorted(_find_hooks(repo_dir).items()):
+        with io.open(path, 'rb') as f:
+            digest.update('\0hooks/{}\0'.format(name).encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def analyze_template(source, repo_dir, env, context_names=('cookiecutter',)):
+    """Find the variables used by every file and hook of a template.
+
+    :param source: Template source, see `cookiecutter.source`.
+    :param repo_dir: Project template input directory, holding the hooks.
+    :param env: Jinja2 environment the template is rendered with.
+    :param context_names: Names of the top-level context variables.
+    :return: `TemplateAnalysis` of the template.
+    """
+    analyzer = TemplateAnalyzer(env, source, context_names)
+    files = {}
+    for root, dirs, filenames in source.walk():
+        for f in filenames:
+            infile = os.path.normpath(os.path.join(root, f))
+            name = infile.replace(os.sep, '/')
+            content, optional = set(), set()
+            if not source.is_binary(infile):
+                content, optional, _ = analyzer.analyze(name)
+            files[name] = {
+                'path': sorted(analyzer.analyze_path(name)),
+                'content': sorted(content),
+                'optional': sorted(optional),
+            }
+
+    hooks = {}
+    for name, path in _find_hooks(repo_dir).items():
+        with io.open(path, 'rb') as f:
+            ast = env.parse(f.read().decode('utf-8'))
+        hooks[name] = {
+            'content': sorted(find_variables(ast, context_names)),
+            'optional': sorted(find_optional_variables(ast)),
+        }
+    root = {
+        'name': source.name,
+        'path': sorted(analyzer.analyze_path(source.name)),
+    }
+    return TemplateAnalysis(files, hooks, root)
+
+
+class AnalysisCache(object):
+    """Analyses of templates stored as JSON files, by template revision."""
+
+    def __init__(self, directory):
+        """Initialize the cache with the directory to store analyses in."""
+        self.directory = directory
+
+    def _get_path(self, revision):
+        return os.path.join(self.directory, '{}.json'.format(revision))
+
+    def get(self, revision):
+        """Return the cached analysis of a revision, or None."""
+        try:
+            with io.open(self._get_path(revision), encoding='utf-8') as f:
+                return TemplateAnalysis.from_dict(json.load(f))
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def set(self, revision, analysis):
+        """Store the analysis of a revision."""
+        make_sure_path_exists(self.directory)
+        path = self._get_path(revision)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with io.open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(analysis.to_dict()))
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            logger.debug('Unable to cache analysis: {}'.format(e))
+
+
+def get_template_analysis(config_dict, repo_dir, context):
+    """Return the analysis of a template if enabled in the user config.
+
+    Analyses are cached per revision of the template, see
+    `get_template_revision`.
+
+    :param config_dict: User configuration, see `get_user_config()`.
+    :param repo_dir: Project template input directory.
+    :param context: Context the template is rendered with, before prompts.
+    :return: `TemplateAnalysis`, or None if ``template_analysis`` is off.
+    """
+    if not config_dict['template_analysis']:
+        return None
+
+    source = get_template_source(repo_dir)
+    source.classifier = get_binary_classifier(context)
+    env = StrictEnvironment(context=context, keep_trailing_newline=True)
+    env.loader = source.get_loader()
+    cache = AnalysisCache(get_cache_dir(config_dict, 'analysis'))
+    revision = get_template_revision(source, repo_dir, context)
+    analysis = cache.get(revision)
+    if analysis is None:
+        logger.debug('Analyzing template revision {}'.format(revision))
+        analysis = analyze_template(source, repo_dir, env, tuple(context))
+        cache.set(revision, analysis)
+    return analysis
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generate many projects from one template.
+
+The template is resolved, its context loaded and its files compiled once,
+then every context is streamed through `generate_files` on a bounded pool of
+workers. A failing context is reported without aborting the batch.
+
+Contexts are read as projects are generated, at most `BATCH_QUEUE_FACTOR`
+times as many as there are workers ahead of the project being reported, so
+a batch of any size runs in constant memory.
+"""
+
+from __future__ import unicode_literals
+import copy
+import io
+import json
+import logging
+import os
+from collections import OrderedDict, deque, namedtuple
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+from .binary import get_binary_cache
+from .config import get_user_config
+from .environment import StrictEnvironment, get_bytecode_cache
+from .exceptions import ContextDecodingException
+from .generate import (
+    apply_overwrites_to_context, generate_context, generate_files
+)
+from .hooks import HookRegistry, get_hook_limits
+from .prompt import prompt_for_config
+from .repository import determine_repo_dir
+from .source import get_template_source
+from .utils import rmtree
+from .vcs import get_mirror_dir
+from .zipfile import get_zip_cache
+
+logger = logging.getLogger(__name__)
+
+# Contexts queued for the pool of workers of a batch, per worker.
+BATCH_QUEUE_FACTOR = 2
+
+BatchResult = namedtuple(
+    'BatchResult', ['index', 'extra_context', 'project_dir', 'error']
+)
+BatchResult.__doc__ = """Outcome of generating one project of a batch.
+
+On success `project_dir` is the generated project and `error` is None,
+otherwise `error` is the exception that stopped the generation.
+"""
+
+
+def load_contexts(contexts_file):
+    """Load the extra contexts of a batch from a JSON Lines file, lazily.
+
+    Every non-blank line must hold a JSON object of context overrides. Lines
+    are read as the contexts are consumed, and `ContextDecodingException` is
+    raised once an invalid one is reached.
+
+    :param contexts_file: Path to the JSON Lines file.
+    :return: Iterator of extra context dicts.
+    """
+    with io.open(contexts_file, encoding='utf-8') as file_handle:
+        for line_number, line in enumerate(file_handle, 1):
+            if not line.strip():
+                continue
+            try:
+                extra_context = json.loads(
+                    line, object_pairs_hook=OrderedDict
+                )
+            except ValueError as e:
+                raise ContextDecodingException(
+                    'JSON decoding error on line {} of "{}". Decoding error '
+                    'details: "{}"'.format(
+                        line_number, os.path.abspath(contexts_file), e
+                    )
+                )
+            if not isinstance(extra_context, dict):
+                raise ContextDecodingException(
+                    'Line {} of "{}" is not a JSON object'.format(
+                        line_number, os.path.abspath(contexts_file)
+                    )
+                )
+            yield extra_context
+
+
+class PreparedTemplate(object):
+    """A template resolved, loaded and compiled once, for many projects.
+
+    The repository is cloned or unzipped, ``cookiecutter.json`` is loaded
+    and a Jinja2 environment is built when the template is prepared. Every
+    project generated from it afterwards shares these, so its files are only
+    compiled for the first project. Projects are generated without prompts
+    and may be generated from several threads at once.
+    """
+
+    def __init__(self, template, config_dict, checkout=None,
+                 extra_context=None, password=None, clone_to_dir=None):
+        """Resolve the template and load its context.
+
+        :param template: A directory containing a project template directory,
+            or a URL to a git repository.
+        :param config_dict: User configuration, see `get_user_config()`.
+        :param checkout: The branch, tag or commit ID to checkout after clone.
+        :param extra_context: A dictionary of context that overrides default
+            and user configuration for every project.
+        :param password: The password to use when extracting the repository.
+        :param clone_to_dir: The directory to clone or unpack the repository
+            into, ``cookiecutters_dir`` of the user config by default.
+        """
+        self.template = template
+        self.repo_dir, self._cleanup = determine_repo_dir(
+            template=template,
+            abbreviations=config_dict['abbreviations'],
+            clone_to_dir=clone_to_dir or config_dict['cookiecutters_dir'],
+            checkout=checkout,
+            no_input=True,
+            password=password,
+            mirror_dir=get_mirror_dir(config_dict),
+            zip_cache=get_zip_cache(config_dict)
+        )
+
+        try:
+            self.context = generate_context(
+                context_file=os.path.join(self.repo_dir, 'cookiecutter.json'),
+                default_context=config_dict['default_context'],
+                extra_context=extra_context,
+            )
+
+            # A single environment, and thus a single loader, lets every
+            # project reuse the templates compiled for the first one.
+            self.env = StrictEnvironment(
+                context=self.context,
+                keep_trailing_newline=True,
+                bytecode_cache=get_bytecode_cache(config_dict),
+            )
+            self.env.loader = get_template_source(self.repo_dir).get_loader()
+            self.binary_cache = get_binary_cache(config_dict)
+            self.hook_registry = HookRegistry.from_repo_dir(self.repo_dir)
+            self.hook_limits = get_hook_limits(config_dict)
+        except Exception:
+            self.close()
+            raise
+
+    def generate(self, extra_context=None, output_dir='.',
+                 overwrite_if_exists=False, sink=None):
+        """Generate a project from the template.
+
+        :param extra_context: A dictionary of context that overrides the
+            context of the template for this project only.
+        :param output_dir: Where to output the generated project dir into.
+        :param overwrite_if_exists: Overwrite the contents of output directory
+            if it exists.
+        :param sink: Sink to write the project to, see `cookiecutter.sink`.
+        :return: Path to the generated project.
+        """
+        context = copy.deepcopy(self.context)
+        if extra_context:
+            apply_overwrites_to_context(context['cookiecutter'], extra_context)
+        context['cookiecutter'] = prompt_for_config(context, no_input=True)
+        context['cookiecutter']['_template'] = self.template
+
+        return generate_files(
+            repo_dir=self.repo_dir,
+            context=context,
+            overwrite_if_exists=overwrite_if_exists,
+            output_dir=output_dir,
+            env=self.env,
+            sink=sink,
+            binary_cache=self.binary_cache,
+            hook_registry=self.hook_registry,
+            hook_limits=self.hook_limits
+        )
+
+    def close(self):
+        """Remove the repository, if it was unpacked just for this template."""
+        if self._cleanup and os.path.isdir(self.repo_dir):
+            rmtree(self.repo_dir)
+
+
+def _generate_one(prepared_template, output_dir, overwrite_if_exists, item):
+    """Generate the project of a single batch item, capturing its error."""
+    index, extra_context = item
+    try:
+        project_dir = prepared_template.generate(
+            extra_context,
+            output_dir=output_dir,
+            overwrite_if_exists=overwrite_if_exists
+        )
+    except Exception as e:
+        logger.error('Batch item {} failed: {}'.format(index, e))
+        return BatchResult(index, extra_context, None, e)
+    logger.debug('Batch item {} generated {}'.format(index, project_dir))
+    return BatchResult(index, extra_context, project_dir, None)
+
+
+def iter_batch(template, contexts, checkout=None, extra_context=None,
+               overwrite_if_exists=False, output_dir='.', config_file=None,
+               default_config=False, password=None, workers=None):
+    """Generate one project per extra context from the same template, and
+    yield the result of each as soon as it and the ones before are done.
+
+    `contexts` are consumed as projects are generated, see
+    `BATCH_QUEUE_FACTOR`. The template is prepared on the first result and
+    removed once the last one is yielded or the iterator is closed.
+
+    :param template: A directory containing a project template directory,
+        or a URL to a git repository.
+    :param contexts: Iterable of dicts, each overriding the default context
+        for one project.
+    :param checkout: The branch, tag or commit ID to checkout after clone.
+    :param extra_context: A dictionary of context that overrides default
+        and user configuration for every project, before `contexts` do.
+    :param overwrite_if_exists: Overwrite the contents of output directory
+        if it exists.
+    :param output_dir: Where to output the generated project dirs into.
+    :param config_file: User configuration file path.
+    :param default_config: Use default values rather than a config file.
+    :param password: The password to use when extracting the repository.
+    :param workers: Number of projects to generate concurrently.
+    :return: Iterator of `BatchResult`, in the order of `contexts`.
+    """
+    config_dict = get_user_config(
+        config_file=config_file,
+        default_config=default_config,
+    )
+    prepared_template = PreparedTemplate(
+        template,
+        config_dict,
+        checkout=checkout,
+        extra_context=extra_context,
+        password=password
+    )
+
+    try:
+        generate_one = partial(
+            _generate_one, prepared_template, output_dir, overwrite_if_exists
+        )
+        items = enumerate(contexts)
+        if not workers or workers < 2:
+            for item in items:
+                yield generate_one(item)
+            return
+
+        pool = ThreadPool(workers)
+        try:
+            pending = deque()
+            for item in items:
+                pending.append(pool.apply_async(generate_one, (item,)))
+                if len(pending) >= workers * BATCH_QUEUE_FACTOR:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        prepared_template.close()
+
+
+def batch(template, contexts, **kwargs):
+    """Generate one project per extra context from the same template.
+
+    Takes the arguments of `iter_batch`.
+
+    :return: List of `BatchResult`, in the order of `contexts`.
+    """
+    return list(iter_batch(template, contexts, **kwargs))
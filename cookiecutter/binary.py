@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+"""
+Classification of the files of a template as binary or text.
+
+Binary files are copied as-is, text files are rendered. A file is classified
+by the first of these which gives an answer:
+
+1. The ``_binary_extensions`` a template lists in its context.
+2. Tables of extensions which are always binary or always text.
+3. A `BinaryCache` of the files classified in previous runs.
+4. The start of its contents: known magic numbers first, then the
+   heuristics of ``binaryornot``.
+
+Files whose contents were read to classify them keep their contents, so
+text files are not read again to render them.
+"""
+
+from __future__ import unicode_literals
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .config import get_cache_dir
+from .utils import make_sure_path_exists
+
+logger = logging.getLogger(__name__)
+
+# Bytes looked at to guess whether a file is binary.
+BINARY_CHECK_SIZE = 1024
+
+# Text files up to this size are read at once when classifying them, and
+# their contents kept for rendering.
+PRELOAD_SIZE = 1024 * 1024
+
+BINARY_EXTENSIONS = frozenset([
+    '.7z', '.a', '.avi', '.bmp', '.bz2', '.class', '.db', '.der', '.dll',
+    '.doc', '.docx', '.dylib', '.egg', '.eot', '.exe', '.flac', '.gif',
+    '.gz', '.icns', '.ico', '.jar', '.jks', '.jpeg', '.jpg', '.keystore',
+    '.mkv', '.mov', '.mp3', '.mp4', '.o', '.odp', '.ods', '.odt', '.ogg',
+    '.otf', '.p12', '.pdf', '.pfx', '.png', '.ppt', '.pptx', '.psd', '.pyc',
+    '.pyo', '.rar', '.so', '.sqlite', '.sqlite3', '.tar', '.tgz', '.tif',
+    '.tiff', '.ttf', '.war', '.wav', '.webm', '.webp', '.whl', '.woff',
+    '.woff2', '.xls', '.xlsx', '.xz', '.zip',
+])
+
+TEXT_EXTENSIONS = frozenset([
+    '.bat', '.c', '.cc', '.cfg', '.conf', '.cpp', '.css', '.csv', '.go',
+    '.h', '.hpp', '.htm', '.html', '.in', '.ini', '.j2', '.java', '.jinja',
+    '.jinja2', '.js', '.json', '.jsx', '.kt', '.less', '.lua', '.markdown',
+    '.md', '.php', '.pl', '.ps1', '.py', '.pyi', '.rb', '.rs', '.rst',
+    '.sass', '.scss', '.sh', '.sql', '.svg', '.tmpl', '.toml', '.ts',
+    '.tsv', '.tsx', '.txt', '.vue', '.xml', '.yaml', '.yml',
+])
+
+# Starts of binary file formats which may not hold any null bytes early on.
+MAGIC_NUMBERS = (
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a',
+    b'GIF89a',
+    b'\xff\xd8\xff',
+    b'%PDF-',
+    b'PK\x03\x04',
+    b'\x1f\x8b',
+    b'BZh',
+    b'\xfd7zXZ\x00',
+    b'\x28\xb5\x2f\xfd',
+    b'\x7fELF',
+    b'OTTO',
+    b'wOFF',
+    b'wOF2',
+)
+
+# Entries kept by a `BinaryCache`, the ones added longest ago are dropped.
+BINARY_CACHE_MAX_ENTRIES = 100000
+
+
+def normalize_extensions(extensions):
+    """Return a set of lowercase extensions, each starting with a dot."""
+    return frozenset(
+        ext.lower() if ext.startswith('.') else '.' + ext.lower()
+        for ext in extensions
+    )
+
+
+def classify_by_name(path, binary_extensions=frozenset()):
+    """Classify a file by its extension alone.
+
+    :param binary_extensions: Extensions to treat as binary on top of
+        `BINARY_EXTENSIONS`, see `normalize_extensions`.
+    :return: True if binary, False if text, None if unknown.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in binary_extensions or ext in BINARY_EXTENSIONS:
+        return True
+    if ext in TEXT_EXTENSIONS:
+        return False
+    return None
+
+
+def is_binary_bytes(head):
+    """Guess whether the start of a file is binary."""
+    from binaryornot.helpers import is_binary_string
+
+    if head.startswith(MAGIC_NUMBERS):
+        return True
+    return is_binary_string(head)
+
+
+class BinaryCache(object):
+    """Classifications of files, kept in a JSON file across runs.
+
+    Entries are keyed by `get_cache_key` of the source of a file, so they
+    are not used once the file changes. Changes are only written by `save`.
+    """
+
+    def __init__(self, path, max_entries=BINARY_CACHE_MAX_ENTRIES):
+        """Initialize the cache with the path to its file."""
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Process pool workers classify with a copy of the cache, which
+        # they never save.
+        return {'path': self.path, 'max_entries': self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_entries'])
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = OrderedDict()
+        try:
+            with io.open(self.path, encoding='utf-8') as f:
+                entries = json.load(f, object_pairs_hook=OrderedDict)
+            if isinstance(entries, dict):
+                self._entries = entries
+        except (IOError, OSError, ValueError):
+            pass
+        return self._entries
+
+    def get(self, key):
+        """Return whether the file of `key` is binary, or None if unknown."""
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key, binary):
+        """Record whether the file of `key` is binary."""
+        with self._lock:
+            self._load()[key] = binary
+            self._dirty = True
+
+    def save(self):
+        """Write the cache if it changed, dropping its oldest entries."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._entries
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            make_sure_path_exists(os.path.dirname(self.path))
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            try:
+                with io.open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(entries))
+                os.rename(tmp_path, self.path)
+            except (IOError, OSError) as e:
+                logger.debug('Unable to save binary cache: {}'.format(e))
+            self._dirty = False
+
+
+def get_binary_cache(config_dict):
+    """Return the binary cache enabled in the user config, or None."""
+    if not config_dict['binary_cache']:
+        return None
+    return BinaryCache(get_cache_dir(config_dict, 'binary.json'))
+
+
+class BinaryClassifier(object):
+    """Classify the files of template sources as binary or text."""
+
+    def __init__(self, binary_extensions=(), cache=None):
+        """Initialize the classifier.
+
+        :param binary_extensions: Extensions of files to always treat as
+            binary, with or without a leading dot.
+        :param cache: Optional `BinaryCache`.
+        """
+        self.binary_extensions = normalize_extensions(binary_extensions)
+        self.cache = cache
+
+    def classify(self, source, infile):
+        """Classify a file of a template source.
+
+        :return: Tuple of whether the file is binary, and of its contents as
+            bytes if it is text and they were read to classify it, else None.
+        """
+        binary = classify_by_name(infile, self.binary_extensions)
+        if binary is not None:
+            return binary, None
+
+        key = None
+        if self.cache is not None:
+            key = source.get_cache_key(infile)
+            binary = self.cache.get(key)
+            if binary is not None:
+                return binary, None
+
+        with source.open(infile) as f:
+            contents = f.read(PRELOAD_SIZE + 1)
+        binary = is_binary_bytes(contents[:BINARY_CHECK_SIZE])
+        if key is not None:
+            self.cache.set(key, binary)
+        if binary or len(contents) > PRELOAD_SIZE:
+            return binary, None
+        return binary, contents
+
+
+def get_binary_classifier(context, cache=None):
+    """Return the classifier of a template for the given context.
+
+    :param context: Context of the template, which may list
+        ``_binary_extensions``.
+    :param cache: Optional `BinaryCache`.
+    """
+    binary_extensions = context.get('cookiecutter', {}).get(
+        '_binary_extensions', ()
+    )
+    return BinaryClassifier(binary_extensions, cache)
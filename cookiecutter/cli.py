@@ -9,15 +9,17 @@ import json
 import click
 
 from cookiecutter import __version__
+from cookiecutter.config import WORKER_POOLS
 from cookiecutter.log import configure_logger
-from cookiecutter.main import cookiecutter
 from cookiecutter.exceptions import (
+    ContextDecodingException,
     OutputDirExistsException,
     InvalidModeException,
     FailedHookException,
     UndefinedVariableInTemplate,
     UnknownExtension,
     InvalidZipRepository,
+    InvalidTarRepository,
     RepositoryNotFound,
     RepositoryCloneFailed
 )
@@ -45,6 +47,61 @@ def validate_extra_context(ctx, param, value):
     return dict(s.split('=', 1) for s in value) or None
 
 
+def echo_plan(plan):
+    """Print the dirs and files of a `GenerationPlan`."""
+    click.echo(u'Would generate {}'.format(plan.project_dir))
+    for planned_path in plan.paths:
+        mode = u'----'
+        if planned_path.mode is not None:
+            mode = u'{:04o}'.format(planned_path.mode)
+        size = u'-' if planned_path.size is None else planned_path.size
+        click.echo(u'{:<8} {} {:>10} {}'.format(
+            planned_path.kind, mode, size, planned_path.path
+        ))
+
+
+def run_batch(template, batch_file, checkout, extra_context,
+              overwrite_if_exists, output_dir, config_file, default_config,
+              batch_jobs):
+    """Generate a project per context of `batch_file` and report each."""
+    from cookiecutter.batch import iter_batch, load_contexts
+
+    results = iter_batch(
+        template,
+        load_contexts(batch_file),
+        checkout=checkout,
+        extra_context=extra_context,
+        overwrite_if_exists=overwrite_if_exists,
+        output_dir=output_dir,
+        config_file=config_file,
+        default_config=default_config,
+        password=os.environ.get('COOKIECUTTER_REPO_PASSWORD'),
+        workers=batch_jobs
+    )
+    total = failures = 0
+    try:
+        for result in results:
+            total += 1
+            if result.error is None:
+                click.echo(u'Generated {}'.format(result.project_dir))
+            else:
+                failures += 1
+                click.echo(u'Error in context {}: {}'.format(
+                    result.index + 1, result.error
+                ))
+    except (ContextDecodingException,
+            UnknownExtension,
+            InvalidZipRepository,
+            InvalidTarRepository,
+            RepositoryNotFound,
+            RepositoryCloneFailed) as e:
+        click.echo(e)
+        sys.exit(1)
+    if failures:
+        click.echo(u'{} of {} projects failed'.format(failures, total))
+        sys.exit(1)
+
+
 @click.command(context_settings=dict(help_option_names=[u'-h', u'--help']))
 @click.version_option(__version__, u'-V', u'--version', message=version_msg())
 @click.argument(u'template')
@@ -71,6 +128,27 @@ def validate_extra_context(ctx, param, value):
     u'-f', u'--overwrite-if-exists', is_flag=True,
     help=u'Overwrite the contents of the output directory if it already exists'
 )
+@click.option(
+    u'--incremental', is_flag=True,
+    help=u'Regenerate into an existing output directory, only writing the '
+         u'files that changed'
+)
+@click.option(
+    u'--manifest', is_flag=True,
+    help=u'Write a manifest of the generated files into the project, '
+         u'for later use by --update'
+)
+@click.option(
+    u'--update', is_flag=True,
+    help=u'Regenerate into an existing output directory, only rendering the '
+         u'files whose template or variables changed since the manifest was '
+         u'written'
+)
+@click.option(
+    u'--dry-run', is_flag=True,
+    help=u'Print the dirs and files that would be generated, without '
+         u'writing anything or running hooks'
+)
 @click.option(
     u'-o', u'--output-dir', default='.', type=click.Path(),
     help=u'Where to output the generated project dir into'
@@ -87,10 +165,38 @@ def validate_extra_context(ctx, param, value):
     u'--debug-file', type=click.Path(), default=None,
     help=u'File to be used as a stream for DEBUG logging',
 )
+@click.option(
+    u'-j', u'--jobs', type=click.IntRange(min=1), default=None,
+    help=u'Number of files to render concurrently',
+)
+@click.option(
+    u'--worker-pool', type=click.Choice(WORKER_POOLS), default=u'thread',
+    help=u'Render files on threads or processes when using --jobs',
+)
+@click.option(
+    u'--batch', u'batch_file', type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help=u'Generate one project per line of this JSON Lines file of '
+         u'contexts',
+)
+@click.option(
+    u'--batch-jobs', type=click.IntRange(min=1), default=None,
+    help=u'Number of projects of --batch to generate concurrently',
+)
+@click.option(
+    u'--serve', u'serve_address', default=None, metavar=u'ADDRESS',
+    help=u'Keep TEMPLATE prepared and serve generation requests over HTTP '
+         u'on ADDRESS, either HOST:PORT or unix:PATH to a socket. Anyone '
+         u'able to connect can run the hooks of TEMPLATE, and of the '
+         u'server_templates of the user config, with any context, as the '
+         u'user running the server, so only bind it to localhost or a '
+         u'socket only trusted users can access',
+)
 def main(
         template, extra_context, no_input, checkout, verbose,
-        replay, overwrite_if_exists, output_dir, config_file,
-        default_config, debug_file):
+        replay, overwrite_if_exists, incremental, manifest, update, dry_run,
+        output_dir, config_file, default_config, debug_file, jobs,
+        worker_pool, batch_file, batch_jobs, serve_address):
     """Create a project from a Cookiecutter project template (TEMPLATE).
 
     Cookiecutter is free and open source software, developed and managed by
@@ -108,8 +214,55 @@ def main(
         debug_file=debug_file,
     )
 
+    # Generation pulls in Jinja2 and friends, so only import it once it is
+    # known to be needed; `--version` and `--help` stay fast.
+    from cookiecutter.main import cookiecutter
+    from cookiecutter.manifest import MANIFEST_FILENAME
+
+    if serve_address is not None:
+        from cookiecutter.server import serve
+
+        try:
+            serve(
+                serve_address,
+                template=template,
+                config_file=config_file,
+                default_config=default_config,
+                password=os.environ.get('COOKIECUTTER_REPO_PASSWORD')
+            )
+        except (ContextDecodingException,
+                UnknownExtension,
+                InvalidZipRepository,
+                InvalidTarRepository,
+                RepositoryNotFound,
+                RepositoryCloneFailed) as e:
+            click.echo(e)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if batch_jobs is not None and batch_file is None:
+        raise click.UsageError(u'--batch-jobs can only be used with --batch')
+    if batch_file is not None:
+        if replay:
+            raise click.UsageError(
+                u'--batch can not be used together with --replay'
+            )
+        if jobs is not None:
+            raise click.UsageError(
+                u'--jobs can not be used together with --batch, use '
+                u'--batch-jobs to generate projects concurrently'
+            )
+        run_batch(
+            template, batch_file, checkout, extra_context,
+            overwrite_if_exists, output_dir, config_file, default_config,
+            batch_jobs
+        )
+        return
+
     try:
-        cookiecutter(
+        result = cookiecutter(
             template, checkout, no_input,
             extra_context=extra_context,
             replay=replay,
@@ -117,13 +270,20 @@ def main(
             output_dir=output_dir,
             config_file=config_file,
             default_config=default_config,
-            password=os.environ.get('COOKIECUTTER_REPO_PASSWORD')
+            password=os.environ.get('COOKIECUTTER_REPO_PASSWORD'),
+            workers=jobs,
+            worker_pool=worker_pool,
+            incremental=incremental,
+            manifest_path=MANIFEST_FILENAME if manifest else None,
+            update=update,
+            dry_run=dry_run
         )
     except (OutputDirExistsException,
             InvalidModeException,
             FailedHookException,
             UnknownExtension,
             InvalidZipRepository,
+            InvalidTarRepository,
             RepositoryNotFound,
             RepositoryCloneFailed) as e:
         click.echo(e)
@@ -140,6 +300,9 @@ def main(
         click.echo('Context: {}'.format(context_str))
         sys.exit(1)
 
+    if dry_run:
+        echo_plan(result)
+
 
 if __name__ == "__main__":
     main()
@@ -8,8 +8,6 @@ import logging
 import os
 import io
 
-import poyo
-
 from .exceptions import ConfigDoesNotExistException
 from .exceptions import InvalidConfiguration
 
@@ -29,8 +27,24 @@ DEFAULT_CONFIG = {
     'replay_dir': os.path.expanduser('~/.cookiecutter_replay/'),
     'default_context': {},
     'abbreviations': BUILTIN_ABBREVIATIONS,
+    'cache_dir': None,
+    'bytecode_cache': False,
+    'bytecode_cache_max_size': 64 * 1024 * 1024,
+    'git_mirror_cache': False,
+    'zip_cache': False,
+    'zip_cache_max_size': 256 * 1024 * 1024,
+    'template_analysis': False,
+    'binary_cache': False,
+    'hooks_timeout': None,
+    'hooks_cpu_limit': None,
+    'hooks_memory_limit': None,
+    'server_templates': [],
+    'server_output_dir': None,
+    'server_max_templates': 16,
 }
 
+WORKER_POOLS = ('thread', 'process')
+
 
 def _expand_path(path):
     """Expand both environment variables and user home in the given path."""
@@ -58,11 +72,24 @@ def merge_configs(default, overwrite):
     return new_config
 
 
+def get_cache_dir(config_dict, name):
+    """Return the path of the named cache inside the configured cache dir.
+
+    The cache dir defaults to ``.cache`` inside of ``cookiecutters_dir``.
+    """
+    cache_dir = config_dict['cache_dir'] or os.path.join(
+        config_dict['cookiecutters_dir'], '.cache'
+    )
+    return os.path.join(cache_dir, name)
+
+
 def get_config(config_path):
     """Retrieve the config from the specified path, returning a config dict."""
     if not os.path.exists(config_path):
         raise ConfigDoesNotExistException
 
+    import poyo
+
     logger.debug('config_path is {0}'.format(config_path))
     with io.open(config_path, encoding='utf-8') as file_handle:
         try:
@@ -81,6 +108,10 @@ def get_config(config_path):
     raw_cookies_dir = config_dict['cookiecutters_dir']
     config_dict['cookiecutters_dir'] = _expand_path(raw_cookies_dir)
 
+    raw_cache_dir = config_dict['cache_dir']
+    if raw_cache_dir:
+        config_dict['cache_dir'] = _expand_path(raw_cache_dir)
+
     return config_dict
 
 
@@ -1,11 +1,33 @@
 # -*- coding: utf-8 -*-
 
-"""Jinja2 environment and extensions loading."""
+"""Jinja2 environment, extensions and bytecode cache loading."""
 
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+import jinja2
 from jinja2 import Environment, StrictUndefined
+from jinja2.bccache import BytecodeCache, Bucket
 
+from .config import get_cache_dir
 from .exceptions import UnknownExtension
 
+logger = logging.getLogger(__name__)
+
+# Environment settings that change the code Jinja2 compiles a template to.
+_COMPILE_SETTINGS = (
+    'block_start_string', 'block_end_string',
+    'variable_start_string', 'variable_end_string',
+    'comment_start_string', 'comment_end_string',
+    'line_statement_prefix', 'line_comment_prefix',
+    'trim_blocks', 'lstrip_blocks', 'newline_sequence',
+    'keep_trailing_newline', 'optimized', 'autoescape',
+)
+
 
 class ExtensionLoaderMixin(object):
     """Mixin providing sane loading of extensions specified in a given context.
@@ -69,3 +91,136 @@ class StrictEnvironment(ExtensionLoaderMixin, Environment):
             undefined=StrictUndefined,
             **kwargs
         )
+
+
+class LRUBytecodeCache(BytecodeCache):
+    """Store compiled templates on disk, evicting the least recently used.
+
+    Entries are keyed by template name, a hash of the template source and
+    the settings and extensions of the environment, so the same template is
+    only compiled once even when it is extracted to a new temporary dir on
+    every run. Once the total size of the cache exceeds `max_size` bytes the
+    entries used longest ago are removed. The total size is tracked as
+    entries are written, so the directory is only scanned once up front and
+    again whenever the bound is exceeded.
+    """
+
+    suffix = '.cache'
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        """Initialize the cache with its directory and size bound in bytes."""
+        self.directory = directory
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    def get_bucket(self, environment, name, filename, source):
+        """Return a cache bucket for the given template."""
+        checksum = self.get_source_checksum(source)
+        fingerprint = [jinja2.__version__, name, checksum]
+        fingerprint.extend(
+            repr(getattr(environment, attr, None))
+            for attr in _COMPILE_SETTINGS
+        )
+        fingerprint.extend(sorted(environment.extensions))
+        key = hashlib.sha1(
+            '\0'.join(fingerprint).encode('utf-8')
+        ).hexdigest()
+        bucket = Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def _get_cache_filename(self, bucket):
+        return os.path.join(self.directory, bucket.key + self.suffix)
+
+    def load_bytecode(self, bucket):
+        """Load the bytecode of a bucket and mark it as recently used."""
+        filename = self._get_cache_filename(bucket)
+        try:
+            with open(filename, 'rb') as f:
+                bucket.load_bytecode(f)
+            os.utime(filename, None)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def dump_bytecode(self, bucket):
+        """Atomically write the bytecode of a bucket, then enforce the bound.
+
+        A temporary file is renamed into place so concurrent generations
+        never read a partially written entry.
+        """
+        tmp_filename = None
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmp_filename = tempfile.mkstemp(
+                suffix='.tmp', dir=self.directory
+            )
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            filename = self._get_cache_filename(bucket)
+            new_size = os.path.getsize(tmp_filename)
+            try:
+                old_size = os.path.getsize(filename)
+            except OSError:
+                old_size = 0
+            os.rename(tmp_filename, filename)
+        except (IOError, OSError):
+            # Caching is an optimization, failing to cache is not an error
+            logger.debug('Unable to write bytecode cache entry', exc_info=True)
+            if tmp_filename and os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += new_size - old_size
+            if self._size <= self.max_size:
+                return
+        self.evict()
+
+    def _entries(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        """Remove the least recently used entries beyond `max_size`."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total_size -= size
+                logger.debug('Evicted bytecode cache entry {}'.format(path))
+            self._size = total_size
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            for _, _, path in self._entries():
+                os.remove(path)
+            self._size = 0
+
+
+def get_bytecode_cache(config_dict):
+    """Return the bytecode cache enabled in the user config, or None."""
+    if not config_dict['bytecode_cache']:
+        return None
+    return LRUBytecodeCache(
+        get_cache_dir(config_dict, 'bytecode'),
+        max_size=config_dict['bytecode_cache_max_size'],
+    )
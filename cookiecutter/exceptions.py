@@ -88,6 +88,13 @@ class FailedHookException(CookiecutterException):
     """
 
 
+class HookTimeoutException(FailedHookException):
+    """
+    Raised when a hook script or post-generation task is killed for running
+    longer than its timeout.
+    """
+
+
 class UndefinedVariableInTemplate(CookiecutterException):
     """Raised when a template uses a variable which is not defined in the
     context.
@@ -124,3 +131,10 @@ class InvalidZipRepository(CookiecutterException):
     Raised when the specified cookiecutter repository isn't a valid
     Zip archive.
     """
+
+
+class InvalidTarRepository(CookiecutterException):
+    """
+    Raised when the specified cookiecutter repository isn't a valid
+    tar archive.
+    """
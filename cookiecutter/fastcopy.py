@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copy files with the fastest method the platform and filesystems support.
+
+The methods are tried in this order, falling back to the next one whenever
+a method is not supported for a pair of files:
+
+1. Hard links, only if asked for. The copy then shares its contents and
+   permissions with the original, so this is only safe for originals which
+   are never modified, e.g. a template unpacked for a single run.
+2. Reflinks, with the ``FICLONE`` ioctl on Linux. Filesystems like Btrfs
+   and XFS share the blocks of both files until either is modified.
+3. ``os.copy_file_range`` on Python 3.8 or later, which copies within the
+   kernel and reflinks on some filesystems.
+4. ``os.sendfile`` on Linux, which copies within the kernel.
+5. ``shutil.copyfileobj``.
+
+A method which is not supported between two filesystems is not tried again
+between them.
+"""
+
+from __future__ import absolute_import, unicode_literals
+import errno
+import io
+import logging
+import os
+import shutil
+import sys
+
+logger = logging.getLogger(__name__)
+
+# `_IOW(0x94, 9, int)` from linux/fs.h
+FICLONE = 0x40049409
+
+# Bytes copied per call of `copy_file_range` and `sendfile`.
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Errors of methods not supported for a pair of files, which are copied
+# with the next method instead.
+_UNSUPPORTED_ERRNOS = set(
+    getattr(errno, name) for name in (
+        'EXDEV', 'EINVAL', 'EOPNOTSUPP', 'ENOTSUP', 'ENOSYS', 'ENOTTY',
+        'EBADF', 'EPERM', 'EMLINK', 'ETXTBSY',
+    ) if hasattr(errno, name)
+)
+
+# Errors of methods not supported at all, which are not tried again.
+_UNAVAILABLE_ERRNOS = set([errno.ENOSYS, errno.ENOTTY])
+
+# Names of the methods not supported at all, and of the methods not
+# supported between two devices along with their IDs.
+_disabled = set()
+
+
+class _ShortCopy(Exception):
+    """A method copied less than the size of the file.
+
+    Some filesystems report no bytes copied by `copy_file_range` and
+    `sendfile` instead of an error, the file is then copied with the next
+    method.
+    """
+
+
+def _clone(fsrc, fdst, size):
+    import fcntl
+
+    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _copy_file_range(fsrc, fdst, size):
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(
+            fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE, offset, offset
+        )
+        if not copied:
+            raise _ShortCopy(offset)
+        offset += copied
+
+
+def _sendfile(fsrc, fdst, size):
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset,
+                           COPY_CHUNK_SIZE)
+        if not sent:
+            raise _ShortCopy(offset)
+        offset += sent
+
+
+def _copyfileobj(fsrc, fdst, size):
+    shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+
+def _get_methods():
+    """Return the names and functions of the available copy methods."""
+    methods = []
+    if sys.platform.startswith('linux'):
+        methods.append(('clone', _clone))
+    if hasattr(os, 'copy_file_range'):
+        methods.append(('copy_file_range', _copy_file_range))
+    if sys.platform.startswith('linux') and hasattr(os, 'sendfile'):
+        methods.append(('sendfile', _sendfile))
+    return [m for m in methods if m[0] not in _disabled]
+
+
+def _link(src, dst):
+    """Hard link `dst` to `src`, return False if not supported."""
+    if 'link' in _disabled or not hasattr(os, 'link'):
+        return False
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        if e.errno in _UNAVAILABLE_ERRNOS:
+            _disabled.add('link')
+        return False
+    return True
+
+
+def copy_file(src, dst, link=False):
+    """Copy the contents of the file `src` to `dst`, like `shutil.copyfile`.
+
+    :param link: Hard link `dst` to `src` if possible.
+    :return: Name of the method the file was copied with, one of ``link``,
+        ``clone``, ``copy_file_range``, ``sendfile`` or ``copyfileobj``.
+    """
+    if link and _link(src, dst):
+        return 'link'
+
+    with io.open(src, 'rb') as fsrc:
+        with io.open(dst, 'wb') as fdst:
+            src_stat = os.fstat(fsrc.fileno())
+            size = src_stat.st_size
+            devices = (src_stat.st_dev, os.fstat(fdst.fileno()).st_dev)
+            for name, method in _get_methods():
+                if (name, devices) in _disabled:
+                    continue
+                try:
+                    method(fsrc, fdst, size)
+                    return name
+                except _ShortCopy as e:
+                    logger.debug(
+                        'Copied {} of {} bytes of {} with {}'.format(
+                            e.args[0], size, src, name
+                        )
+                    )
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    if e.errno in _UNAVAILABLE_ERRNOS:
+                        _disabled.add(name)
+                    else:
+                        _disabled.add((name, devices))
+                    logger.debug('Unable to copy {} with {}: {}'.format(
+                        src, name, e
+                    ))
+                # Start over after a partial copy
+                fdst.truncate(0)
+                fdst.seek(0)
+                fsrc.seek(0)
+            _copyfileobj(fsrc, fdst, size)
+            return 'copyfileobj'
+
+
+def copy_tree(src, dst, link=False):
+    """Copy the dir `src` to `dst`, like `shutil.copytree`.
+
+    `dst` must not exist. Symlinks are followed, and the permissions and
+    times of dirs and files are copied along with them, except for files
+    which are hard linked to their original.
+
+    :param link: Hard link the files of `dst` to those of `src` if possible.
+    """
+    os.makedirs(dst)
+    for root, dirs, files in os.walk(src, followlinks=True):
+        root_dst = os.path.normpath(
+            os.path.join(dst, os.path.relpath(root, src))
+        )
+        for d in dirs:
+            os.mkdir(os.path.join(root_dst, d))
+        for f in files:
+            src_file = os.path.join(root, f)
+            dst_file = os.path.join(root_dst, f)
+            if copy_file(src_file, dst_file, link) != 'link':
+                shutil.copystat(src_file, dst_file)
+
+    # Dirs last, as copying files into them changes their times
+    for root, dirs, files in os.walk(src, topdown=False, followlinks=True):
+        root_dst = os.path.normpath(
+            os.path.join(dst, os.path.relpath(root, src))
+        )
+        shutil.copystat(root, root_dst)
@@ -10,6 +10,11 @@ from .exceptions import NonTemplatedInputDirException
 logger = logging.getLogger(__name__)
 
 
+def is_template_dir_name(name):
+    """Check whether `name` is the name of a project template directory."""
+    return 'cookiecutter' in name and '{{' in name and '}}' in name
+
+
 def find_template(repo_dir):
     """Determine which child directory of `repo_dir` is the project template.
 
@@ -22,7 +27,7 @@ def find_template(repo_dir):
 
     project_template = None
     for item in repo_dir_contents:
-        if 'cookiecutter' in item and '{{' in item and '}}' in item:
+        if is_template_dir_name(item):
             project_template = item
             break
 
@@ -7,14 +7,18 @@ import fnmatch
 import io
 import json
 import logging
+import multiprocessing
 import os
-import shutil
-from collections import OrderedDict
+import re
+import stat
+from collections import Counter, OrderedDict, namedtuple
+from functools import partial
+from multiprocessing.pool import ThreadPool
 
-from binaryornot.check import is_binary
-from jinja2 import FileSystemLoader
 from jinja2.exceptions import TemplateSyntaxError, UndefinedError
 
+from .binary import get_binary_classifier
+from .config import WORKER_POOLS
 from .environment import StrictEnvironment
 from .exceptions import (
     NonTemplatedInputDirException,
@@ -23,13 +27,107 @@ from .exceptions import (
     OutputDirExistsException,
     UndefinedVariableInTemplate
 )
-from .find import find_template
-from .hooks import run_hook
-from .utils import make_sure_path_exists, work_in, rmtree
+from .hooks import HookRegistry, run_hook
+from .manifest import (
+    MANIFEST_FILENAME, ManifestBuilder, dump_manifest, hash_file,
+    load_manifest
+)
+from .sink import FileSystemSink
+from .source import FileSystemSource, get_template_source
+from .utils import make_sure_path_exists, rmtree
 
 logger = logging.getLogger(__name__)
 
 
+# Path renderer, and thereby Jinja2 environment, of a ``process`` pool
+# worker, see ``_init_worker``.
+_worker_path_renderer = None
+
+# Kinds of paths of a `GenerationPlan`.
+PLAN_DIR = 'dir'
+PLAN_RENDERED = 'rendered'
+PLAN_COPIED = 'copied'
+
+PlannedPath = namedtuple(
+    'PlannedPath', ['path', 'source', 'kind', 'size', 'mode', 'contents']
+)
+PlannedPath.__doc__ = """A dir or file `generate_files` would create.
+
+`path` is relative to the project dir and `source` to the template dir.
+`kind` is one of `PLAN_DIR`, `PLAN_RENDERED` or `PLAN_COPIED`, the latter
+for binary and copy-only files. `mode` holds the permission bits, None if
+the template does not store them. The `size` of rendered files and their
+`contents` are None unless their contents were rendered.
+"""
+
+GenerationPlan = namedtuple('GenerationPlan', ['project_dir', 'paths'])
+GenerationPlan.__doc__ = """The project `generate_files` would generate.
+
+`paths` is a list of `PlannedPath`, in the order they would be created.
+"""
+
+GenerateOptions = namedtuple('GenerateOptions', [
+    'workers', 'worker_pool', 'bytecode_cache', 'env', 'incremental',
+    'manifest_path', 'update', 'analysis', 'dry_run', 'render_contents',
+    'sink', 'binary_cache', 'link_files', 'hook_registry', 'hook_limits',
+])
+GenerateOptions.__new__.__defaults__ = (
+    None, 'thread', None, None, False, None, False, None, False, False, None,
+    None, False, None, None,
+)
+GenerateOptions.__doc__ = """How `generate_files` generates a project.
+
+Options which are not given keep their default, which is to do
+without the feature:
+
+* `workers`: Number of files to render concurrently.
+* `worker_pool`: Either ``thread`` or ``process``, the kind of pool
+  used when `workers` is greater than one.
+* `bytecode_cache`: Optional Jinja2 bytecode cache, used to skip
+  compiling templates seen in previous runs.
+* `env`: Optional Jinja2 environment to render with, e.g. to share
+  compiled templates between projects generated from the same template.
+  It is given a loader rooted at the template dir if it has none.
+* `incremental`: Regenerate into an existing output directory, only
+  writing the files whose contents or permissions changed, so that
+  the mtimes of the others are kept. Implies `overwrite_if_exists`.
+* `manifest_path`: Where to write the manifest of the project, see
+  `cookiecutter.manifest`. Relative paths are relative to the project
+  dir. No manifest is written if None.
+* `update`: Regenerate into an existing output directory, skipping
+  the files which the manifest of the previous generation shows to be
+  up to date. Implies `overwrite_if_exists`, and `manifest_path`
+  defaults to ``.cookiecutter-manifest.json``.
+* `analysis`: Optional `TemplateAnalysis` of the template, used to
+  find undefined variables before anything is written.
+* `dry_run`: Return the `GenerationPlan` of the project instead of
+  generating it, see `plan_files`. Nothing is written and no hooks are
+  run.
+* `render_contents`: Render the contents of files when planning a
+  dry run.
+* `sink`: Sink to write the project to, see `cookiecutter.sink`.
+  Defaults to a `FileSystemSink`. Hooks are not run for other sinks,
+  which support neither `incremental`, `update` nor `manifest_path`,
+  nor the ``process`` `worker_pool`. The sink is not closed.
+* `binary_cache`: Optional `BinaryCache` of the files classified as
+  binary or text in previous runs, saved once the files are generated.
+* `link_files`: Hard link binary and copy-only files to those of the
+  template where possible, instead of copying them. Only safe if the
+  files of the template are never modified, e.g. if it was unpacked
+  for this project only.
+* `hook_registry`: `HookRegistry` of the template, e.g. to share it
+  between projects generated from the same template. Found in
+  `repo_dir` by default.
+* `hook_limits`: `HookLimits` of the hooks and post-generation tasks,
+  e.g. to kill hooks which hang. The template may set stricter ones.
+"""
+
+# Outcomes of generating a file, see `generate_file`.
+FILE_CREATED = 'created'
+FILE_UPDATED = 'updated'
+FILE_UNCHANGED = 'unchanged'
+
+
 def is_copy_only_path(path, context):
     """Check whether the given `path` should only be copied and not rendered.
 
@@ -50,6 +148,112 @@ def is_copy_only_path(path, context):
     return False
 
 
+class CopyOnlyMatcher(object):
+    """Match paths against the ``_copy_without_render`` patterns of a context.
+
+    The patterns are compiled once into a single regular expression, so a
+    path is tested against all of them at once. `is_copy_only` also checks
+    the dirs a path is in, remembering the result for every dir.
+    """
+
+    def __init__(self, patterns=()):
+        """Initialize the matcher with Unix shell-style wildcards."""
+        self.patterns = list(patterns)
+        self._regex = None
+        if self.patterns:
+            self._regex = re.compile('|'.join(
+                '(?:{})'.format(fnmatch.translate(os.path.normcase(p)))
+                for p in self.patterns
+            ))
+        self._dirs = {}
+
+    @classmethod
+    def from_context(cls, context):
+        """Return the matcher of the patterns of a cookiecutter context."""
+        try:
+            patterns = context['cookiecutter']['_copy_without_render']
+        except KeyError:
+            patterns = ()
+        return cls(patterns)
+
+    def matches(self, path):
+        """Check whether `path` itself matches a pattern.
+
+        Equivalent to `is_copy_only_path` with the context of the matcher.
+        """
+        return self._regex is not None and \
+            self._regex.match(os.path.normcase(path)) is not None
+
+    def _is_in_copy_only_dir(self, path):
+        parent = os.path.dirname(path)
+        if not parent:
+            return False
+        try:
+            return self._dirs[parent]
+        except KeyError:
+            pass
+        result = self._is_in_copy_only_dir(parent) or self.matches(parent)
+        self._dirs[parent] = result
+        return result
+
+    def is_copy_only(self, path):
+        """Check whether `path` or a dir it is in matches a pattern.
+
+        Everything in a dir matching a pattern is copied along with the dir,
+        without rendering.
+        """
+        if self._regex is None:
+            return False
+        return self._is_in_copy_only_dir(path) or self.matches(path)
+
+
+class PathRenderer(object):
+    """Render file and directory names of a template for one context.
+
+    Literal paths are returned as-is, without compiling them. Every other
+    path is compiled and rendered once, and paths made of ``{{ }}``
+    expressions only are rendered one prefix at a time, so the directories
+    shared by many files are rendered once for all of them.
+    """
+
+    def __init__(self, env, context):
+        """Initialize the renderer with an environment and its context."""
+        self.env = env
+        self.context = context
+        self._rendered = {}
+
+    @staticmethod
+    def is_literal(path):
+        """Return True if `path` contains no Jinja2 syntax at all."""
+        return '{{' not in path and '{%' not in path and '{#' not in path
+
+    def render(self, path):
+        """Return `path` rendered with the context."""
+        if self.is_literal(path):
+            return path
+        try:
+            return self._rendered[path]
+        except KeyError:
+            pass
+
+        head, sep, tail = path.rpartition(os.sep)
+        # Blocks and comments may span several path components, so only
+        # paths which use nothing but complete expressions are split.
+        splittable = sep and all([
+            '{%' not in path,
+            '{#' not in path,
+            head.count('{{') == head.count('}}'),
+            tail.count('{{') == tail.count('}}'),
+        ])
+        if splittable:
+            rendered = self.render(head) + sep + self.render(tail)
+        else:
+            rendered = self.env.from_string(path).render(**self.context)
+
+        self._rendered[path] = rendered
+        return rendered
+
+
 def apply_overwrites_to_context(context, overwrite_context):
     """Modify the given context in place based on the overwrite_context."""
     for variable, overwrite in overwrite_context.items():
@@ -114,7 +318,86 @@ def generate_context(context_file='cookiecutter.json', default_context=None,
     return context
 
 
-def generate_file(project_dir, infile, context, env):
+def is_unchanged(outfile, size, open_contents):
+    """Check whether `outfile` already holds the given contents.
+
+    Sizes are compared first, so only files of the same size are hashed.
+
+    :param outfile: Path to the existing output file.
+    :param size: Size of the contents in bytes.
+    :param open_contents: Callable returning the contents as a binary file.
+    """
+    try:
+        if os.path.getsize(outfile) != size:
+            return False
+    except OSError:
+        return False
+    with io.open(outfile, 'rb') as fh:
+        outfile_hash = hash_file(fh)
+    with open_contents() as fh:
+        return hash_file(fh) == outfile_hash
+
+
+def _apply_mode(source, infile, outfile, existed, unchanged):
+    """Apply the permissions of `infile` to `outfile` if left as-is.
+
+    Files which were written already got their permissions from the sink.
+
+    :param existed: Whether `outfile` existed before it was generated.
+    :param unchanged: Whether the contents of `outfile` were left as-is.
+    :return: The outcome of generating `outfile`.
+    """
+    if unchanged:
+        if source.get_mode(infile) in (
+                None, stat.S_IMODE(os.stat(outfile).st_mode)):
+            return FILE_UNCHANGED
+        source.copy_mode(infile, outfile)
+    return FILE_UPDATED if existed else FILE_CREATED
+
+
+def _copy_file(source, infile, outfile, incremental=False, sink=None):
+    """Copy a file of the template to `outfile` along with its permissions.
+
+    :param incremental: Leave `outfile` alone if it already holds the same
+        contents. Only supported by `FileSystemSink`.
+    :param sink: Sink to write `outfile` to, see `cookiecutter.sink`.
+    :return: The outcome of generating `outfile`.
+    """
+    sink = sink or FileSystemSink()
+    existed = sink.exists(outfile)
+    unchanged = incremental and existed and is_unchanged(
+        outfile, source.get_size(infile), partial(source.open, infile)
+    )
+    if not unchanged:
+        sink.copy_file(source, infile, outfile)
+    return _apply_mode(source, infile, outfile, existed, unchanged)
+
+
+def _update_tree(source, indir, outdir):
+    """Copy a dir of the template to `outdir`, leaving unchanged files alone.
+
+    :return: List of the outcomes of generating its files.
+    """
+    outcomes = []
+    for root, dirs, files in source.walk(indir):
+        root_outdir = os.path.normpath(
+            os.path.join(outdir, os.path.relpath(root, indir))
+        )
+        make_sure_path_exists(root_outdir)
+        source.copy_mode(root, root_outdir)
+        for f in files:
+            outcomes.append(_copy_file(
+                source,
+                os.path.join(root, f),
+                os.path.join(root_outdir, f),
+                incremental=True
+            ))
+    return outcomes
+
+
+def generate_file(project_dir, infile, context, env, template_dir='.',
+                  path_renderer=None, source=None, incremental=False,
+                  sink=None):
     """Render filename of infile as name of outfile, handle infile correctly.
 
     Dealing with infile appropriately:
@@ -125,66 +408,126 @@ def generate_file(project_dir, infile, context, env):
 
     Precondition:
 
-        When calling `generate_file()`, the root template dir must be the
-        current working directory. Using `utils.work_in()` is the recommended
-        way to perform this directory change.
+        The loader of `env` must be rooted at the template dir, e.g.
+        ``source.get_loader()``. The current working directory is never
+        changed, so files can be generated from several threads.
 
     :param project_dir: Absolute path to the resulting generated project.
     :param infile: Input file to generate the file from. Relative to the root
         template dir.
     :param context: Dict for populating the cookiecutter's variables.
     :param env: Jinja2 template execution environment.
+    :param template_dir: Path to the root template dir. Defaults to the
+        current working directory.
+    :param path_renderer: `PathRenderer` shared by all files of the project.
+    :param source: Template source to read `infile` from, see
+        `cookiecutter.source`. Overrides `template_dir`.
+    :param incremental: Leave the output file alone if it already holds the
+        rendered contents and permissions, so that its mtime is kept.
+    :param sink: Sink to write the output file to, see `cookiecutter.sink`.
+        Defaults to a `FileSystemSink`.
+    :return: One of `FILE_CREATED`, `FILE_UPDATED` or `FILE_UNCHANGED`, or
+        None if the file name rendered empty.
     """
     logger.debug('Processing file {}'.format(infile))
+    if source is None:
+        source = FileSystemSource(template_dir)
+        source.classifier = get_binary_classifier(context)
+    path_renderer = path_renderer or PathRenderer(env, context)
+    sink = sink or FileSystemSink()
 
     # Render the path to the output file (not including the root project dir)
-    outfile_tmpl = env.from_string(infile)
-
-    outfile = os.path.join(project_dir, outfile_tmpl.render(**context))
-    file_name_is_empty = os.path.isdir(outfile)
+    outfile = os.path.join(project_dir, path_renderer.render(infile))
+    file_name_is_empty = sink.is_dir(outfile)
     if file_name_is_empty:
         logger.debug('The resulting file name is empty: {0}'.format(outfile))
-        return
+        return None
 
     logger.debug('Created file at {0}'.format(outfile))
 
     # Just copy over binary files. Don't render.
     logger.debug("Check {} to see if it's a binary".format(infile))
-    if is_binary(infile):
+    binary, contents = source.classify(infile)
+    if binary:
         logger.debug(
             'Copying binary {} to {} without rendering'
             ''.format(infile, outfile)
         )
-        shutil.copyfile(infile, outfile)
-    else:
-        # Force fwd slashes on Windows for get_template
-        # This is a by-design Jinja issue
-        infile_fwd_slashes = infile.replace(os.path.sep, '/')
+        return _copy_file(source, infile, outfile, incremental, sink)
 
-        # Render the file
-        try:
+    # Force fwd slashes on Windows for get_template
+    # This is a by-design Jinja issue
+    infile_fwd_slashes = infile.replace(os.path.sep, '/')
+
+    # Render the file, from the contents read to classify it if any
+    try:
+        if contents is not None and hasattr(env.loader, 'preloaded'):
+            with env.loader.preloaded(infile_fwd_slashes, contents):
+                tmpl = env.get_template(infile_fwd_slashes)
+        else:
             tmpl = env.get_template(infile_fwd_slashes)
-        except TemplateSyntaxError as exception:
-            # Disable translated so that printed exception contains verbose
-            # information about syntax error location
-            exception.translated = False
-            raise
-        rendered_file = tmpl.render(**context)
+    except TemplateSyntaxError as exception:
+        # Disable translated so that printed exception contains verbose
+        # information about syntax error location
+        exception.translated = False
+        raise
+    rendered_file = tmpl.render(**context)
+    # Write what a text mode write would, with the platform's newlines
+    contents = rendered_file.replace('\n', os.linesep).encode('utf-8')
+
+    existed = sink.exists(outfile)
+    unchanged = incremental and existed and is_unchanged(
+        outfile, len(contents), partial(io.BytesIO, contents)
+    )
 
+    if unchanged:
+        logger.debug('Contents of {} are unchanged'.format(outfile))
+    else:
         logger.debug('Writing contents to file {}'.format(outfile))
+        sink.write_file(outfile, contents, source.get_mode(infile))
 
-        with io.open(outfile, 'w', encoding='utf-8') as fh:
-            fh.write(rendered_file)
+    return _apply_mode(source, infile, outfile, existed, unchanged)
 
-    # Apply file permissions to output file
-    shutil.copymode(infile, outfile)
+
+def copy_file_without_render(project_dir, infile, context, env,
+                             template_dir='.', path_renderer=None,
+                             source=None, incremental=False, sink=None):
+    """Render filename of infile as name of outfile, copy infile over as-is.
+
+    :param project_dir: Absolute path to the resulting generated project.
+    :param infile: Input file to copy. Relative to the root template dir.
+    :param context: Dict for populating the cookiecutter's variables.
+    :param env: Jinja2 template execution environment.
+    :param template_dir: Path to the root template dir. Defaults to the
+        current working directory.
+    :param path_renderer: `PathRenderer` shared by all files of the project.
+    :param source: Template source to read `infile` from, see
+        `cookiecutter.source`. Overrides `template_dir`.
+    :param incremental: Leave the output file alone if it already holds the
+        same contents and permissions.
+    :param sink: Sink to write the output file to, see `cookiecutter.sink`.
+    :return: The outcome of generating the file, see `generate_file`.
+    """
+    source = source or FileSystemSource(template_dir)
+    path_renderer = path_renderer or PathRenderer(env, context)
+    outfile = os.path.join(project_dir, path_renderer.render(infile))
+    logger.debug(
+        'Copying file {} to {} without rendering'
+        ''.format(infile, outfile)
+    )
+    return _copy_file(source, infile, outfile, incremental, sink)
 
 
 def render_and_create_dir(dirname, context, output_dir, environment,
-                          overwrite_if_exists=False):
-    """Render name of a directory, create the directory, return its path."""
-    name_tmpl = environment.from_string(dirname)
-    rendered_dirname = name_tmpl.render(**context)
+                          overwrite_if_exists=False, path_renderer=None,
+                          sink=None):
+    """Render name of a directory, create the directory, return its path.
+
+    The directory is created through `sink`, a `FileSystemSink` by default.
+    """
+    path_renderer = path_renderer or PathRenderer(environment, context)
+    sink = sink or FileSystemSink()
+    rendered_dirname = path_renderer.render(dirname)
 
     dir_to_create = os.path.normpath(
         os.path.join(output_dir, rendered_dirname)
@@ -195,7 +538,7 @@ def render_and_create_dir(dirname, context, output_dir, environment,
         output_dir
     ))
 
-    output_dir_exists = os.path.exists(dir_to_create)
+    output_dir_exists = sink.exists(dir_to_create)
 
     if output_dir_exists:
         if overwrite_if_exists:
@@ -207,7 +550,7 @@ def render_and_create_dir(dirname, context, output_dir, environment,
             msg = 'Error: "{}" directory already exists'.format(dir_to_create)
             raise OutputDirExistsException(msg)
     else:
-        make_sure_path_exists(dir_to_create)
+        sink.make_dir(dir_to_create)
 
     return dir_to_create, not output_dir_exists
 
@@ -221,7 +564,8 @@ def ensure_dir_is_templated(dirname):
 
 
 def _run_hook_from_repo_dir(repo_dir, hook_name, project_dir, context,
-                            delete_project_on_failure):
+                            delete_project_on_failure, env=None,
+                            hook_registry=None, hook_limits=None):
     """Run hook from repo directory, clean project directory if hook fails.
 
     :param repo_dir: Project template input directory.
@@ -230,150 +574,503 @@ def _run_hook_from_repo_dir(repo_dir, hook_name, project_dir, context,
     :param context: Cookiecutter project context.
     :param delete_project_on_failure: Delete the project directory on hook
         failure?
+    :param env: Jinja2 environment to render the hook with.
+    :param hook_registry: `HookRegistry` of the template.
+    :param hook_limits: `HookLimits` of the hook.
     """
-    with work_in(repo_dir):
-        try:
-            run_hook(hook_name, project_dir, context)
-        except FailedHookException:
-            if delete_project_on_failure:
-                rmtree(project_dir)
-            logger.error(
-                "Stopping generation because {} hook "
-                "script didn't exit successfully".format(hook_name)
+    try:
+        run_hook(hook_name, project_dir, context, repo_dir=repo_dir, env=env,
+                 registry=hook_registry, limits=hook_limits)
+    except FailedHookException:
+        if delete_project_on_failure:
+            rmtree(project_dir)
+        logger.error(
+            "Stopping generation because {} hook "
+            "script didn't exit successfully".format(hook_name)
+        )
+        raise
+
+
+def _init_worker(source, context, bytecode_cache):
+    """Set up the Jinja2 environment of a ``process`` pool worker.
+
+    Environments can not be pickled, so every worker process builds its own
+    from the context.
+    """
+    global _worker_path_renderer
+    env = StrictEnvironment(
+        context=context,
+        keep_trailing_newline=True,
+        bytecode_cache=bytecode_cache,
+    )
+    env.loader = source.get_loader()
+    _worker_path_renderer = PathRenderer(env, context)
+
+
+def _generate_file_task(project_dir, source, context, path_renderer,
+                        incremental, sink, task):
+    """Generate or copy a single file, as scheduled by `generate_files()`.
+
+    Undefined variables are returned rather than raised, so that the caller
+    can clean up and wrap them no matter which worker hit them.
+
+    :param task: Tuple of the input file and whether it is copy-only.
+    :return: Tuple of the input file, the outcome of generating it and the
+        `UndefinedError`, if any.
+    """
+    infile, copy_only = task
+    path_renderer = path_renderer or _worker_path_renderer
+    env = path_renderer.env
+    if copy_only:
+        outcome = copy_file_without_render(
+            project_dir, infile, context, env,
+            path_renderer=path_renderer, source=source,
+            incremental=incremental, sink=sink
+        )
+        return infile, outcome, None
+    try:
+        outcome = generate_file(
+            project_dir, infile, context, env,
+            path_renderer=path_renderer, source=source,
+            incremental=incremental, sink=sink
+        )
+    except UndefinedError as err:
+        return infile, None, err
+    return infile, outcome, None
+
+
+def _generate_file_tasks(tasks, project_dir, source, context,
+                         path_renderer, workers, worker_pool,
+                         incremental=False, sink=None):
+    """Run file tasks serially, or concurrently on a pool of workers.
+
+    Stops at the first undefined variable. The pool is shut down before
+    returning, so no worker is left writing to `project_dir`.
+
+    :return: Tuple of a dict of the outcomes of the generated input files,
+        and of the failing input file and its `UndefinedError`, or None if
+        every task succeeded.
+    """
+    outcomes = {}
+    if not workers or workers < 2:
+        for task in tasks:
+            infile, outcome, err = _generate_file_task(
+                project_dir, source, context, path_renderer, incremental,
+                sink, task
             )
-            raise
+            if err is not None:
+                return outcomes, (infile, err)
+            outcomes[infile] = outcome
+        return outcomes, None
+
+    logger.debug('Generating files with {} {} workers'.format(
+        workers, worker_pool
+    ))
+    if worker_pool == 'process':
+        bytecode_cache = path_renderer.env.bytecode_cache
+        pool = multiprocessing.Pool(
+            workers, _init_worker, (source, context, bytecode_cache)
+        )
+        path_renderer = None
+    else:
+        pool = ThreadPool(workers)
+
+    try:
+        results = pool.imap_unordered(
+            partial(
+                _generate_file_task,
+                project_dir, source, context, path_renderer, incremental,
+                sink
+            ),
+            tasks
+        )
+        for infile, outcome, err in results:
+            if err is not None:
+                return outcomes, (infile, err)
+            outcomes[infile] = outcome
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return outcomes, None
+
+
+def _plan_file(source, infile, path, copy_only, env, context,
+               render_contents):
+    """Return the `PlannedPath` of a file of the template."""
+    mode = source.get_mode(infile)
+    if copy_only or source.is_binary(infile):
+        return PlannedPath(
+            path, infile, PLAN_COPIED, source.get_size(infile), mode, None
+        )
+    if not render_contents:
+        return PlannedPath(path, infile, PLAN_RENDERED, None, mode, None)
+
+    tmpl = env.get_template(infile.replace(os.path.sep, '/'))
+    contents = tmpl.render(**context)
+    # The size of the file written in text mode
+    size = len(contents.replace('\n', os.linesep).encode('utf-8'))
+    return PlannedPath(path, infile, PLAN_RENDERED, size, mode, contents)
+
+
+def plan_files(repo_dir, context=None, output_dir='.', env=None,
+               render_contents=False):
+    """Compute the project `generate_files` would generate, in memory.
+
+    Names of dirs and files are rendered, contents only if asked for.
+    Nothing is written and no hooks are run.
+
+    :param repo_dir: Project template input directory.
+    :param context: Dict for populating the template's variables.
+    :param output_dir: Where the project dir would be output into.
+    :param env: Optional Jinja2 environment to render with. It is given a
+        loader rooted at the template dir if it has none.
+    :param render_contents: Render the contents of files, to know the size
+        of every file and hold its contents in the plan.
+    :return: `GenerationPlan` of the project.
+    """
+    source = get_template_source(repo_dir)
+    context = context or {}
+    source.classifier = get_binary_classifier(context)
+    copy_only_matcher = CopyOnlyMatcher.from_context(context)
+
+    unrendered_dir = source.name
+    ensure_dir_is_templated(unrendered_dir)
+    if env is None:
+        env = StrictEnvironment(context=context, keep_trailing_newline=True)
+    if env.loader is None:
+        env.loader = source.get_loader()
+    path_renderer = PathRenderer(env, context)
+    try:
+        project_dir = os.path.normpath(
+            os.path.join(output_dir, path_renderer.render(unrendered_dir))
+        )
+    except UndefinedError as err:
+        msg = "Unable to create project directory '{}'".format(unrendered_dir)
+        raise UndefinedVariableInTemplate(msg, err, context)
+
+    paths = []
+    for root, dirs, files in source.walk():
+        render_dirs = []
+        for d in dirs:
+            indir = os.path.normpath(os.path.join(root, d))
+            if not copy_only_matcher.matches(indir):
+                render_dirs.append(d)
+                continue
+            # Copy-only dirs are copied as-is, see `generate_files`
+            for copy_root, _, copy_files in source.walk(indir):
+                paths.append(PlannedPath(
+                    copy_root, copy_root, PLAN_DIR, None,
+                    source.get_mode(copy_root), None
+                ))
+                for f in copy_files:
+                    infile = os.path.join(copy_root, f)
+                    paths.append(_plan_file(
+                        source, infile, infile, True, env, context, False
+                    ))
+
+        dirs[:] = render_dirs
+        for d in dirs:
+            indir = os.path.normpath(os.path.join(root, d))
+            try:
+                path = path_renderer.render(indir)
+            except UndefinedError as err:
+                msg = "Unable to create directory '{}'".format(
+                    os.path.join(os.path.basename(project_dir), indir)
+                )
+                raise UndefinedVariableInTemplate(msg, err, context)
+            paths.append(PlannedPath(path, indir, PLAN_DIR, None, None, None))
+
+        for f in files:
+            infile = os.path.normpath(os.path.join(root, f))
+            try:
+                path = path_renderer.render(infile)
+                if not os.path.basename(path):
+                    logger.debug(
+                        'The resulting file name is empty: {}'.format(path)
+                    )
+                    continue
+                paths.append(_plan_file(
+                    source, infile, os.path.normpath(path),
+                    copy_only_matcher.matches(infile), env, context,
+                    render_contents
+                ))
+            except UndefinedError as err:
+                msg = "Unable to create file '{}'".format(infile)
+                raise UndefinedVariableInTemplate(msg, err, context)
+
+    return GenerationPlan(project_dir, paths)
 
 
 def generate_files(repo_dir, context=None, output_dir='.',
-                   overwrite_if_exists=False):
+                   overwrite_if_exists=False, options=None, **kwargs):
     """Render the templates and saves them to files.
 
+    Directories are always created in walk order. Files are rendered once
+    their directories exist, on a pool of `workers` if more than one is
+    requested.
+
     :param repo_dir: Project template input directory.
     :param context: Dict for populating the template's variables.
     :param output_dir: Where to output the generated project dir into.
     :param overwrite_if_exists: Overwrite the contents of the output directory
         if it exists.
+    :param options: `GenerateOptions` of the generation, e.g. to generate
+        several projects the same way.
+    :param kwargs: Fields of `GenerateOptions` overriding those of
+        `options`.
+    :return: Path to the generated project, or its `GenerationPlan` on a
+        dry run. For sinks other than `FileSystemSink`, the path is the name
+        of the project dir in the sink.
     """
-    template_dir = find_template(repo_dir)
-    logger.debug('Generating project from {}...'.format(template_dir))
+    unknown = set(kwargs).difference(GenerateOptions._fields)
+    if unknown:
+        raise TypeError(
+            'generate_files() got unexpected keyword arguments: {}'.format(
+                ', '.join(sorted(unknown))
+            )
+        )
+    options = (options or GenerateOptions())._replace(**kwargs)
+    env = options.env
+    manifest_path = options.manifest_path
+    sink = options.sink
+    hook_registry = options.hook_registry
+
+    if options.worker_pool not in WORKER_POOLS:
+        raise ValueError(
+            'worker_pool must be one of {}'.format(', '.join(WORKER_POOLS))
+        )
+
+    if options.dry_run:
+        return plan_files(
+            repo_dir, context, output_dir, env=env,
+            render_contents=options.render_contents
+        )
+
+    sink = sink or FileSystemSink()
+    if not sink.on_disk:
+        if options.incremental or options.update or \
+                manifest_path is not None:
+            raise ValueError(
+                'incremental, update and manifest_path can only be used '
+                'when generating to the filesystem'
+            )
+        if options.workers and options.workers > 1 and \
+                options.worker_pool == 'process':
+            raise ValueError(
+                'process workers can only be used when generating to the '
+                'filesystem'
+            )
+
+    overwrite_if_exists = (
+        overwrite_if_exists or options.incremental or options.update
+    )
+    if options.update and manifest_path is None:
+        manifest_path = MANIFEST_FILENAME
+
+    source = get_template_source(repo_dir)
+    logger.debug('Generating project from {}...'.format(source.template_dir))
     context = context or {}
+    source.classifier = get_binary_classifier(context, options.binary_cache)
+    copy_only_matcher = CopyOnlyMatcher.from_context(context)
+    if isinstance(source, FileSystemSource):
+        source.link_files = options.link_files
 
-    unrendered_dir = os.path.split(template_dir)[1]
+    unrendered_dir = source.name
     ensure_dir_is_templated(unrendered_dir)
-    env = StrictEnvironment(
-        context=context,
-        keep_trailing_newline=True,
-    )
+
+    if options.analysis is not None:
+        undefined = options.analysis.find_undefined(
+            context, copy_only_matcher.is_copy_only
+        )
+        if undefined:
+            name, variable = undefined[0]
+            msg = "Unable to create file '{}'".format(
+                os.path.join(*name.split('/'))
+            )
+            err = UndefinedError("'{}' is undefined".format(variable))
+            raise UndefinedVariableInTemplate(msg, err, context)
+    if env is None:
+        env = StrictEnvironment(
+            context=context,
+            keep_trailing_newline=True,
+            bytecode_cache=options.bytecode_cache,
+        )
+    path_renderer = PathRenderer(env, context)
     try:
         project_dir, output_directory_created = render_and_create_dir(
             unrendered_dir,
             context,
             output_dir,
             env,
-            overwrite_if_exists
+            overwrite_if_exists,
+            path_renderer,
+            sink
         )
     except UndefinedError as err:
         msg = "Unable to create project directory '{}'".format(unrendered_dir)
         raise UndefinedVariableInTemplate(msg, err, context)
 
-    # We want the Jinja path and the OS paths to match. Consequently, we'll:
-    #   + CD to the template folder
-    #   + Set Jinja's path to '.'
+    # We want the Jinja path and the OS paths to match without changing the
+    # process-wide CWD, so that several projects can be generated at once.
+    # Consequently, we'll:
+    #   + Root Jinja's loader at the template folder
+    #   + Walk the template folder, using paths relative to it as template
+    #     names and leaving all access to the template files to its source
     #
     #  In order to build our files to the correct folder(s), we'll use an
     # absolute path for the target folder (project_dir)
 
-    project_dir = os.path.abspath(project_dir)
+    if sink.on_disk:
+        project_dir = os.path.abspath(project_dir)
     logger.debug('Project directory is {}'.format(project_dir))
 
     # if we created the output directory, then it's ok to remove it
     # if rendering fails
-    delete_project_on_failure = output_directory_created
-
-    _run_hook_from_repo_dir(
-        repo_dir,
-        'pre_gen_project',
-        project_dir,
-        context,
-        delete_project_on_failure
-    )
+    delete_project_on_failure = output_directory_created and sink.on_disk
+
+    # Hooks run in the project dir, which only exists on disk
+    run_hooks = sink.on_disk
+    if hook_registry is None:
+        hook_registry = HookRegistry.from_repo_dir(repo_dir)
+    has_tasks = bool(context.get('cookiecutter', {}).get('_post_gen_tasks'))
+    if not run_hooks and (hook_registry or has_tasks):
+        logger.warning(
+            'Not running the hooks of {}, the project is not generated to '
+            'the filesystem'.format(repo_dir)
+        )
 
-    with work_in(template_dir):
-        env.loader = FileSystemLoader('.')
-
-        for root, dirs, files in os.walk('.'):
-            # We must separate the two types of dirs into different lists.
-            # The reason is that we don't want ``os.walk`` to go through the
-            # unrendered directories, since they will just be copied.
-            copy_dirs = []
-            render_dirs = []
-
-            for d in dirs:
-                d_ = os.path.normpath(os.path.join(root, d))
-                # We check the full path, because that's how it can be
-                # specified in the ``_copy_without_render`` setting, but
-                # we store just the dir name
-                if is_copy_only_path(d_, context):
-                    copy_dirs.append(d)
-                else:
-                    render_dirs.append(d)
-
-            for copy_dir in copy_dirs:
-                indir = os.path.normpath(os.path.join(root, copy_dir))
-                outdir = os.path.normpath(os.path.join(project_dir, indir))
-                logger.debug(
-                    'Copying dir {} to {} without rendering'
-                    ''.format(indir, outdir)
+    if run_hooks:
+        _run_hook_from_repo_dir(
+            repo_dir,
+            'pre_gen_project',
+            project_dir,
+            context,
+            delete_project_on_failure,
+            env,
+            hook_registry,
+            options.hook_limits
+        )
+
+    if env.loader is None:
+        env.loader = source.get_loader()
+    tasks = []
+    outcomes = Counter()
+
+    manifest_builder = None
+    if manifest_path is not None:
+        manifest_file = os.path.join(project_dir, manifest_path)
+        manifest_builder = ManifestBuilder(
+            env, source, context,
+            previous=load_manifest(manifest_file) if options.update else None
+        )
+
+    for root, dirs, files in source.walk():
+        # We must separate the two types of dirs into different lists.
+        # The reason is that we don't want ``os.walk`` to go through the
+        # unrendered directories, since they will just be copied.
+        copy_dirs = []
+        render_dirs = []
+
+        for d in dirs:
+            d_ = os.path.normpath(os.path.join(root, d))
+            # We check the full path, because that's how it can be
+            # specified in the ``_copy_without_render`` setting, but
+            # we store just the dir name
+            if copy_only_matcher.matches(d_):
+                copy_dirs.append(d)
+            else:
+                render_dirs.append(d)
+
+        for copy_dir in copy_dirs:
+            indir = os.path.normpath(os.path.join(root, copy_dir))
+            outdir = os.path.normpath(os.path.join(project_dir, indir))
+            logger.debug(
+                'Copying dir {} to {} without rendering'
+                ''.format(indir, outdir)
+            )
+            if options.incremental or options.update:
+                outcomes.update(_update_tree(source, indir, outdir))
+            else:
+                sink.copy_tree(source, indir, outdir)
+            if manifest_builder is not None:
+                manifest_builder.add_tree(indir, outdir, project_dir)
+
+        # We mutate ``dirs``, because we only want to go through these dirs
+        # recursively
+        dirs[:] = render_dirs
+        for d in dirs:
+            unrendered_dir = os.path.normpath(os.path.join(root, d))
+            try:
+                render_and_create_dir(
+                    unrendered_dir,
+                    context,
+                    project_dir,
+                    env,
+                    overwrite_if_exists,
+                    path_renderer,
+                    sink
                 )
-                shutil.copytree(indir, outdir)
-
-            # We mutate ``dirs``, because we only want to go through these dirs
-            # recursively
-            dirs[:] = render_dirs
-            for d in dirs:
-                unrendered_dir = os.path.join(project_dir, root, d)
-                try:
-                    render_and_create_dir(
-                        unrendered_dir,
-                        context,
-                        output_dir,
-                        env,
-                        overwrite_if_exists
-                    )
-                except UndefinedError as err:
-                    if delete_project_on_failure:
-                        rmtree(project_dir)
-                    _dir = os.path.relpath(unrendered_dir, output_dir)
-                    msg = "Unable to create directory '{}'".format(_dir)
-                    raise UndefinedVariableInTemplate(msg, err, context)
-
-            for f in files:
-                infile = os.path.normpath(os.path.join(root, f))
-                if is_copy_only_path(infile, context):
-                    outfile_tmpl = env.from_string(infile)
-                    outfile_rendered = outfile_tmpl.render(**context)
-                    outfile = os.path.join(project_dir, outfile_rendered)
-                    logger.debug(
-                        'Copying file {} to {} without rendering'
-                        ''.format(infile, outfile)
-                    )
-                    shutil.copyfile(infile, outfile)
-                    shutil.copymode(infile, outfile)
-                    continue
-                try:
-                    generate_file(project_dir, infile, context, env)
-                except UndefinedError as err:
-                    if delete_project_on_failure:
-                        rmtree(project_dir)
-                    msg = "Unable to create file '{}'".format(infile)
-                    raise UndefinedVariableInTemplate(msg, err, context)
-
-    _run_hook_from_repo_dir(
-        repo_dir,
-        'post_gen_project',
-        project_dir,
-        context,
-        delete_project_on_failure
+            except UndefinedError as err:
+                if delete_project_on_failure:
+                    rmtree(project_dir)
+                _dir = os.path.relpath(
+                    os.path.join(project_dir, unrendered_dir), output_dir
+                )
+                msg = "Unable to create directory '{}'".format(_dir)
+                raise UndefinedVariableInTemplate(msg, err, context)
+
+        for f in files:
+            infile = os.path.normpath(os.path.join(root, f))
+            if options.update and \
+                    manifest_builder.is_current(infile, project_dir):
+                logger.debug('{} is up to date'.format(infile))
+                outcomes[FILE_UNCHANGED] += 1
+                continue
+            tasks.append((infile, copy_only_matcher.matches(infile)))
+
+    file_outcomes, failure = _generate_file_tasks(
+        tasks, project_dir, source, context, path_renderer,
+        options.workers, options.worker_pool, options.incremental, sink
     )
+    outcomes.update(file_outcomes.values())
+    if options.binary_cache is not None:
+        options.binary_cache.save()
+    if failure is not None:
+        infile, err = failure
+        if delete_project_on_failure:
+            rmtree(project_dir)
+        msg = "Unable to create file '{}'".format(infile)
+        raise UndefinedVariableInTemplate(msg, err, context)
+
+    if manifest_builder is not None:
+        for infile, copy_only in tasks:
+            if file_outcomes[infile] is not None:
+                manifest_builder.add_file(
+                    infile,
+                    os.path.join(project_dir, path_renderer.render(infile)),
+                    project_dir,
+                    rendered=not copy_only
+                )
+        dump_manifest(manifest_file, manifest_builder.build())
+
+    if options.incremental or options.update:
+        logger.info('{} files unchanged, {} updated, {} created'.format(
+            outcomes[FILE_UNCHANGED],
+            outcomes[FILE_UPDATED],
+            outcomes[FILE_CREATED]
+        ))
+
+    if run_hooks:
+        _run_hook_from_repo_dir(
+            repo_dir,
+            'post_gen_project',
+            project_dir,
+            context,
+            delete_project_on_failure,
+            env,
+            hook_registry,
+            options.hook_limits
+        )
 
     return project_dir
@@ -2,17 +2,27 @@
 
 """Functions for discovering and executing various cookiecutter hooks."""
 
+import atexit
 import errno
+import hashlib
 import io
+import json
 import logging
+import multiprocessing
 import os
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import traceback
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 
 from cookiecutter import utils
 from cookiecutter.environment import StrictEnvironment
-from .exceptions import FailedHookException
+from .exceptions import FailedHookException, HookTimeoutException
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +32,103 @@ _HOOKS = [
 ]
 EXIT_SUCCESS = 0
 
+# Ways of running Python hooks, chosen by ``_hooks_mode`` in the context.
+HOOKS_MODE_SUBPROCESS = 'subprocess'
+HOOKS_MODE_INPROCESS = 'inprocess'
+HOOKS_MODES = (HOOKS_MODE_SUBPROCESS, HOOKS_MODE_INPROCESS)
+
+# In-process hooks change the working directory and standard streams of the
+# whole process, so only one of them runs at a time, and only in
+# single-threaded programs, see `can_run_in_process`.
+_inprocess_lock = threading.Lock()
+
+# Rendered hooks kept by `RenderedHookCache`, the ones used longest ago are
+# dropped.
+RENDERED_HOOKS_MAX_ENTRIES = 256
+
+# Seconds a cancelled post-generation task has to exit before it is killed.
+CANCEL_GRACE_PERIOD = 5
+
+# A command run after the project is generated, once the tasks named in
+# `depends_on` succeeded. The command is a string run by the shell, or a
+# list of arguments.
+PostGenTask = namedtuple('PostGenTask', 'name command depends_on')
+
+HookLimits = namedtuple('HookLimits', 'timeout cpu_limit memory_limit')
+HookLimits.__new__.__defaults__ = (None, None, None)
+HookLimits.__doc__ = """Limits of the processes a hook runs.
+
+`timeout` is the wall-clock time in seconds after which the process and
+every process it started are killed. `cpu_limit` is the CPU time in seconds
+and `memory_limit` the address space in bytes each process may use, both
+enforced with resource limits, which are only supported on POSIX systems.
+None means no limit.
+"""
+
+# Run by a new interpreter to set the resource limits of a hook and execute
+# it, so that no Python code runs in the child of `subprocess.Popen` between
+# fork and exec. Its arguments are the CPU and memory limits, empty if not
+# set, followed by the command of the hook.
+_LIMITS_LAUNCHER = """
+import os, resource, sys
+for name, value in zip(('RLIMIT_CPU', 'RLIMIT_AS'), sys.argv[1:3]):
+    if value:
+        try:
+            resource.setrlimit(
+                getattr(resource, name), (int(value), int(value))
+            )
+        except (ValueError, resource.error) as e:
+            sys.stderr.write('Unable to set {}: {}\\n'.format(name, e))
+            sys.exit(126)
+try:
+    os.execvp(sys.argv[3], sys.argv[3:])
+except OSError as e:
+    sys.stderr.write('Unable to run {}: {}\\n'.format(sys.argv[3], e))
+    sys.exit(126)
+"""
+
+# Outcomes of the hook runs recorded in `metrics`.
+HOOK_SUCCEEDED = 'succeeded'
+HOOK_FAILED = 'failed'
+HOOK_TIMED_OUT = 'timed_out'
+
+
+class HookMetrics(object):
+    """Counts and durations of the hook runs of this process, by hook."""
+
+    def __init__(self):
+        """Initialize the metrics with no runs."""
+        self._hooks = {}
+        self._lock = threading.Lock()
+
+    def record(self, hook_name, outcome, seconds):
+        """Record a run of a hook, with its outcome and duration."""
+        with self._lock:
+            hook = self._hooks.setdefault(hook_name, {
+                HOOK_SUCCEEDED: 0,
+                HOOK_FAILED: 0,
+                HOOK_TIMED_OUT: 0,
+                'seconds': 0.0,
+            })
+            hook[outcome] += 1
+            hook['seconds'] += seconds
+
+    def as_dict(self):
+        """Return a copy of the metrics of every hook run so far."""
+        with self._lock:
+            return dict(
+                (hook_name, dict(hook))
+                for hook_name, hook in self._hooks.items()
+            )
+
+    def clear(self):
+        """Forget all runs."""
+        with self._lock:
+            self._hooks.clear()
+
+
+metrics = HookMetrics()
+
 
 def valid_hook(hook_file, hook_name):
     """Determine if a hook file is valid.
@@ -43,7 +150,7 @@ def valid_hook(hook_file, hook_name):
 def find_hook(hook_name, hooks_dir='hooks'):
     """Return a dict of all hook scripts provided.
 
-    Must be called with the project template as the current working directory.
+    A relative `hooks_dir` is looked up from the current working directory.
     Dict's key will be the hook/script's name, without extension, while values
     will be the absolute path to the script. Missing scripts will not be
     included in the returned dict.
@@ -59,17 +166,247 @@ def find_hook(hook_name, hooks_dir='hooks'):
         return None
 
     for hook_file in os.listdir(hooks_dir):
-        if valid_hook(hook_file, hook_name):
-            return os.path.abspath(os.path.join(hooks_dir, hook_file))
+        path = os.path.join(hooks_dir, hook_file)
+        if valid_hook(hook_file, hook_name) and os.path.isfile(path):
+            return os.path.abspath(path)
 
     return None
 
 
-def run_script(script_path, cwd='.'):
+def _valid_stage_script(hook_file):
+    """Determine if a file of a ``<hook name>.d`` dir is a hook script."""
+    return not hook_file.startswith('.') and not hook_file.endswith('~')
+
+
+class HookRegistry(object):
+    """The hook scripts of a template, found with a single scan of its hooks.
+
+    Each hook runs the script named after it, e.g. ``post_gen_project.py``,
+    followed by the scripts of the dir named after it with a ``.d`` suffix,
+    e.g. ``post_gen_project.d/10-git-init.py``, in the order of their file
+    names. A registry is built once per template and may be shared by every
+    project generated from it.
+    """
+
+    def __init__(self, hooks_dir):
+        """Find the hook scripts of the given hooks dir."""
+        self.hooks_dir = os.path.abspath(hooks_dir)
+        self._scripts = dict((hook_name, []) for hook_name in _HOOKS)
+
+        if not os.path.isdir(self.hooks_dir):
+            logger.debug('No hooks/ dir in template_dir')
+            return
+
+        hook_files = sorted(os.listdir(self.hooks_dir))
+        for hook_name in _HOOKS:
+            scripts = self._scripts[hook_name]
+            for hook_file in hook_files:
+                path = os.path.join(self.hooks_dir, hook_file)
+                if valid_hook(hook_file, hook_name) and os.path.isfile(path):
+                    scripts.append(path)
+                    break
+
+            stage_dir = os.path.join(self.hooks_dir, hook_name + '.d')
+            if hook_name + '.d' in hook_files and os.path.isdir(stage_dir):
+                for hook_file in sorted(os.listdir(stage_dir)):
+                    path = os.path.join(stage_dir, hook_file)
+                    if _valid_stage_script(hook_file) and \
+                            os.path.isfile(path):
+                        scripts.append(path)
+
+    @classmethod
+    def from_repo_dir(cls, repo_dir):
+        """Find the hook scripts of a template.
+
+        :param repo_dir: Project template input directory.
+        """
+        return cls(os.path.join(repo_dir, 'hooks'))
+
+    def get(self, hook_name):
+        """Return the absolute paths to the scripts of a hook, in order."""
+        return list(self._scripts.get(hook_name, ()))
+
+    def get_name(self, script_path):
+        """Return the path of a script relative to the hooks dir, with ``/``.
+        """
+        return os.path.relpath(script_path, self.hooks_dir).replace(
+            os.sep, '/'
+        )
+
+    def __iter__(self):
+        """Iterate over the paths to all scripts, hook after hook."""
+        for hook_name in _HOOKS:
+            for path in self._scripts[hook_name]:
+                yield path
+
+    def __bool__(self):
+        """Whether the template has any hook scripts."""
+        return any(self._scripts.values())
+
+    __nonzero__ = __bool__
+
+
+def has_hooks(repo_dir):
+    """Check whether a template has any hook scripts.
+
+    :param repo_dir: Project template input directory.
+    """
+    return bool(HookRegistry.from_repo_dir(repo_dir))
+
+
+def get_hook_limits(config_dict):
+    """Return the `HookLimits` set in the user config."""
+    return HookLimits(
+        config_dict['hooks_timeout'],
+        config_dict['hooks_cpu_limit'],
+        config_dict['hooks_memory_limit'],
+    )
+
+
+def _stricter(limit, other):
+    if limit is None:
+        return other
+    if other is None:
+        return limit
+    return min(limit, other)
+
+
+def get_template_hook_limits(context, hook_name, limits=None):
+    """Return the limits of a hook of a template.
+
+    A template may set limits in ``_hooks_limits`` of its context, for all
+    of its hooks and for single ones, e.g.
+    ``{"timeout": 60, "post_gen_project": {"timeout": 600}}``. The stricter
+    of the limits of the template and of `limits` applies.
+
+    :param context: Cookiecutter project template context.
+    :param hook_name: The hook to return the limits of.
+    :param limits: `HookLimits` set by the user.
+    """
+    raw = context.get('cookiecutter', {}).get('_hooks_limits', {})
+    template_limits = dict(
+        (field, raw.get(hook_name, {}).get(field, raw.get(field)))
+        for field in HookLimits._fields
+    )
+    limits = limits or HookLimits()
+    return HookLimits(*[
+        _stricter(getattr(limits, field), template_limits[field])
+        for field in HookLimits._fields
+    ])
+
+
+def _get_popen_kwargs(limits, new_session=False):
+    """Return the arguments of `subprocess.Popen` to apply `limits`.
+
+    With limits or `new_session`, the process starts a session of its own
+    on POSIX systems, so that it can be signalled along with every process
+    it started. No Python code runs in the child between fork and exec,
+    which would not be safe while other threads are running.
+    """
+    if not new_session and (limits is None or limits == HookLimits()):
+        return {}
+    if sys.platform.startswith('win'):
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    if sys.version_info < (3, 2):
+        return {'preexec_fn': os.setsid}
+    return {'start_new_session': True}
+
+
+def _limit_command(command, limits, shell=False):
+    """Return the command and shell flag running `command` with the
+    resource limits of `limits`.
+
+    The limits are set by `_LIMITS_LAUNCHER` before the command is
+    executed, so every process it starts inherits them.
+
+    :raises FailedHookException: If resource limits are set but not
+        supported on this platform.
+    """
+    if limits is None or limits._replace(timeout=None) == HookLimits():
+        return command, shell
+    try:
+        import resource
+        resource.RLIMIT_CPU, resource.RLIMIT_AS
+    except (ImportError, AttributeError):
+        raise FailedHookException(
+            'Hook resource limits are not supported on this platform'
+        )
+
+    if shell:
+        command = ['/bin/sh', '-c', command]
+    return [
+        sys.executable, '-c', _LIMITS_LAUNCHER,
+        '' if limits.cpu_limit is None else str(int(limits.cpu_limit)),
+        '' if limits.memory_limit is None else str(int(limits.memory_limit)),
+    ] + list(command), False
+
+
+def _popen(command, limits=None, new_session=False, shell=False, **kwargs):
+    """Start a process with `subprocess.Popen`, applying `limits` to it."""
+    kwargs.update(_get_popen_kwargs(limits, new_session))
+    command, shell = _limit_command(command, limits, shell)
+    return subprocess.Popen(command, shell=shell, **kwargs)
+
+
+def _signal_process_group(proc, kill=False):
+    """Terminate, or kill, a process started in a session of its own along
+    with every process it started.
+
+    On Windows only the process itself is signalled.
+    """
+    try:
+        if sys.platform.startswith('win'):
+            if kill:
+                proc.kill()
+            else:
+                proc.terminate()
+        else:
+            import signal
+            os.killpg(proc.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except OSError as e:
+        logger.debug('Unable to signal process {}: {}'.format(proc.pid, e))
+
+
+class _Watchdog(object):
+    """Kill a process and its process group once a timeout expires."""
+
+    def __init__(self, proc, timeout):
+        self.proc = proc
+        self.timeout = timeout
+        self.timed_out = False
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._kill)
+            self._timer.daemon = True
+
+    def _kill(self):
+        if self.proc.poll() is not None:
+            return
+        self.timed_out = True
+        logger.warning('Killing process {} after {} seconds'.format(
+            self.proc.pid, self.timeout
+        ))
+        _signal_process_group(self.proc, kill=True)
+
+    def __enter__(self):
+        if self._timer is not None:
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+def run_script(script_path, cwd='.', limits=None):
     """Execute a script from a working directory.
 
     :param script_path: Absolute path to the script to run.
     :param cwd: The directory to run the script from.
+    :param limits: Optional `HookLimits` of the script. A script running
+        longer than the timeout is killed along with every process it
+        started, raising `HookTimeoutException`. Resource limits raise
+        `FailedHookException` on platforms which do not support them.
     """
     run_thru_shell = sys.platform.startswith('win')
     if script_path.endswith('.py'):
@@ -80,12 +417,20 @@ def run_script(script_path, cwd='.'):
     utils.make_executable(script_path)
 
     try:
-        proc = subprocess.Popen(
+        proc = _popen(
             script_command,
+            limits,
             shell=run_thru_shell,
-            cwd=cwd
+            cwd=cwd,
         )
-        exit_status = proc.wait()
+        with _Watchdog(proc, limits and limits.timeout) as watchdog:
+            exit_status = proc.wait()
+        if watchdog.timed_out:
+            raise HookTimeoutException(
+                'Hook script timed out after {} seconds'.format(
+                    limits.timeout
+                )
+            )
         if exit_status != EXIT_SUCCESS:
             raise FailedHookException(
                 'Hook script failed (exit status: {})'.format(exit_status)
@@ -101,44 +446,557 @@ def run_script(script_path, cwd='.'):
         )
 
 
-def run_script_with_context(script_path, cwd, context):
+class _CapturedOutput(io.StringIO):
+    """Text stream which also accepts the byte strings of Python 2."""
+
+    def write(self, s):
+        if isinstance(s, bytes):
+            s = s.decode('utf-8', 'replace')
+        return super(_CapturedOutput, self).write(s)
+
+
+def _get_exit_status(code):
+    """Return the exit status of an interpreter exiting with `code`."""
+    if code is None:
+        return EXIT_SUCCESS
+    if isinstance(code, int):
+        return code
+    # Like the interpreter, print other codes and exit with status 1
+    sys.stderr.write('{}\n'.format(code))
+    return 1
+
+
+def run_python_in_process(source, script_path, cwd='.'):
+    """Execute the source of a Python script in this interpreter.
+
+    The script runs as ``__main__`` in a namespace of its own, from `cwd`.
+    Its standard output and error are captured and written out once it is
+    done. Modules it imports stay imported, so running scripts which import
+    the same modules is much faster than in a new interpreter each time.
+
+    :param source: Source code of the script.
+    :param script_path: Path the script is reported from in tracebacks.
+    :param cwd: The directory to run the script from.
+    """
+    namespace = {
+        '__name__': '__main__',
+        '__file__': script_path,
+        '__builtins__': __builtins__,
+    }
+    stdout = _CapturedOutput()
+    stderr = _CapturedOutput()
+
+    with _inprocess_lock:
+        saved = sys.argv, sys.stdout, sys.stderr
+        sys.argv = [script_path]
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            with utils.work_in(cwd):
+                code = compile(source, script_path, 'exec')
+                exec(code, namespace)
+            exit_status = EXIT_SUCCESS
+        except SystemExit as e:
+            exit_status = _get_exit_status(e.code)
+        except Exception as e:
+            traceback.print_exc()
+            exit_status = None
+            error = e
+        finally:
+            sys.argv, sys.stdout, sys.stderr = saved
+
+    sys.stdout.write(stdout.getvalue())
+    sys.stderr.write(stderr.getvalue())
+    if exit_status is None:
+        raise FailedHookException(
+            'Hook script failed (error: {})'.format(error)
+        )
+    if exit_status != EXIT_SUCCESS:
+        raise FailedHookException(
+            'Hook script failed (exit status: {})'.format(exit_status)
+        )
+
+
+def can_run_in_process():
+    """Return whether hooks can run in this interpreter.
+
+    Running a hook in-process changes the working directory, the standard
+    streams and `sys.argv` of the whole process, which would break every
+    other thread, such as those generating projects concurrently. So hooks
+    only run in-process in single-threaded programs, which is checked before
+    every hook: a program must not start threads while a hook runs.
+    """
+    return threading.active_count() == 1
+
+
+def get_hooks_mode(context):
+    """Return how the Python hooks of a template run.
+
+    :param context: Cookiecutter project template context, which may set
+        ``_hooks_mode`` to one of `HOOKS_MODES`.
+    """
+    hooks_mode = context.get('cookiecutter', {}).get(
+        '_hooks_mode', HOOKS_MODE_SUBPROCESS
+    )
+    if hooks_mode not in HOOKS_MODES:
+        raise FailedHookException(
+            'Unknown hooks mode {!r}, expected one of: {}'.format(
+                hooks_mode, ', '.join(HOOKS_MODES)
+            )
+        )
+    return hooks_mode
+
+
+# Value of the variables missing from a context, see `RenderedHookCache`.
+_MISSING = object()
+
+
+class RenderedHookCache(object):
+    """Hooks rendered with Jinja, along with the files they are run from.
+
+    Entries are keyed by the contents of a hook, the values of the context
+    variables it uses and the extensions of the environment, so a hook is
+    only rendered once for all the projects generated with the same values.
+
+    Rendered hooks are written to a temporary dir of the cache while they
+    run, see `rendered_file`. Runs of the same rendered hook share its file,
+    which is removed once the last of them is done, along with the dir once
+    no hook runs.
+    """
+
+    def __init__(self, max_entries=RENDERED_HOOKS_MAX_ENTRIES):
+        """Initialize the cache with its bound on entries."""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._variables = OrderedDict()
+        self._files = {}
+        self._dir = None
+        self._lock = threading.Lock()
+
+    def _get_variables(self, digest, contents, context, env):
+        """Return the context variables a hook uses, parsed once per hook."""
+        from .analysis import find_variables
+
+        with self._lock:
+            variables = self._variables.pop(digest, None)
+        if variables is None:
+            variables = sorted(
+                find_variables(env.parse(contents), tuple(context))
+            )
+        with self._lock:
+            self._variables[digest] = variables
+            while len(self._variables) > self.max_entries:
+                self._variables.popitem(last=False)
+        return variables
+
+    def get_key(self, contents, context, env):
+        """Return the cache key of a hook rendered with a context."""
+        digest = hashlib.sha256(contents.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update('\0'.join(sorted(env.extensions)).encode('utf-8'))
+        # Missing variables are left out, telling them from those set to None
+        values = {}
+        for variable in self._get_variables(
+                digest.hexdigest(), contents, context, env):
+            name, _, key = variable.partition('.')
+            value = context.get(name, _MISSING)
+            if key:
+                value = value.get(key, _MISSING) \
+                    if isinstance(value, dict) else _MISSING
+            if value is not _MISSING:
+                values[variable] = value
+        digest.update(b'\0')
+        digest.update(json.dumps(
+            values, sort_keys=True, default=repr
+        ).encode('utf-8'))
+        return digest.hexdigest()
+
+    def render(self, script_path, context, env):
+        """Return the key and the output of a hook rendered with a context."""
+        with io.open(script_path, 'r', encoding='utf-8') as f:
+            contents = f.read()
+        key = self.get_key(contents, context, env)
+        with self._lock:
+            output = self._entries.pop(key, None)
+            if output is not None:
+                self._entries[key] = output
+                return key, output
+
+        output = env.from_string(contents).render(**context)
+
+        with self._lock:
+            self._entries[key] = output
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key, output
+
+    @contextmanager
+    def rendered_file(self, script_path, context, env):
+        """Yield the path to a file holding a hook rendered with a context.
+
+        The file has the same extension as the hook, and is removed once
+        the block, and any other block using the same file, is left.
+        """
+        key, output = self.render(script_path, context, env)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                if self._dir is None:
+                    self._dir = tempfile.mkdtemp(prefix='cookiecutter-hooks-')
+                path = os.path.join(
+                    self._dir, key + os.path.splitext(script_path)[1]
+                )
+                with io.open(path, 'wb') as f:
+                    f.write(output.encode('utf-8'))
+                entry = self._files[key] = [path, 0]
+            entry[1] += 1
+
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._files[key]
+                    self._remove(entry[0])
+                    if not self._files:
+                        self._remove_dir()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.debug('Unable to remove rendered hook: {}'.format(e))
+
+    def _remove_dir(self):
+        if self._dir is not None:
+            utils.rmtree(self._dir)
+            self._dir = None
+
+    def clear(self):
+        """Drop all entries, and remove the files of hooks still running."""
+        with self._lock:
+            self._entries.clear()
+            self._variables.clear()
+            self._files.clear()
+            self._remove_dir()
+
+
+_rendered_hooks = RenderedHookCache()
+atexit.register(_rendered_hooks.clear)
+
+
+def run_script_with_context(script_path, cwd, context, env=None,
+                            limits=None):
     """Execute a script after rendering it with Jinja.
 
+    Python scripts run in this interpreter if the context sets
+    ``_hooks_mode`` to ``inprocess``, see `run_python_in_process`, unless
+    other threads are running, see `can_run_in_process`, or `limits` are
+    set, in which case they run in a new interpreter like other scripts.
+    Rendered scripts are cached, see `RenderedHookCache`.
+
     :param script_path: Absolute path to the script to run.
     :param cwd: The directory to run the script from.
     :param context: Cookiecutter project template context.
+    :param env: Jinja2 environment to render the script with, by default a
+        new one for the context.
+    :param limits: Optional `HookLimits` of the script.
     """
     _, extension = os.path.splitext(script_path)
 
-    contents = io.open(script_path, 'r', encoding='utf-8').read()
-
-    with tempfile.NamedTemporaryFile(
-        delete=False,
-        mode='wb',
-        suffix=extension
-    ) as temp:
+    if env is None:
         env = StrictEnvironment(
             context=context,
             keep_trailing_newline=True,
         )
-        template = env.from_string(contents)
-        output = template.render(**context)
-        temp.write(output.encode('utf-8'))
 
-    run_script(temp.name, cwd)
+    if extension == '.py' and \
+            get_hooks_mode(context) == HOOKS_MODE_INPROCESS:
+        if limits is not None and limits != HookLimits():
+            logger.debug('Running hook {} in a new interpreter to apply its '
+                         'limits'.format(script_path))
+        elif not can_run_in_process():
+            logger.warning('Running hook {} in a new interpreter, since '
+                           'in-process hooks are only run by single-threaded '
+                           'programs'.format(script_path))
+        else:
+            _, output = _rendered_hooks.render(script_path, context, env)
+            run_python_in_process(output, script_path, cwd)
+            return
+
+    with _rendered_hooks.rendered_file(
+            script_path, context, env) as rendered_path:
+        run_script(rendered_path, cwd, limits)
+
 
+def get_post_gen_tasks(context, env):
+    """Return the post-generation tasks of a template, in the given order.
 
-def run_hook(hook_name, project_dir, context):
+    Tasks are listed in ``_post_gen_tasks`` of the context, each a dict with
+    a ``name``, a ``command`` and optionally the names of the tasks it
+    ``depends_on``. Commands are rendered with the context.
+
+    :param context: Cookiecutter project template context.
+    :param env: Jinja2 environment to render the commands with.
+    :return: List of `PostGenTask`.
+    """
+    raw_tasks = context.get('cookiecutter', {}).get('_post_gen_tasks', [])
+    if not isinstance(raw_tasks, list):
+        raise FailedHookException('_post_gen_tasks must be a list of tasks')
+
+    tasks = OrderedDict()
+    for raw in raw_tasks:
+        if not isinstance(raw, dict) or 'name' not in raw or \
+                'command' not in raw:
+            raise FailedHookException(
+                'Post-generation task {!r} needs a name and a '
+                'command'.format(raw)
+            )
+        name = raw['name']
+        if name in tasks:
+            raise FailedHookException(
+                'Post-generation task {} is listed twice'.format(name)
+            )
+        command = raw['command']
+        if isinstance(command, list):
+            command = [env.from_string(arg).render(**context)
+                       for arg in command]
+        else:
+            command = env.from_string(command).render(**context)
+        depends_on = raw.get('depends_on', [])
+        if not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        tasks[name] = PostGenTask(name, command, tuple(depends_on))
+
+    for task in tasks.values():
+        for dependency in task.depends_on:
+            if dependency not in tasks:
+                raise FailedHookException(
+                    'Post-generation task {} depends on unknown task '
+                    '{}'.format(task.name, dependency)
+                )
+
+    # Tasks whose dependencies form a cycle could never run
+    done = set()
+    while len(done) < len(tasks):
+        ready = [
+            name for name, task in tasks.items()
+            if name not in done and done.issuperset(task.depends_on)
+        ]
+        if not ready:
+            raise FailedHookException(
+                'Post-generation tasks {} depend on each other'.format(
+                    ', '.join(name for name in tasks if name not in done)
+                )
+            )
+        done.update(ready)
+    return list(tasks.values())
+
+
+class _PostGenTaskRunner(object):
+    """Run the command of a `PostGenTask`, streaming its output."""
+
+    def __init__(self, task, cwd, output_lock, limits=None):
+        self.task = task
+        self.cwd = cwd
+        self.output_lock = output_lock
+        self.limits = limits or HookLimits()
+        self.timed_out = False
+        self._proc = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def _write(self, line):
+        line = line.decode('utf-8', 'replace').rstrip('\r\n')
+        with self.output_lock:
+            sys.stdout.write('[{}] {}\n'.format(self.task.name, line))
+            sys.stdout.flush()
+
+    def run(self):
+        """Run the command, return an error message if it failed, or None.
+        """
+        with self._lock:
+            if self._cancelled:
+                return 'cancelled'
+            try:
+                self._proc = _popen(
+                    self.task.command,
+                    self.limits,
+                    new_session=True,
+                    shell=not isinstance(self.task.command, list),
+                    cwd=self.cwd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+            except (OSError, FailedHookException) as e:
+                return 'error: {}'.format(e)
+
+        with _Watchdog(self._proc, self.limits.timeout) as watchdog:
+            for line in iter(self._proc.stdout.readline, b''):
+                self._write(line)
+            self._proc.stdout.close()
+            exit_status = self._proc.wait()
+        if watchdog.timed_out:
+            self.timed_out = True
+            return 'timed out after {} seconds'.format(self.limits.timeout)
+        if exit_status != EXIT_SUCCESS:
+            return 'exit status: {}'.format(exit_status)
+        return None
+
+    def cancel(self):
+        """Terminate the command if it is running, or keep it from running.
+
+        The command and every process it started are terminated, and killed
+        if they are still running after `CANCEL_GRACE_PERIOD` seconds.
+        """
+        with self._lock:
+            self._cancelled = True
+            if self._proc is None or self._proc.poll() is not None:
+                return
+            _signal_process_group(self._proc)
+            timer = threading.Timer(
+                CANCEL_GRACE_PERIOD, _signal_process_group,
+                (self._proc,), {'kill': True}
+            )
+            timer.daemon = True
+            timer.start()
+
+
+def run_post_gen_tasks(tasks, cwd, workers=None, limits=None):
+    """Run post-generation tasks concurrently, each once its dependencies
+    succeeded.
+
+    The output of every task is written out as it comes, each line prefixed
+    with the name of the task. The first task to fail stops the others.
+
+    :param tasks: List of `PostGenTask`, see `get_post_gen_tasks`.
+    :param cwd: The directory to run the tasks from.
+    :param workers: Number of tasks run at once, by default one per task up
+        to the number of CPUs.
+    :param limits: Optional `HookLimits` of every task. A task running
+        longer than the timeout fails with `HookTimeoutException`.
+    """
+    if not tasks:
+        return
+    if workers is None:
+        workers = min(len(tasks), multiprocessing.cpu_count())
+
+    pending = OrderedDict((task.name, task) for task in tasks)
+    running = {}
+    succeeded = set()
+    finished = []
+    finished_cond = threading.Condition()
+    output_lock = threading.Lock()
+    failure = None
+
+    def run_task(runner):
+        error = 'error: unexpected failure'
+        start = time.time()
+        try:
+            error = runner.run()
+        finally:
+            if error is None:
+                outcome = HOOK_SUCCEEDED
+            elif runner.timed_out:
+                outcome = HOOK_TIMED_OUT
+            else:
+                outcome = HOOK_FAILED
+            metrics.record('post_gen_tasks', outcome, time.time() - start)
+            with finished_cond:
+                finished.append((runner, error))
+                finished_cond.notify()
+
+    pool = ThreadPool(workers)
+    try:
+        while pending or running:
+            for name, task in list(pending.items()):
+                if succeeded.issuperset(task.depends_on):
+                    del pending[name]
+                    logger.debug('Running post-generation task {}'.format(
+                        name
+                    ))
+                    running[name] = _PostGenTaskRunner(
+                        task, cwd, output_lock, limits
+                    )
+                    pool.apply_async(run_task, (running[name],))
+
+            with finished_cond:
+                while not finished:
+                    finished_cond.wait()
+                runner, error = finished.pop(0)
+            name = runner.task.name
+            del running[name]
+
+            if error is None:
+                succeeded.add(name)
+            elif failure is None:
+                failure = runner, error
+                pending.clear()
+                for runner in running.values():
+                    runner.cancel()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if failure is not None:
+        runner, error = failure
+        exception_class = FailedHookException
+        if runner.timed_out:
+            exception_class = HookTimeoutException
+        raise exception_class('Post-generation task {} failed ({})'.format(
+            runner.task.name, error
+        ))
+
+
+def run_hook(hook_name, project_dir, context, repo_dir='.', env=None,
+             registry=None, limits=None):
     """
     Try to find and execute a hook from the specified project directory.
 
+    The scripts of the hook run one after the other, and the first one to
+    fail stops the hook. The ``post_gen_project`` hook then runs the
+    post-generation tasks of the template, see `run_post_gen_tasks`.
+
     :param hook_name: The hook to execute.
     :param project_dir: The directory to execute the script from.
     :param context: Cookiecutter project context.
+    :param repo_dir: Project template input directory, which contains the
+        ``hooks`` dir. Defaults to the current working directory.
+    :param env: Jinja2 environment to render the hook with.
+    :param registry: `HookRegistry` of the template, found in `repo_dir` by
+        default.
+    :param limits: `HookLimits` set by the user, see
+        `get_template_hook_limits`. Every run is recorded in `metrics`.
     """
-    script = find_hook(hook_name)
-    if script is None:
+    if registry is None:
+        registry = HookRegistry.from_repo_dir(repo_dir)
+    if env is None:
+        env = StrictEnvironment(
+            context=context,
+            keep_trailing_newline=True,
+        )
+    limits = get_template_hook_limits(context, hook_name, limits)
+    scripts = registry.get(hook_name)
+    if not scripts:
         logger.debug('No {} hook found'.format(hook_name))
-        return
-    logger.debug('Running hook {}'.format(hook_name))
-    run_script_with_context(script, project_dir, context)
+    for script in scripts:
+        logger.debug('Running hook {} script {}'.format(
+            hook_name, registry.get_name(script)
+        ))
+        start = time.time()
+        outcome = HOOK_FAILED
+        try:
+            run_script_with_context(script, project_dir, context, env, limits)
+            outcome = HOOK_SUCCEEDED
+        except HookTimeoutException:
+            outcome = HOOK_TIMED_OUT
+            raise
+        finally:
+            metrics.record(hook_name, outcome, time.time() - start)
+
+    if hook_name == 'post_gen_project':
+        run_post_gen_tasks(
+            get_post_gen_tasks(context, env), project_dir, limits=limits
+        )
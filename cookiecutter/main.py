@@ -11,13 +11,19 @@ from __future__ import unicode_literals
 import logging
 import os
 
+from .analysis import get_template_analysis
+from .binary import get_binary_cache
 from .config import get_user_config
+from .environment import get_bytecode_cache
 from .generate import generate_context, generate_files
 from .exceptions import InvalidModeException
+from .hooks import get_hook_limits
 from .prompt import prompt_for_config
 from .replay import dump, load
 from .repository import determine_repo_dir
 from .utils import rmtree
+from .vcs import get_mirror_dir
+from .zipfile import get_zip_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +31,9 @@ logger = logging.getLogger(__name__)
 def cookiecutter(
         template, checkout=None, no_input=False, extra_context=None,
         replay=False, overwrite_if_exists=False, output_dir='.',
-        config_file=None, default_config=False, password=None):
+        config_file=None, default_config=False, password=None, workers=None,
+        worker_pool='thread', incremental=False, manifest_path=None,
+        update=False, dry_run=False):
     """
     Run Cookiecutter just as if using it from the command line.
 
@@ -41,6 +49,19 @@ def cookiecutter(
     :param config_file: User configuration file path.
     :param default_config: Use default values rather than a config file.
     :param password: The password to use when extracting the repository.
+    :param workers: Number of files to render concurrently.
+    :param worker_pool: Either ``thread`` or ``process``, the kind of pool
+        used when `workers` is greater than one.
+    :param incremental: Regenerate into an existing output directory, only
+        writing the files that changed.
+    :param manifest_path: Where to write the manifest of the project,
+        relative to the project dir. No manifest is written if None.
+    :param update: Regenerate into an existing output directory, only
+        rendering the files whose template or variables changed since the
+        previous generation, according to its manifest.
+    :param dry_run: Return the `GenerationPlan` of the project instead of
+        generating it. Neither the project nor the replay file are written
+        and no hooks are run.
     """
     if replay and ((no_input is not False) or (extra_context is not None)):
         err_msg = (
@@ -60,13 +81,16 @@ def cookiecutter(
         clone_to_dir=config_dict['cookiecutters_dir'],
         checkout=checkout,
         no_input=no_input,
-        password=password
+        password=password,
+        mirror_dir=get_mirror_dir(config_dict),
+        zip_cache=get_zip_cache(config_dict)
     )
 
     template_name = os.path.basename(os.path.abspath(repo_dir))
 
     if replay:
         context = load(config_dict['replay_dir'], template_name)
+        analysis = get_template_analysis(config_dict, repo_dir, context)
     else:
         context_file = os.path.join(repo_dir, 'cookiecutter.json')
         logger.debug('context_file is {}'.format(context_file))
@@ -76,22 +100,38 @@ def cookiecutter(
             default_context=config_dict['default_context'],
             extra_context=extra_context,
         )
+        analysis = get_template_analysis(config_dict, repo_dir, context)
 
         # prompt the user to manually configure at the command line.
         # except when 'no-input' flag is set
-        context['cookiecutter'] = prompt_for_config(context, no_input)
+        context['cookiecutter'] = prompt_for_config(
+            context, no_input, analysis=analysis
+        )
 
         # include template dir or url in the context dict
         context['cookiecutter']['_template'] = template
 
-        dump(config_dict['replay_dir'], template_name, context)
+        if not dry_run:
+            dump(config_dict['replay_dir'], template_name, context)
 
     # Create project from local context and project template.
     result = generate_files(
         repo_dir=repo_dir,
         context=context,
         overwrite_if_exists=overwrite_if_exists,
-        output_dir=output_dir
+        output_dir=output_dir,
+        workers=workers,
+        worker_pool=worker_pool,
+        bytecode_cache=get_bytecode_cache(config_dict),
+        binary_cache=get_binary_cache(config_dict),
+        hook_limits=get_hook_limits(config_dict),
+        # A template unpacked just for this run is never modified
+        link_files=cleanup,
+        incremental=incremental,
+        manifest_path=manifest_path,
+        update=update,
+        analysis=analysis,
+        dry_run=dry_run
     )
 
     # Cleanup (if required)
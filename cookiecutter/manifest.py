@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+"""
+Manifests of generated projects.
+
+A manifest records, for every file of a generated project, the template it
+was generated from, the context variables it used and a hash of its
+contents. Generating a project again with ``update=True`` reads the manifest
+of the previous generation and skips every file whose template and
+variables did not change since, and whose contents still match their hash.
+
+Variables are found by `cookiecutter.analysis`. A file which uses the
+``cookiecutter`` dict as a whole depends on every variable.
+"""
+
+from __future__ import unicode_literals
+import hashlib
+import io
+import json
+import logging
+import os
+
+from .analysis import TemplateAnalyzer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = '.cookiecutter-manifest.json'
+
+# Size of the chunks files are hashed in.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_handle):
+    """Return the SHA-256 hex digest of the rest of a binary file."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_handle.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def changed_variables(old_context, new_context):
+    """Return the variables whose values differ between two contexts.
+
+    :return: Set of variable names, or None if a private variable such as
+        ``_extensions`` or ``_copy_without_render`` changed, which may
+        change every file.
+    """
+    changed = set()
+    for name in set(old_context) | set(new_context):
+        old_value = old_context.get(name)
+        new_value = new_context.get(name)
+        if name != 'cookiecutter':
+            if old_value != new_value:
+                changed.add(name)
+            continue
+        old_value, new_value = old_value or {}, new_value or {}
+        for key in set(old_value) | set(new_value):
+            if old_value.get(key) != new_value.get(key):
+                if key.startswith('_') and key != '_template':
+                    return None
+                changed.add('cookiecutter.{}'.format(key))
+                changed.add('cookiecutter')
+    return changed
+
+
+def load_manifest(manifest_file):
+    """Load a manifest, or return None if there is no valid one."""
+    try:
+        with io.open(manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (IOError, OSError):
+        return None
+    except ValueError as e:
+        logger.warning('Ignoring invalid manifest {}: {}'.format(
+            manifest_file, e
+        ))
+        return None
+    if not isinstance(manifest, dict) or \
+            not isinstance(manifest.get('files'), dict):
+        logger.warning('Ignoring invalid manifest {}'.format(manifest_file))
+        return None
+    return manifest
+
+
+def dump_manifest(manifest_file, manifest):
+    """Write a manifest as JSON."""
+    with io.open(manifest_file, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _template_name(path):
+    """Return the Jinja2 template name of a path relative to the template."""
+    return path.replace(os.sep, '/')
+
+
+class ManifestBuilder(object):
+    """Collect the manifest of a project while it is generated.
+
+    Templates are only parsed for files which are generated, the entries of
+    files skipped by an update are carried over from the previous manifest.
+    """
+
+    def __init__(self, env, source, context, previous=None):
+        """Initialize the builder.
+
+        :param env: Jinja2 environment the project is rendered with.
+        :param source: Template source of the project, see
+            `cookiecutter.source`.
+        :param context: Context the project is rendered with.
+        :param previous: Manifest of the previous generation, if updating.
+        """
+        self.env = env
+        self.source = source
+        self.context = context
+        self.files = {}
+        self._source_hashes = {}
+        self._analyzer = TemplateAnalyzer(env, source, context)
+
+        self._previous_entries = {}
+        self._changed = None
+        if previous is not None:
+            self._previous_source_hashes = previous.get('sources', {})
+            self._changed = changed_variables(
+                previous.get('context', {}), context
+            )
+            for output, entry in previous['files'].items():
+                self._previous_entries[entry.get('source')] = (output, entry)
+
+    def _source_hash(self, name):
+        if name not in self._source_hashes:
+            with self.source.open(os.path.join(*name.split('/'))) as f:
+                self._source_hashes[name] = hash_file(f)
+        return self._source_hashes[name]
+
+    def is_current(self, infile, project_dir):
+        """Check whether a file can be skipped by an update.
+
+        It can if the previous manifest has an entry for it, neither its
+        sources nor its variables changed, and its output still exists with
+        the contents it was generated with. The entry is then carried over.
+        """
+        name = _template_name(infile)
+        if self._changed is None or name not in self._previous_entries:
+            return False
+        output, entry = self._previous_entries[name]
+        sources = entry.get('sources')
+        if sources is None or not set(entry['variables']).isdisjoint(
+                self._changed):
+            return False
+        for source_name in sources:
+            previous_hash = self._previous_source_hashes.get(source_name)
+            try:
+                if self._source_hash(source_name) != previous_hash:
+                    return False
+            except (IOError, OSError, KeyError):
+                # The source was removed from the template
+                return False
+        try:
+            with io.open(os.path.join(project_dir, output), 'rb') as f:
+                if hash_file(f) != entry.get('hash'):
+                    return False
+        except (IOError, OSError):
+            # The output was removed from the project
+            return False
+
+        self.files[output] = entry
+        return True
+
+    def add_file(self, infile, outfile, project_dir, rendered=True):
+        """Record a generated file.
+
+        :param infile: Input file, relative to the template dir.
+        :param outfile: Path to the generated file.
+        :param project_dir: Absolute path to the generated project.
+        :param rendered: Whether the contents of the file were rendered,
+            unless it is binary. The name of a file is always rendered.
+        """
+        name = _template_name(infile)
+        variables = self._analyzer.analyze_path(name)
+        sources = {name}
+        if rendered and not self.source.is_binary(infile):
+            content_variables, _, sources = self._analyzer.analyze(name)
+            variables |= content_variables
+        if sources is not None:
+            for source_name in sources:
+                self._source_hash(source_name)
+            sources = sorted(sources)
+
+        with io.open(outfile, 'rb') as f:
+            output_hash = hash_file(f)
+        output = _template_name(os.path.relpath(outfile, project_dir))
+        self.files[output] = {
+            'source': name,
+            'sources': sources,
+            'variables': sorted(variables),
+            'hash': output_hash,
+        }
+
+    def add_tree(self, indir, outdir, project_dir):
+        """Record the files of a dir copied without rendering."""
+        for root, dirs, files in self.source.walk(indir):
+            root_outdir = os.path.join(outdir, os.path.relpath(root, indir))
+            for f in files:
+                self.add_file(
+                    os.path.normpath(os.path.join(root, f)),
+                    os.path.normpath(os.path.join(root_outdir, f)),
+                    project_dir,
+                    rendered=False
+                )
+
+    def build(self):
+        """Return the manifest of everything recorded."""
+        return {
+            'template': self.context.get('cookiecutter', {}).get('_template'),
+            'context': self.context,
+            'sources': self._source_hashes,
+            'files': self.files,
+        }
@@ -186,16 +186,26 @@ def prompt_choice_for_config(cookiecutter_dict, env, key, options, no_input):
     return read_user_choice(key, rendered_options)
 
 
-def prompt_for_config(context, no_input=False):
+def prompt_for_config(context, no_input=False, analysis=None):
     """
     Prompts the user to enter new config, using context as a source for the
     field names and sample values.
 
     :param no_input: Prompt the user at command line for manual configuration?
+    :param analysis: Optional `TemplateAnalysis` of the template. Variables
+        which the template does not use are not prompted for, they keep
+        their default values.
     """
     cookiecutter_dict = {}
     env = StrictEnvironment(context=context)
 
+    used_keys = None
+    if analysis is not None:
+        used_keys = analysis.find_used_keys(context[u'cookiecutter'], env)
+
+    def skip_prompt(key):
+        return no_input or used_keys is not None and key not in used_keys
+
     # First pass: Handle simple and raw variables, plus choices.
     # These must be done first because the dictionaries keys and
     # values might refer to them.
@@ -208,14 +218,14 @@ def prompt_for_config(context, no_input=False):
             if isinstance(raw, list):
                 # We are dealing with a choice variable
                 val = prompt_choice_for_config(
-                    cookiecutter_dict, env, key, raw, no_input
+                    cookiecutter_dict, env, key, raw, skip_prompt(key)
                 )
                 cookiecutter_dict[key] = val
             elif not isinstance(raw, dict):
                 # We are dealing with a regular variable
                 val = render_variable(env, raw, cookiecutter_dict)
 
-                if not no_input:
+                if not skip_prompt(key):
                     val = read_user_variable(key, val)
 
                 cookiecutter_dict[key] = val
@@ -231,7 +241,7 @@ def prompt_for_config(context, no_input=False):
                 # We are dealing with a dict variable
                 val = render_variable(env, raw, cookiecutter_dict)
 
-                if not no_input:
+                if not skip_prompt(key):
                     val = read_user_dict(key, val)
 
                 cookiecutter_dict[key] = val
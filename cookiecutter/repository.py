@@ -7,11 +7,16 @@ import os
 import re
 
 from .exceptions import RepositoryNotFound
+from .tarfile import untar
 from .vcs import clone
 from .zipfile import unzip
 
-REPO_REGEX = re.compile(r"""
-(?x)
+TAR_EXTENSIONS = (
+    '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz',
+    '.tar.zst', '.tzst',
+)
+
+REPO_REGEX = re.compile(r"""(?x)
 ((((git|hg)\+)?(git|ssh|https?):(//)?)  # something like git:// ssh:// etc.
  |                                      # or
  (\w+@[\w\.]+)                          # something like user@...
@@ -29,6 +34,11 @@ def is_zip_file(value):
     return value.lower().endswith('.zip')
 
 
+def is_tar_file(value):
+    """Return True if value is a tar archive, compressed or not."""
+    return value.lower().endswith(TAR_EXTENSIONS)
+
+
 def expand_abbreviations(template, abbreviations):
     """Expand abbreviations in a template name.
 
@@ -62,7 +72,8 @@ def repository_has_cookiecutter_json(repo_directory):
 
 
 def determine_repo_dir(template, abbreviations, clone_to_dir, checkout,
-                       no_input, password=None):
+                       no_input, password=None, mirror_dir=None,
+                       zip_cache=None):
     """
     Locate the repository directory from a template reference.
 
@@ -78,6 +89,10 @@ def determine_repo_dir(template, abbreviations, clone_to_dir, checkout,
     :param checkout: The branch, tag or commit ID to checkout after clone.
     :param no_input: Prompt the user at command line for manual configuration?
     :param password: The password to use when extracting the repository.
+    :param mirror_dir: The directory to keep git mirrors in, or None to
+        clone git repositories from scratch.
+    :param zip_cache: `ZipCache` to download zip URLs through, or None to
+        download them again every time.
     :return: A tuple containing the cookiecutter template directory, and
         a boolean descriving whether that directory should be cleaned up
         after the template has been instantiated.
@@ -91,16 +106,29 @@ def determine_repo_dir(template, abbreviations, clone_to_dir, checkout,
             is_url=is_repo_url(template),
             clone_to_dir=clone_to_dir,
             no_input=no_input,
-            password=password
+            password=password,
+            zip_cache=zip_cache,
+            extract_template=False
         )
         repository_candidates = [unzipped_dir]
         cleanup = True
+    elif is_tar_file(template):
+        untarred_dir = untar(
+            tar_uri=template,
+            is_url=is_repo_url(template),
+            clone_to_dir=clone_to_dir,
+            no_input=no_input,
+            zip_cache=zip_cache
+        )
+        repository_candidates = [untarred_dir]
+        cleanup = True
     elif is_repo_url(template):
         cloned_repo = clone(
             repo_url=template,
             checkout=checkout,
             clone_to_dir=clone_to_dir,
             no_input=no_input,
+            mirror_dir=mirror_dir,
         )
         repository_candidates = [cloned_repo]
         cleanup = False
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+
+"""
+Long-lived generation server.
+
+Keeps templates prepared in memory, see `PreparedTemplate`, and generates
+projects from them on request. Requests are served over HTTP on a TCP port
+or a Unix socket, so callers skip interpreter start-up, imports, cloning and
+template compilation on every generation.
+
+Requests are ``POST /generate`` with a JSON object body, sent as
+``application/json``:
+
+* ``template``: Template to generate from. Defaults to the template the
+  server was started with, the only one allowed along with those of the
+  ``server_templates`` user config.
+* ``checkout``: The branch, tag or commit ID to checkout after clone.
+* ``extra_context``: Object of context overrides.
+* ``output_dir``: Where to output the generated project dir into, inside
+  the output root of the server.
+* ``overwrite_if_exists``: Overwrite the output directory if it exists.
+* ``format``: ``dir`` (the default) to answer with the JSON object
+  ``{"project_dir": ...}``, or ``tar`` to answer with the generated project
+  as a gzipped tarball and leave nothing behind on disk. Projects of
+  templates without hooks are then generated straight into the tarball.
+* ``refresh``: Prepare the template again before generating, e.g. to pick up
+  new commits of a git repository.
+
+Generating a project runs the hooks of its template, so the server only
+generates the templates it was configured with and only writes inside its
+output root. Requests sent by web pages, which either name another
+``Host`` or come with an ``Origin``, are refused. Anyone able to connect can
+still run the hooks of these templates with any context, so only bind the
+server to a local address or socket.
+"""
+
+from __future__ import unicode_literals
+import io
+import json
+import logging
+import os
+import tarfile
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import socketserver
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    import SocketServer as socketserver
+
+from .batch import PreparedTemplate
+from .config import get_user_config
+from .exceptions import CookiecutterException
+from .sink import TarSink
+from .utils import rmtree
+
+logger = logging.getLogger(__name__)
+
+UNIX_SOCKET_PREFIX = 'unix:'
+
+# Hosts a request to a server on a TCP port may name, along with its own.
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+class _PooledTemplate(object):
+    """A prepared template of a pool, along with the requests using it."""
+
+    def __init__(self, prepared_template, clone_dir):
+        self.prepared_template = prepared_template
+        self.clone_dir = clone_dir
+        self.users = 0
+        self.retired = False
+
+    def close(self):
+        """Remove the repository of the template and its clone dir."""
+        try:
+            self.prepared_template.close()
+        finally:
+            if os.path.isdir(self.clone_dir):
+                rmtree(self.clone_dir)
+
+
+class TemplatePool(object):
+    """Prepared templates, kept warm for the lifetime of the server.
+
+    Every preparation of a template, for each checkout and each refresh,
+    clones or unpacks it into a dir of its own, so preparing a template
+    never touches the files another request is generating from. A template
+    replaced by a refresh is closed once the last request using it is done.
+
+    At most `max_templates` templates are kept, the least recently used
+    ones being closed first, or once the last request using them is done.
+    """
+
+    def __init__(self, config_dict, password=None, max_templates=16):
+        """Initialize an empty pool for the given user configuration."""
+        self.config_dict = config_dict
+        self.password = password
+        self.max_templates = max_templates
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prepare(self, template, checkout):
+        logger.debug('Preparing template {}'.format(template))
+        clone_dir = tempfile.mkdtemp(prefix='cookiecutter-template-')
+        try:
+            prepared_template = PreparedTemplate(
+                template,
+                self.config_dict,
+                checkout=checkout,
+                password=self.password,
+                clone_to_dir=clone_dir
+            )
+        except Exception:
+            rmtree(clone_dir)
+            raise
+        return _PooledTemplate(prepared_template, clone_dir)
+
+    def _acquire(self, template, checkout, refresh):
+        key = (template, checkout)
+        with self._lock:
+            pooled = self._templates.pop(key, None)
+            if pooled is not None:
+                # Most recently used last
+                self._templates[key] = pooled
+                if not refresh:
+                    pooled.users += 1
+                    return pooled
+
+        pooled = self._prepare(template, checkout)
+        retired = []
+        with self._lock:
+            current = self._templates.pop(key, None)
+            if refresh or current is None:
+                self._templates[key] = pooled
+                if current is not None:
+                    retired.append(current)
+            else:
+                # Another request prepared the same template in the meantime
+                self._templates[key] = current
+                retired.append(pooled)
+                pooled = current
+            pooled.users += 1
+            while len(self._templates) > self.max_templates:
+                _, oldest = self._templates.popitem(last=False)
+                retired.append(oldest)
+            for old in retired:
+                old.retired = True
+            unused = [old for old in retired if old.users == 0]
+        for old in unused:
+            old.close()
+        return pooled
+
+    def _release(self, pooled):
+        with self._lock:
+            pooled.users -= 1
+            retired = pooled.retired and pooled.users == 0
+        if retired:
+            pooled.close()
+
+    @contextmanager
+    def use(self, template, checkout=None, refresh=False):
+        """Yield the prepared template, preparing it on first use.
+
+        The template is not closed before the block is left, even if another
+        request refreshes it in the meantime.
+
+        :param refresh: Prepare the template again, e.g. to pick up new
+            commits of a git repository.
+        """
+        pooled = self._acquire(template, checkout, refresh)
+        try:
+            yield pooled.prepared_template
+        finally:
+            self._release(pooled)
+
+    def close(self):
+        """Remove the repositories unpacked for the templates of the pool.
+
+        Templates still in use are removed once their last request is done.
+        """
+        with self._lock:
+            pooled_templates = list(self._templates.values())
+            self._templates.clear()
+            for pooled in pooled_templates:
+                pooled.retired = True
+            unused = [p for p in pooled_templates if p.users == 0]
+        for pooled in unused:
+            pooled.close()
+
+
+class ForbiddenRequest(Exception):
+    """A request the server refuses to serve, answered with status 403."""
+
+
+class GenerationRequestHandler(BaseHTTPRequestHandler):
+    """Generate a project for every ``POST /generate`` request."""
+
+    def do_POST(self):
+        """Handle a generation request."""
+        if self.path.rstrip('/') != '/generate':
+            self.send_json(404, {'error': 'Not found: {}'.format(self.path)})
+            return
+
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.split(';')[0].strip().lower() != 'application/json':
+            self.send_json(415, {'error': 'Expected application/json'})
+            return
+        try:
+            self.check_origin()
+        except ForbiddenRequest as e:
+            self.send_json(403, {'error': str(e)})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError('Expected a JSON object')
+        except ValueError as e:
+            self.send_json(400, {'error': 'Invalid request: {}'.format(e)})
+            return
+
+        try:
+            self.generate(request)
+        except ForbiddenRequest as e:
+            self.send_json(403, {'error': str(e)})
+        except CookiecutterException as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            logger.exception('Generation failed')
+            self.send_json(500, {'error': str(e)})
+
+    def check_origin(self):
+        """Refuse requests sent by web pages.
+
+        Browsers let any page post to a local server, naming the host of the
+        page, e.g. one resolving to the local address, and sending its
+        ``Origin``. Clients of a Unix socket name no particular host.
+        """
+        if self.headers.get('Origin') is not None:
+            raise ForbiddenRequest('Cross-origin requests are not allowed')
+        if not isinstance(self.server.server_address, tuple):
+            return
+        host = self.headers.get('Host', '')
+        if host.startswith('['):
+            host = host[1:].partition(']')[0]
+        else:
+            host = host.partition(':')[0]
+        if host and host not in LOCAL_HOSTS + (
+                self.server.server_address[0],):
+            raise ForbiddenRequest('Unknown host: {}'.format(host))
+
+    def get_output_dir(self, request):
+        """Return the output dir of a request, inside the output root."""
+        output_root = os.path.realpath(self.server.output_root)
+        output_dir = os.path.realpath(
+            os.path.join(output_root, request.get('output_dir', '.'))
+        )
+        if output_dir != output_root and not output_dir.startswith(
+                os.path.join(output_root, '')):
+            raise ForbiddenRequest(
+                'Output dir outside of {}: {}'.format(
+                    output_root, request['output_dir']
+                )
+            )
+        return output_dir
+
+    def generate(self, request):
+        """Generate the project described by a request and answer with it."""
+        template = request.get('template', self.server.default_template)
+        if not template:
+            raise ValueError('No template given')
+        if template not in self.server.allowed_templates:
+            raise ForbiddenRequest(
+                'Template not allowed: {}'.format(template)
+            )
+
+        with self.server.template_pool.use(
+            template,
+            checkout=request.get('checkout'),
+            refresh=request.get('refresh', False)
+        ) as prepared_template:
+            self.generate_from(prepared_template, request)
+
+    def generate_from(self, prepared_template, request):
+        """Generate a project from a prepared template and answer with it."""
+        if request.get('format', 'dir') == 'tar' and \
+                not prepared_template.hook_registry and \
+                not prepared_template.context['cookiecutter'].get(
+                    '_post_gen_tasks'):
+            buf = io.BytesIO()
+            with TarSink(buf) as sink:
+                prepared_template.generate(
+                    request.get('extra_context'), sink=sink
+                )
+            self.send_body(200, 'application/gzip', buf.getvalue())
+        elif request.get('format', 'dir') == 'tar':
+            # Hooks need the project on disk
+            output_dir = tempfile.mkdtemp()
+            try:
+                project_dir = prepared_template.generate(
+                    request.get('extra_context'), output_dir=output_dir
+                )
+                self.send_tarball(project_dir)
+            finally:
+                rmtree(output_dir)
+        else:
+            project_dir = prepared_template.generate(
+                request.get('extra_context'),
+                output_dir=self.get_output_dir(request),
+                overwrite_if_exists=request.get('overwrite_if_exists', False)
+            )
+            self.send_json(200, {'project_dir': os.path.abspath(project_dir)})
+
+    def send_json(self, status, obj):
+        """Answer with a JSON object."""
+        self.send_body(status, 'application/json', json.dumps(obj).encode())
+
+    def send_tarball(self, project_dir):
+        """Answer with a gzipped tarball of the project dir."""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+            tar.add(project_dir, arcname=os.path.basename(project_dir))
+        self.send_body(200, 'application/gzip', buf.getvalue())
+
+    def send_body(self, status, content_type, body):
+        """Answer with a complete response."""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Log requests to the cookiecutter logger.
+
+        Clients of a Unix socket have no address, so it is not logged.
+        """
+        logger.debug(format % args)
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server handling every request in its own thread."""
+
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn,
+                                  socketserver.UnixStreamServer):
+        """HTTP server on a Unix socket handling every request in a thread.
+
+        The socket file is removed when the server is closed.
+        """
+
+        daemon_threads = True
+
+        def server_close(self):
+            """Close the server and remove its socket file."""
+            socketserver.UnixStreamServer.server_close(self)
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)
+
+
+def make_server(address, template_pool, default_template=None,
+                allowed_templates=(), output_root='.'):
+    """Create a generation server listening on `address`.
+
+    :param address: Either ``host:port`` or ``unix:`` followed by the path
+        of a Unix socket.
+    :param template_pool: `TemplatePool` to generate projects from.
+    :param default_template: Template used by requests which name none.
+    :param allowed_templates: Templates requests may name, along with the
+        default one.
+    :param output_root: Dir requests generate projects inside of.
+    """
+    if address.startswith(UNIX_SOCKET_PREFIX):
+        socket_path = address[len(UNIX_SOCKET_PREFIX):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(
+            socket_path, GenerationRequestHandler
+        )
+    else:
+        host, _, port = address.rpartition(':')
+        server = ThreadingHTTPServer(
+            (host or 'localhost', int(port)), GenerationRequestHandler
+        )
+    server.template_pool = template_pool
+    server.default_template = default_template
+    server.allowed_templates = set(allowed_templates)
+    if default_template:
+        server.allowed_templates.add(default_template)
+    server.output_root = os.path.abspath(output_root)
+    return server
+
+
+def serve(address, template=None, config_file=None, default_config=False,
+          password=None):
+    """Serve generation requests until interrupted.
+
+    :param address: Either ``host:port`` or ``unix:`` followed by the path
+        of a Unix socket.
+    :param template: Template to prepare right away and to use for requests
+        which name none. Requests may only name it and the templates of the
+        ``server_templates`` user config.
+    :param config_file: User configuration file path.
+    :param default_config: Use default values rather than a config file.
+    :param password: The password to use when extracting repositories.
+    """
+    config_dict = get_user_config(
+        config_file=config_file,
+        default_config=default_config,
+    )
+    template_pool = TemplatePool(
+        config_dict,
+        password=password,
+        max_templates=config_dict['server_max_templates']
+    )
+    try:
+        if template:
+            # Prepare the default template before the first request
+            with template_pool.use(template):
+                pass
+        server = make_server(
+            address,
+            template_pool,
+            template,
+            allowed_templates=config_dict['server_templates'],
+            output_root=config_dict['server_output_dir'] or '.'
+        )
+        logger.info('Serving generation requests on {}'.format(address))
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+    finally:
+        template_pool.close()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sinks the files of a generated project are written to.
+
+`generate_files` writes a project through a sink, so it generates a project
+into a directory on disk, into memory or straight into a zip or tar archive
+alike. Only `FileSystemSink` writes to disk; the other sinks take the paths
+of dirs and files as names relative to their root, with `output_dir`, if
+any, as a prefix.
+
+Hooks run in the generated project dir, so they are not run for projects
+generated into a sink other than `FileSystemSink`.
+"""
+
+from __future__ import absolute_import, unicode_literals
+import abc
+import io
+import os
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+
+from .utils import make_sure_path_exists
+
+# Permissions of the dirs and files of archives whose template stores none.
+DEFAULT_DIR_MODE = 0o755
+DEFAULT_FILE_MODE = 0o644
+
+# Base of abstract classes on both Python 2 and 3.
+_ABC = abc.ABCMeta(str('_ABC'), (object,), {})
+
+
+class _Sink(_ABC):
+    """Base of the sinks, which may be used as context managers."""
+
+    # Whether dirs and files are written to disk
+    on_disk = False
+
+    def close(self):
+        """Finish writing, nothing to do unless overridden."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FileSystemSink(_Sink):
+    """Write generated projects to directories on disk."""
+
+    on_disk = True
+
+    def exists(self, path):
+        """Check whether a dir or file exists."""
+        return os.path.exists(path)
+
+    def is_dir(self, path):
+        """Check whether a dir exists."""
+        return os.path.isdir(path)
+
+    def make_dir(self, path, mode=None):
+        """Create a dir and its missing parents."""
+        make_sure_path_exists(path)
+        if mode is not None:
+            os.chmod(path, mode)
+
+    def write_file(self, path, contents, mode=None):
+        """Write the contents of a file, given as bytes."""
+        with io.open(path, 'wb') as fh:
+            fh.write(contents)
+        if mode is not None:
+            os.chmod(path, mode)
+
+    def copy_file(self, source, infile, path):
+        """Copy a file of a template source along with its permissions."""
+        source.copy_file(infile, path)
+        source.copy_mode(infile, path)
+
+    def copy_tree(self, source, indir, outdir):
+        """Copy a dir of a template source."""
+        source.copy_tree(indir, outdir)
+
+
+class _EntrySink(_Sink):
+    """Base of the sinks keeping projects off disk, as entries by name.
+
+    Dirs are added before the files in them, parents first. Entries may be
+    added from several threads at once.
+    """
+
+    def __init__(self):
+        self._dirs = set()
+        self._files = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_name(path):
+        """Return the name of the entry of a path."""
+        return os.path.normpath(path).replace(os.sep, '/')
+
+    def exists(self, path):
+        """Check whether a dir or file was added."""
+        name = self.get_name(path)
+        return name in self._dirs or name in self._files
+
+    def is_dir(self, path):
+        """Check whether a dir was added."""
+        return self.get_name(path) in self._dirs
+
+    def make_dir(self, path, mode=None):
+        """Add a dir and its missing parents."""
+        name = self.get_name(path)
+        with self._lock:
+            if name in self._dirs:
+                return
+            parent = name.rpartition('/')[0]
+            missing = []
+            while parent and parent not in self._dirs:
+                missing.append(parent)
+                parent = parent.rpartition('/')[0]
+            for parent in reversed(missing):
+                self._dirs.add(parent)
+                self._add_dir(parent, None)
+            self._dirs.add(name)
+            self._add_dir(name, mode)
+
+    def write_file(self, path, contents, mode=None):
+        """Add a file with the given contents, as bytes."""
+        name = self.get_name(path)
+        with self._lock:
+            self._files.add(name)
+            self._add_file(name, contents, mode)
+
+    def copy_file(self, source, infile, path):
+        """Add a file of a template source along with its permissions."""
+        with source.open(infile) as fh:
+            contents = fh.read()
+        self.write_file(path, contents, source.get_mode(infile))
+
+    def copy_tree(self, source, indir, outdir):
+        """Add a dir of a template source and everything in it."""
+        for root, dirs, files in source.walk(indir):
+            root_outdir = os.path.join(outdir, os.path.relpath(root, indir))
+            self.make_dir(root_outdir, source.get_mode(root))
+            for f in files:
+                self.copy_file(
+                    source,
+                    os.path.join(root, f),
+                    os.path.join(root_outdir, f)
+                )
+
+    @abc.abstractmethod
+    def _add_dir(self, name, mode):
+        """Add the entry of a dir, whose mode is None if unknown."""
+
+    @abc.abstractmethod
+    def _add_file(self, name, contents, mode):
+        """Add the entry of a file, whose mode is None if unknown."""
+
+
+class MemorySink(_EntrySink):
+    """Keep generated projects in memory.
+
+    `files` maps the names of the generated files to their contents as
+    bytes, `dirs` holds the names of the generated dirs and `modes` the
+    permission bits of the dirs and files whose template stores them.
+    """
+
+    def __init__(self):
+        """Initialize an empty sink."""
+        super(MemorySink, self).__init__()
+        self.files = {}
+        self.dirs = []
+        self.modes = {}
+
+    def _add_dir(self, name, mode):
+        self.dirs.append(name)
+        if mode is not None:
+            self.modes[name] = mode
+
+    def _add_file(self, name, contents, mode):
+        self.files[name] = contents
+        if mode is not None:
+            self.modes[name] = mode
+
+
+class ZipSink(_EntrySink):
+    """Write generated projects into a zip archive as they are generated.
+
+    The archive is complete once the sink is closed. Writing to streams
+    which can not seek, e.g. a socket, requires Python 3.5 or later.
+    """
+
+    def __init__(self, file, compression=zipfile.ZIP_DEFLATED):
+        """Initialize the sink.
+
+        :param file: Path to the archive, or a binary file to write it to.
+        :param compression: Compression method of the files of the archive.
+        """
+        super(ZipSink, self).__init__()
+        self.zip_file = zipfile.ZipFile(file, 'w', compression)
+
+    def _add_dir(self, name, mode):
+        info = zipfile.ZipInfo(name + '/', time.localtime()[:6])
+        info.external_attr = (stat.S_IFDIR | (mode or DEFAULT_DIR_MODE)) << 16
+        # MS-DOS directory flag
+        info.external_attr |= 0x10
+        self.zip_file.writestr(info, b'')
+
+    def _add_file(self, name, contents, mode):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.external_attr = (stat.S_IFREG | (mode or DEFAULT_FILE_MODE)) << 16
+        info.compress_type = self.zip_file.compression
+        self.zip_file.writestr(info, contents)
+
+    def close(self):
+        """Write the central directory of the archive."""
+        self.zip_file.close()
+
+
+class TarSink(_EntrySink):
+    """Stream generated projects into a tar archive as they are generated.
+
+    The archive is written as a stream, so `file` need not be able to seek.
+    It is complete once the sink is closed.
+    """
+
+    def __init__(self, file, compression='gz'):
+        """Initialize the sink.
+
+        :param file: Binary file to write the archive to.
+        :param compression: One of ``gz``, ``bz2`` or ``xz``, or an empty
+            string for an uncompressed archive.
+        """
+        super(TarSink, self).__init__()
+        self.tar_file = tarfile.open(
+            fileobj=file, mode='w|{}'.format(compression)
+        )
+
+    def _get_info(self, name, mode):
+        info = tarfile.TarInfo(name)
+        info.mode = mode
+        info.mtime = int(time.time())
+        return info
+
+    def _add_dir(self, name, mode):
+        info = self._get_info(name, mode or DEFAULT_DIR_MODE)
+        info.type = tarfile.DIRTYPE
+        self.tar_file.addfile(info)
+
+    def _add_file(self, name, contents, mode):
+        info = self._get_info(name, mode or DEFAULT_FILE_MODE)
+        info.size = len(contents)
+        self.tar_file.addfile(info, io.BytesIO(contents))
+
+    def copy_file(self, source, infile, path):
+        """Stream a file of a template source into the archive."""
+        name = self.get_name(path)
+        info = self._get_info(
+            name, source.get_mode(infile) or DEFAULT_FILE_MODE
+        )
+        info.size = source.get_size(infile)
+        with source.open(infile) as fh:
+            with self._lock:
+                self._files.add(name)
+                self.tar_file.addfile(info, fh)
+
+    def close(self):
+        """Write the end of the archive."""
+        self.tar_file.close()
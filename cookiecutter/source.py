@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sources of the files of a project template.
+
+`generate_files` reads the project template through a source, so it renders
+a template dir on disk and one inside a zip archive alike. A zip repository
+unpacked by `unzip` with ``extract_template=False`` only has its metadata,
+e.g. ``cookiecutter.json`` and hooks, extracted. Its project template is
+read straight from the archive instead.
+
+Sources classify their files as binary or text with their `classifier`, see
+`cookiecutter.binary`. Their Jinja2 loaders serve the contents read to
+classify a file, see `preloaded`, so text files are read only once.
+"""
+
+from __future__ import unicode_literals
+import hashlib
+import io
+import json
+import os
+import shutil
+import stat
+import threading
+import zipfile
+from contextlib import contextmanager
+
+from jinja2 import BaseLoader, FileSystemLoader, TemplateNotFound
+
+from . import fastcopy
+from .binary import BinaryClassifier
+from .find import find_template
+from .utils import make_sure_path_exists
+
+# File in an unpacked zip repository pointing at the archive which holds its
+# project template.
+ZIP_SOURCE_FILENAME = '.cookiecutter-zip.json'
+
+# Size of the buffers files are copied out of an archive with.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class FileSystemSource(object):
+    """Project template in a directory on disk.
+
+    Files are copied with `cookiecutter.fastcopy`. If `link_files` is set,
+    they are hard linked where possible, which is only safe if the files of
+    the template are never modified.
+    """
+
+    def __init__(self, template_dir, link_files=False):
+        """Initialize the source with the path to the template dir."""
+        self.template_dir = template_dir
+        self.name = os.path.basename(template_dir)
+        self.classifier = BinaryClassifier()
+        self.link_files = link_files
+
+    def get_loader(self):
+        """Return a Jinja2 loader rooted at the template dir."""
+        return FileSystemSourceLoader(self.template_dir)
+
+    def walk(self, top='.'):
+        """Walk the template dir like `os.walk`, with relative paths."""
+        for root, dirs, files in os.walk(os.path.join(self.template_dir, top)):
+            yield os.path.relpath(root, self.template_dir), dirs, files
+
+    def open(self, infile):
+        """Open a file of the template for reading bytes."""
+        return io.open(os.path.join(self.template_dir, infile), 'rb')
+
+    def get_size(self, infile):
+        """Return the size of a file of the template in bytes."""
+        return os.path.getsize(os.path.join(self.template_dir, infile))
+
+    def get_mode(self, infile):
+        """Return the permission bits of a file or dir of the template."""
+        return stat.S_IMODE(
+            os.stat(os.path.join(self.template_dir, infile)).st_mode
+        )
+
+    def get_checksum(self, infile):
+        """Return a checksum of the contents of a file of the template."""
+        digest = hashlib.sha1()
+        with self.open(infile) as f:
+            for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_cache_key(self, infile):
+        """Return a key of a file which changes along with the file."""
+        path = os.path.join(self.template_dir, infile)
+        st = os.stat(path)
+        return '{}:{!r}:{}'.format(path, st.st_mtime, st.st_size)
+
+    def classify(self, infile):
+        """Classify a file of the template, see `BinaryClassifier`."""
+        return self.classifier.classify(self, infile)
+
+    def is_binary(self, infile):
+        """Check whether a file of the template is binary."""
+        return self.classify(infile)[0]
+
+    def copy_file(self, infile, outfile):
+        """Copy the contents of a file of the template to `outfile`."""
+        fastcopy.copy_file(
+            os.path.join(self.template_dir, infile), outfile,
+            link=self.link_files
+        )
+
+    def copy_mode(self, infile, outfile):
+        """Apply the permissions of a file of the template to `outfile`."""
+        shutil.copymode(os.path.join(self.template_dir, infile), outfile)
+
+    def copy_tree(self, indir, outdir):
+        """Copy a dir of the template to `outdir`."""
+        fastcopy.copy_tree(
+            os.path.join(self.template_dir, indir), outdir,
+            link=self.link_files
+        )
+
+
+class ZipSource(object):
+    """Project template inside a zip archive, read without extracting it.
+
+    Every thread opens the archive for itself, so files can be generated
+    from several threads at once. Sources can be pickled for process pools,
+    the archive is opened again once unpickled.
+    """
+
+    def __init__(self, zip_path, template_dir):
+        """Initialize the source.
+
+        :param zip_path: Path to the zip archive.
+        :param template_dir: Name of the template dir inside the archive,
+            e.g. ``repo/{{cookiecutter.repo_name}}``.
+        """
+        self.zip_path = zip_path
+        self.template_dir = template_dir.rstrip('/')
+        self.name = self.template_dir.rsplit('/', 1)[-1]
+        self.classifier = BinaryClassifier()
+        self._local = threading.local()
+        self._index = None
+
+    def __getstate__(self):
+        return {
+            'zip_path': self.zip_path,
+            'template_dir': self.template_dir,
+            'classifier': self.classifier,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state['zip_path'], state['template_dir'])
+        self.classifier = state['classifier']
+
+    @property
+    def zip_file(self):
+        """`zipfile.ZipFile` of the archive, opened for the current thread."""
+        try:
+            return self._local.zip_file
+        except AttributeError:
+            self._local.zip_file = zipfile.ZipFile(self.zip_path)
+            return self._local.zip_file
+
+    def _member(self, path):
+        return '/'.join([self.template_dir] + path.split(os.sep))
+
+    def _get_index(self):
+        """Map every dir of the template to its child dirs and files.
+
+        Archives do not always have entries for their dirs, so dirs are also
+        taken from the names of the files in them.
+        """
+        if self._index is not None:
+            return self._index
+
+        index = {'.': ([], [])}
+        prefix = self.template_dir + '/'
+        for name in self.zip_file.namelist():
+            if not name.startswith(prefix) or name == prefix:
+                continue
+            parts = name[len(prefix):].rstrip('/').split('/')
+            parent = '.'
+            for i, part in enumerate(parts):
+                path = os.path.join(*parts[:i + 1])
+                if i == len(parts) - 1 and not name.endswith('/'):
+                    index[parent][1].append(part)
+                elif path not in index:
+                    index[path] = ([], [])
+                    index[parent][0].append(part)
+                parent = path
+
+        self._index = index
+        return index
+
+    def get_loader(self):
+        """Return a Jinja2 loader reading templates from the archive."""
+        return ZipLoader(self)
+
+    def walk(self, top='.'):
+        """Walk the template dir like `os.walk`, with relative paths."""
+        child_dirs, files = self._get_index()[top]
+        dirs = list(child_dirs)
+        yield top, dirs, list(files)
+        for d in dirs:
+            for entry in self.walk(os.path.normpath(os.path.join(top, d))):
+                yield entry
+
+    def _get_info(self, path):
+        """Return the `zipfile.ZipInfo` of a file or dir, None if missing."""
+        member = self._member(path)
+        for name in (member, member + '/'):
+            try:
+                return self.zip_file.getinfo(name)
+            except KeyError:
+                pass
+        return None
+
+    def read(self, infile):
+        """Return the contents of a file of the template as bytes."""
+        return self.zip_file.read(self._member(infile))
+
+    def open(self, infile):
+        """Open a file of the template for reading bytes."""
+        return self.zip_file.open(self._member(infile))
+
+    def get_size(self, infile):
+        """Return the size of a file of the template in bytes."""
+        return self.zip_file.getinfo(self._member(infile)).file_size
+
+    def get_mode(self, infile):
+        """Return the permission bits of a file or dir of the template.
+
+        Archives created on Windows store no permissions, and archives do
+        not always have entries for their dirs, in which case this is None.
+        """
+        info = self._get_info(infile)
+        mode = info and info.external_attr >> 16
+        return stat.S_IMODE(mode) if mode else None
+
+    def get_checksum(self, infile):
+        """Return the CRC-32 the archive stores for a file of the template."""
+        info = self.zip_file.getinfo(self._member(infile))
+        return '{:08x}'.format(info.CRC)
+
+    def get_cache_key(self, infile):
+        """Return a key of a file which changes along with the file."""
+        info = self.zip_file.getinfo(self._member(infile))
+        return '{}:{}:{:08x}:{}'.format(
+            os.path.abspath(self.zip_path), info.filename, info.CRC,
+            info.file_size
+        )
+
+    def classify(self, infile):
+        """Classify a file of the template, see `BinaryClassifier`."""
+        return self.classifier.classify(self, infile)
+
+    def is_binary(self, infile):
+        """Check whether a file of the template is binary."""
+        return self.classify(infile)[0]
+
+    def copy_file(self, infile, outfile):
+        """Stream the contents of a file of the template to `outfile`."""
+        with self.zip_file.open(self._member(infile)) as src:
+            with io.open(outfile, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+    def copy_mode(self, infile, outfile):
+        """Apply the permissions of a file or dir of the template to `outfile`.
+
+        `outfile` keeps the default permissions if the archive stores none,
+        see `get_mode`.
+        """
+        mode = self.get_mode(infile)
+        if mode is not None:
+            os.chmod(outfile, mode)
+
+    def copy_tree(self, indir, outdir):
+        """Copy a dir of the template to `outdir`."""
+        for root, dirs, files in self.walk(indir):
+            root_outdir = os.path.normpath(
+                os.path.join(outdir, os.path.relpath(root, indir))
+            )
+            make_sure_path_exists(root_outdir)
+            self.copy_mode(root, root_outdir)
+            for f in files:
+                infile = os.path.join(root, f)
+                outfile = os.path.join(root_outdir, f)
+                self.copy_file(infile, outfile)
+                self.copy_mode(infile, outfile)
+
+
+class _PreloadingLoader(object):
+    """Mixin for loaders which serve templates whose contents were read."""
+
+    def _get_preloaded(self):
+        try:
+            return self._local.preloaded
+        except AttributeError:
+            self._local.preloaded = {}
+            return self._local.preloaded
+
+    @contextmanager
+    def preloaded(self, template, contents):
+        """Serve a template from the given contents, as bytes, for a while.
+
+        Only the current thread is served the contents, so other threads
+        may load the same template at the same time.
+        """
+        preloaded = self._get_preloaded()
+        preloaded[template] = contents
+        try:
+            yield
+        finally:
+            preloaded.pop(template, None)
+
+    def pop_preloaded(self, template):
+        """Return the preloaded contents of a template once, or None."""
+        return self._get_preloaded().pop(template, None)
+
+
+class FileSystemSourceLoader(_PreloadingLoader, FileSystemLoader):
+    """Jinja2 loader reading templates from a `FileSystemSource`."""
+
+    def __init__(self, searchpath):
+        """Initialize the loader with the template dir."""
+        FileSystemLoader.__init__(self, searchpath)
+        self._local = threading.local()
+
+    def get_source(self, environment, template):
+        """Return the source of a template, see `jinja2.BaseLoader`."""
+        contents = self.pop_preloaded(template)
+        if contents is None:
+            return FileSystemLoader.get_source(self, environment, template)
+
+        filename = os.path.join(self.searchpath[0], *template.split('/'))
+        mtime = os.path.getmtime(filename)
+
+        def uptodate():
+            try:
+                return os.path.getmtime(filename) == mtime
+            except OSError:
+                return False
+        return contents.decode('utf-8'), filename, uptodate
+
+
+class ZipLoader(_PreloadingLoader, BaseLoader):
+    """Jinja2 loader reading templates from a `ZipSource`."""
+
+    def __init__(self, source):
+        """Initialize the loader with the source to read templates from."""
+        self.source = source
+        self._local = threading.local()
+
+    def get_source(self, environment, template):
+        """Return the source of a template, see `jinja2.BaseLoader`."""
+        infile = os.path.join(*template.split('/'))
+        contents = self.pop_preloaded(template)
+        try:
+            if contents is None:
+                contents = self.source.read(infile)
+        except KeyError:
+            raise TemplateNotFound(template)
+        filename = '{}/{}'.format(
+            self.source.zip_path, self.source._member(infile)
+        )
+        return contents.decode('utf-8'), filename, lambda: True
+
+
+def write_zip_source(repo_dir, zip_path, template_dir):
+    """Point an unpacked zip repository at the archive of its template.
+
+    :param repo_dir: The unpacked repository.
+    :param zip_path: Path to the zip archive.
+    :param template_dir: Name of the template dir inside the archive.
+    """
+    with io.open(os.path.join(repo_dir, ZIP_SOURCE_FILENAME), 'w',
+                 encoding='utf-8') as f:
+        f.write(json.dumps({
+            'zip_path': os.path.abspath(zip_path),
+            'template_dir': template_dir,
+        }))
+
+
+def get_template_source(repo_dir):
+    """Return the source of the project template of a repository.
+
+    :param repo_dir: Project template input directory.
+    """
+    zip_source_file = os.path.join(repo_dir, ZIP_SOURCE_FILENAME)
+    if os.path.exists(zip_source_file):
+        with io.open(zip_source_file, encoding='utf-8') as f:
+            zip_source = json.load(f)
+        return ZipSource(zip_source['zip_path'], zip_source['template_dir'])
+    return FileSystemSource(os.path.abspath(find_template(repo_dir)))
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""
+Download and unpack tar archives of templates.
+
+Archives may be uncompressed or compressed with gzip, bzip2, xz or, if the
+``zstandard`` package is installed, zstd. The compression is detected from
+the content, not the file name. Archives are unpacked as a stream, so a
+downloaded archive is unpacked while it is still being downloaded.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import os
+import posixpath
+import tarfile
+import tempfile
+
+from .exceptions import InvalidTarRepository
+from .utils import make_sure_path_exists, prompt_and_delete, rmtree
+from .zipfile import (
+    DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT, TeeReader, get_session
+)
+
+logger = logging.getLogger(__name__)
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class _StreamReader(object):
+    """Read a stream, keeping the bytes looked at with `peek`.
+
+    Bytes looked at with `peek` are returned again by the following reads,
+    so the compression of a stream can be detected before unpacking it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self._buffer = b''
+
+    def _read(self, size):
+        return self.fileobj.read(size)
+
+    def peek(self, size):
+        while len(self._buffer) < size:
+            data = self._read(size - len(self._buffer))
+            if not data:
+                break
+            self._buffer += data
+        return self._buffer[:size]
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            self._buffer = b''
+            for chunk in iter(lambda: self._read(DOWNLOAD_CHUNK_SIZE), b''):
+                chunks.append(chunk)
+            return b''.join(chunks)
+        # `tarfile` detects the compression from its first read, so reads
+        # are not cut short at the end of the peeked bytes.
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        if len(data) < size:
+            data += self._read(size - len(data))
+        return data
+
+
+def _zstd_reader(fileobj, tar_uri):
+    try:
+        import zstandard
+    except ImportError:
+        raise InvalidTarRepository(
+            'Tar repository {} is compressed with zstd, which requires the '
+            'zstandard package'.format(tar_uri)
+        )
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+def _is_within(name, top):
+    return name == top or name.startswith(top + '/')
+
+
+def _check_member(member, project_name, tar_uri):
+    """Refuse members which would be unpacked outside the project dir."""
+    name = posixpath.normpath(member.name)
+    if member.islnk():
+        target = posixpath.normpath(member.linkname)
+    elif member.issym():
+        target = posixpath.normpath(
+            posixpath.join(posixpath.dirname(name), member.linkname)
+        )
+    else:
+        target = name
+    if member.isdev() or not all([
+        _is_within(name, project_name),
+        _is_within(target, project_name),
+    ]):
+        raise InvalidTarRepository(
+            'Tar repository {} contains {} outside of its top-level '
+            'directory'.format(tar_uri, member.name)
+        )
+
+
+def _extract(reader, tar_uri, unzip_base):
+    """Unpack a tar archive read from `reader` into `unzip_base`.
+
+    :returns: Path to the unpacked top-level directory of the archive.
+    """
+    if reader.peek(len(ZSTD_MAGIC)) == ZSTD_MAGIC:
+        tar_file = tarfile.open(
+            fileobj=_zstd_reader(reader, tar_uri), mode='r|'
+        )
+    else:
+        tar_file = tarfile.open(fileobj=reader, mode='r|*')
+
+    # Python versions with extraction filters warn when none is given
+    extract_kwargs = {}
+    if hasattr(tarfile, 'data_filter'):
+        extract_kwargs['filter'] = 'data'
+
+    project_name = None
+    with tar_file:
+        for member in tar_file:
+            if project_name is None:
+                # The first member should be the directory entry for the
+                # archive. If it isn't a directory, there's a problem.
+                project_name = posixpath.normpath(member.name)
+                if not member.isdir() or '/' in project_name or \
+                        project_name in ('.', '..'):
+                    raise InvalidTarRepository(
+                        'Tar repository {} does not include '
+                        'a top-level directory'.format(tar_uri)
+                    )
+            _check_member(member, project_name, tar_uri)
+            tar_file.extract(member, path=unzip_base, **extract_kwargs)
+
+    if project_name is None:
+        raise InvalidTarRepository(
+            'Tar repository {} is empty'.format(tar_uri)
+        )
+    return os.path.join(unzip_base, project_name)
+
+
+def _download_and_extract(tar_uri, tar_path, unzip_base):
+    """Unpack an archive while downloading it to `tar_path`."""
+    import requests
+
+    part_path = tar_path + '.part'
+    r = get_session().get(tar_uri, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    try:
+        try:
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            raise InvalidTarRepository(
+                'Unable to download {}: {}'.format(tar_uri, e)
+            )
+        r.raw.decode_content = True
+        with open(part_path, 'wb') as part:
+            reader = TeeReader(r.raw, part)
+            unzip_path = _extract(_StreamReader(reader), tar_uri, unzip_base)
+            reader.drain()
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        r.close()
+
+    if os.path.exists(tar_path):
+        os.remove(tar_path)
+    os.rename(part_path, tar_path)
+    return unzip_path
+
+
+def untar(tar_uri, is_url, clone_to_dir='.', no_input=False, zip_cache=None):
+    """Download and unpack a tar archive at a given URI.
+
+    Follows the same rules as `unzip`: a downloaded archive is kept in the
+    cookiecutter repository, or in `zip_cache` if given, and unpacked into
+    a temporary directory. Either way it is unpacked while it is downloaded.
+
+    :param tar_uri: The URI for the tar archive.
+    :param is_url: Is the tar URI a URL or a file?
+    :param clone_to_dir: The cookiecutter repository directory
+        to put the archive into.
+    :param no_input: Supress any prompts
+    :param zip_cache: `ZipCache` to download URLs through.
+    """
+    # Ensure that clone_to_dir exists
+    clone_to_dir = os.path.expanduser(clone_to_dir)
+    make_sure_path_exists(clone_to_dir)
+
+    unzip_base = tempfile.mkdtemp()
+    try:
+        if is_url and zip_cache is None:
+            # Build the name of the cached archive,
+            # and prompt to delete if it already exists.
+            identifier = tar_uri.rsplit('/', 1)[1]
+            tar_path = os.path.join(clone_to_dir, identifier)
+
+            if os.path.exists(tar_path):
+                download = prompt_and_delete(tar_path, no_input=no_input)
+            else:
+                download = True
+
+            if download:
+                return _download_and_extract(tar_uri, tar_path, unzip_base)
+        elif is_url:
+            with zip_cache.open(
+                tar_uri, suffix='.tar', error_class=InvalidTarRepository
+            ) as f:
+                return _extract(_StreamReader(f), tar_uri, unzip_base)
+        else:
+            # Just use the local archive as-is.
+            tar_path = os.path.abspath(tar_uri)
+
+        with open(tar_path, 'rb') as f:
+            return _extract(_StreamReader(f), tar_uri, unzip_base)
+    except tarfile.TarError as e:
+        rmtree(unzip_base)
+        raise InvalidTarRepository(
+            'Tar repository {} is not a valid tar archive: {}'.format(
+                tar_uri, e
+            )
+        )
+    except BaseException:
+        rmtree(unzip_base)
+        raise
@@ -3,16 +3,17 @@
 """Helper functions for working with version control systems."""
 
 from __future__ import unicode_literals
+import hashlib
 import logging
 import os
+import re
 import subprocess
 
-from whichcraft import which
-
+from .config import get_cache_dir
 from .exceptions import (
     RepositoryNotFound, RepositoryCloneFailed, UnknownRepoType, VCSNotInstalled
 )
-from .utils import make_sure_path_exists, prompt_and_delete
+from .utils import make_sure_path_exists, prompt_and_delete, rmtree
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,9 @@ BRANCH_ERRORS = [
     'unknown revision',
 ]
 
+# Checkouts that may name a commit, which never changes once fetched.
+COMMIT_ID_REGEX = re.compile(r'^[0-9a-f]{7,40}$')
+
 
 def identify_repo(repo_url):
     """Determine if `repo_url` should be treated as a URL to a git or hg repo.
@@ -53,10 +57,170 @@ def is_vcs_installed(repo_type):
 
     :param repo_type:
     """
+    from whichcraft import which
+
     return bool(which(repo_type))
 
 
-def clone(repo_url, checkout=None, clone_to_dir='.', no_input=False):
+def get_mirror_dir(config_dict):
+    """Return the git mirror directory enabled in the user config, or None."""
+    if not config_dict['git_mirror_cache']:
+        return None
+    return get_cache_dir(config_dict, 'git')
+
+
+def _mirror_has_commit(mirror, checkout):
+    """Check whether `checkout` is a commit ID already in `mirror`."""
+    if checkout is None or not COMMIT_ID_REGEX.match(checkout):
+        return False
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--verify', '--quiet',
+             '{}^{{commit}}'.format(checkout)],
+            cwd=mirror,
+            stderr=subprocess.STDOUT,
+        )
+    except subprocess.CalledProcessError:
+        return False
+    # A branch or tag may look like a commit ID, but it resolves to another
+    # commit, which may move.
+    return commit.decode('utf-8').strip().startswith(checkout)
+
+
+def update_mirror(repo_url, mirror_dir, checkout=None):
+    """Create or update the bare mirror of a git repo.
+
+    The first call clones a mirror of the repo into `mirror_dir`, later calls
+    only fetch what changed since. The network is not used at all if
+    `checkout` is a commit ID already in the mirror.
+
+    :param repo_url: Git repo URL.
+    :param mirror_dir: The directory keeping a mirror per repo URL.
+    :param checkout: The branch, tag or commit ID that is going to be
+        checked out from the mirror.
+    :returns: Path to the mirror.
+    """
+    mirror_dir = os.path.abspath(os.path.expanduser(mirror_dir))
+    make_sure_path_exists(mirror_dir)
+
+    tail = os.path.split(repo_url)[1].rsplit('.git')[0]
+    url_hash = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:12]
+    mirror = os.path.join(mirror_dir, '{}-{}.git'.format(tail, url_hash))
+
+    if not os.path.isdir(mirror):
+        logger.debug('Creating mirror {} of {}'.format(mirror, repo_url))
+        subprocess.check_output(
+            ['git', 'clone', '--mirror', repo_url, mirror],
+            stderr=subprocess.STDOUT,
+        )
+        # Let working copies be cloned without the contents of old commits
+        for option in ('uploadpack.allowFilter',
+                       'uploadpack.allowAnySHA1InWant'):
+            subprocess.check_output(
+                ['git', 'config', option, 'true'],
+                cwd=mirror,
+                stderr=subprocess.STDOUT,
+            )
+    elif _mirror_has_commit(mirror, checkout):
+        logger.debug('Commit {} is already in {}'.format(checkout, mirror))
+    else:
+        logger.debug('Fetching {} into {}'.format(repo_url, mirror))
+        subprocess.check_output(
+            ['git', 'fetch', '--prune', 'origin'],
+            cwd=mirror,
+            stderr=subprocess.STDOUT,
+        )
+    return mirror
+
+
+def _is_ref(mirror, checkout):
+    """Check whether `checkout` is a branch or tag of `mirror`."""
+    for prefix in ('refs/heads/', 'refs/tags/'):
+        try:
+            subprocess.check_output(
+                ['git', 'rev-parse', '--verify', '--quiet',
+                 prefix + checkout],
+                cwd=mirror,
+                stderr=subprocess.STDOUT,
+            )
+            return True
+        except subprocess.CalledProcessError:
+            pass
+    return False
+
+
+def _is_mirror_clone(repo_dir, mirror):
+    """Check whether `repo_dir` is an unmodified working copy cloned from
+    `mirror` by `clone_from_mirror`.
+    """
+    if not os.path.isdir(os.path.join(repo_dir, '.git')):
+        return False
+    try:
+        cloned_from = subprocess.check_output(
+            ['git', 'config', '--get', 'cookiecutter.mirror'],
+            cwd=repo_dir,
+            stderr=subprocess.STDOUT,
+        )
+        status = subprocess.check_output(
+            ['git', 'status', '--porcelain'],
+            cwd=repo_dir,
+            stderr=subprocess.STDOUT,
+        )
+    except subprocess.CalledProcessError:
+        return False
+    return cloned_from.decode('utf-8').strip() == mirror and not status.strip()
+
+
+def clone_from_mirror(mirror, repo_url, repo_dir, checkout=None):
+    """Clone a working copy of a git repo from its mirror.
+
+    Only what the working copy needs is copied from the mirror: the last
+    commit of a branch or tag, or for other checkouts, such as commit IDs,
+    the history without the contents of the commits not checked out. The
+    ``origin`` remote of the working copy then points to `repo_url`.
+
+    :param mirror: Path to the mirror, see `update_mirror()`.
+    :param repo_url: Git repo URL the mirror is a mirror of.
+    :param repo_dir: The directory to clone to.
+    :param checkout: The branch, tag or commit ID to checkout.
+    """
+    mirror_url = 'file://' + mirror.replace(os.sep, '/')
+    if not mirror_url.startswith('file:///'):
+        # A Windows path with its drive letter
+        mirror_url = 'file:///' + mirror_url[len('file://'):]
+    if checkout is None or _is_ref(mirror, checkout):
+        clone_args = [mirror_url, repo_dir]
+        if checkout is not None:
+            clone_args = ['--branch', checkout] + clone_args
+        subprocess.check_output(
+            ['git', 'clone', '--depth', '1'] + clone_args,
+            stderr=subprocess.STDOUT,
+        )
+    else:
+        subprocess.check_output(
+            ['git', 'clone', '--filter=blob:none', '--no-checkout',
+             mirror_url, repo_dir],
+            stderr=subprocess.STDOUT,
+        )
+        subprocess.check_output(
+            ['git', 'checkout', checkout],
+            cwd=repo_dir,
+            stderr=subprocess.STDOUT,
+        )
+    subprocess.check_output(
+        ['git', 'remote', 'set-url', 'origin', repo_url],
+        cwd=repo_dir,
+        stderr=subprocess.STDOUT,
+    )
+    subprocess.check_output(
+        ['git', 'config', 'cookiecutter.mirror', mirror],
+        cwd=repo_dir,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def clone(repo_url, checkout=None, clone_to_dir='.', no_input=False,
+          mirror_dir=None):
     """Clone a repo to the current directory.
 
     :param repo_url: Repo URL of unknown type.
@@ -64,6 +228,11 @@ def clone(repo_url, checkout=None, clone_to_dir='.', no_input=False):
     :param clone_to_dir: The directory to clone to.
                          Defaults to the current directory.
     :param no_input: Suppress all user prompts when calling via API.
+    :param mirror_dir: The directory to keep git mirrors in, see
+        `update_mirror()`. Git repos are cloned from their local mirror
+        rather than over the network when given, see `clone_from_mirror()`,
+        and an unmodified working copy left by a previous clone from the
+        mirror is replaced without prompting.
     """
     # Ensure that clone_to_dir exists
     clone_to_dir = os.path.expanduser(clone_to_dir)
@@ -86,13 +255,26 @@ def clone(repo_url, checkout=None, clone_to_dir='.', no_input=False):
         repo_dir = os.path.normpath(os.path.join(clone_to_dir, tail))
     logger.debug('repo_dir is {0}'.format(repo_dir))
 
-    if os.path.isdir(repo_dir):
-        clone = prompt_and_delete(repo_dir, no_input=no_input)
-    else:
-        clone = True
+    try:
+        mirror = None
+        if mirror_dir is not None and repo_type == 'git':
+            mirror = update_mirror(repo_url, mirror_dir, checkout)
 
-    if clone:
-        try:
+        if not os.path.isdir(repo_dir):
+            clone = True
+        elif mirror is not None and _is_mirror_clone(repo_dir, mirror):
+            # Nothing to lose, and cheap to clone again
+            logger.debug('Replacing {} with a new clone of {}'.format(
+                repo_dir, mirror
+            ))
+            rmtree(repo_dir)
+            clone = True
+        else:
+            clone = prompt_and_delete(repo_dir, no_input=no_input)
+
+        if clone and mirror is not None:
+            clone_from_mirror(mirror, repo_url, repo_dir, checkout)
+        elif clone:
             subprocess.check_output(
                 [repo_type, 'clone', repo_url],
                 cwd=clone_to_dir,
@@ -104,18 +286,18 @@ def clone(repo_url, checkout=None, clone_to_dir='.', no_input=False):
                     cwd=repo_dir,
                     stderr=subprocess.STDOUT,
                 )
-        except subprocess.CalledProcessError as clone_error:
-            output = clone_error.output.decode('utf-8')
-            if 'not found' in output.lower():
-                raise RepositoryNotFound(
-                    'The repository {} could not be found, '
-                    'have you made a typo?'.format(repo_url)
-                )
-            if any(error in output for error in BRANCH_ERRORS):
-                raise RepositoryCloneFailed(
-                    'The {} branch of repository {} could not found, '
-                    'have you made a typo?'.format(checkout, repo_url)
-                )
-            raise
+    except subprocess.CalledProcessError as clone_error:
+        output = clone_error.output.decode('utf-8')
+        if 'not found' in output.lower():
+            raise RepositoryNotFound(
+                'The repository {} could not be found, '
+                'have you made a typo?'.format(repo_url)
+            )
+        if any(error in output for error in BRANCH_ERRORS):
+            raise RepositoryCloneFailed(
+                'The {} branch of repository {} could not found, '
+                'have you made a typo?'.format(checkout, repo_url)
+            )
+        raise
 
     return repo_dir
@@ -1,8 +1,14 @@
 from __future__ import absolute_import
 
+import contextlib
+import errno
+import hashlib
+import json
+import logging
 import os
-import requests
 import tempfile
+import threading
+import time
 from zipfile import ZipFile
 try:
     # BadZipfile was renamed to BadZipFile in Python 3.2.
@@ -10,12 +16,408 @@ try:
 except ImportError:
     from zipfile import BadZipfile as BadZipFile
 
+from .config import get_cache_dir
 from .exceptions import InvalidZipRepository
+from .find import is_template_dir_name
 from .prompt import read_repo_password
+from .source import write_zip_source
 from .utils import make_sure_path_exists, prompt_and_delete
 
+logger = logging.getLogger(__name__)
 
-def unzip(zip_uri, is_url, clone_to_dir='.', no_input=False, password=None):
+# Size of the buffers a download is streamed to disk with, in bytes.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds to wait for the server to respond or to send more data.
+DOWNLOAD_TIMEOUT = 60
+
+# Attempts made to complete a download interrupted by the network.
+DOWNLOAD_ATTEMPTS = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the `requests.Session` shared by all downloads.
+
+    Sharing it keeps connections to a host open across downloads.
+    """
+    global _session
+    import requests
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+class TeeReader(object):
+    """Read a file object, copying everything read to another one."""
+
+    def __init__(self, fileobj, copy):
+        self.fileobj = fileobj
+        self.copy = copy
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if data:
+            self.copy.write(data)
+        return data
+
+    def drain(self):
+        """Read the rest of the file object, e.g. to complete its copy."""
+        while self.read(DOWNLOAD_CHUNK_SIZE):
+            pass
+
+
+def _read_validator(validator_path):
+    try:
+        with open(validator_path) as f:
+            return f.read()
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+    return None
+
+
+def download_file(url, path, headers=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                  timeout=DOWNLOAD_TIMEOUT, attempts=DOWNLOAD_ATTEMPTS,
+                  error_class=InvalidZipRepository):
+    """Download `url` to `path`, resuming an earlier interrupted download.
+
+    The response is streamed into ``path + '.part'``, which is only renamed
+    to `path` once complete, so `path` never holds a partial download. A
+    partial download left behind, by this call or an earlier one, is resumed
+    with a ``Range`` request if the server still has the same version of the
+    file, as reported by its ``ETag`` or ``Last-Modified`` header.
+
+    :param url: URL to download.
+    :param path: Path to write the downloaded file to.
+    :param headers: Additional request headers, e.g. for a conditional
+        request.
+    :param chunk_size: Size of the buffers the download is written with.
+    :param timeout: Seconds to wait for the server to respond or send data.
+    :param attempts: Number of times to try completing the download when
+        the connection fails.
+    :param error_class: Exception raised when the server answers with an
+        error.
+    :return: The response. Nothing is written for a 304 response.
+    """
+    import requests
+
+    part_path = path + '.part'
+    validator_path = part_path + '.validator'
+    session = get_session()
+
+    for attempt in range(1, attempts + 1):
+        request_headers = dict(headers or {})
+        validator = _read_validator(validator_path)
+        offset = 0
+        if validator and os.path.exists(part_path):
+            offset = os.path.getsize(part_path)
+            request_headers['Range'] = 'bytes={}-'.format(offset)
+            request_headers['If-Range'] = validator
+
+        start = time.time()
+        received = 0
+        try:
+            r = session.get(
+                url, headers=request_headers, stream=True, timeout=timeout
+            )
+            try:
+                if r.status_code == 304:
+                    return r
+                if r.status_code == 416 and offset:
+                    # The partial download is no longer valid, start over
+                    os.remove(part_path)
+                    continue
+                try:
+                    r.raise_for_status()
+                except requests.exceptions.HTTPError as e:
+                    raise error_class(
+                        'Unable to download {}: {}'.format(url, e)
+                    )
+
+                if r.status_code == 206 and offset:
+                    logger.debug('Resuming download of {} at byte {}'.format(
+                        url, offset
+                    ))
+                    mode = 'ab'
+                else:
+                    mode = 'wb'
+                    validator = (
+                        r.headers.get('ETag') or r.headers.get('Last-Modified')
+                    )
+                    if validator:
+                        with open(validator_path, 'w') as f:
+                            f.write(validator)
+                    elif os.path.exists(validator_path):
+                        os.remove(validator_path)
+
+                with open(part_path, mode) as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+            finally:
+                r.close()
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout):
+            if attempt == attempts:
+                raise
+            logger.debug(
+                'Download of {} interrupted, retrying'.format(url),
+                exc_info=True
+            )
+            continue
+
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(part_path, path)
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+
+        elapsed = max(time.time() - start, 1e-6)
+        logger.debug(
+            'Downloaded {} bytes of {} in {:.2f}s ({:.2f} MiB/s)'.format(
+                received, url, elapsed, received / elapsed / (1024 * 1024)
+            )
+        )
+        return r
+
+    # Every attempt ran into a partial download the server would not resume
+    raise error_class('Unable to download {}'.format(url))
+
+
+class ZipCache(object):
+    """HTTP cache of downloaded zip and tar archives.
+
+    Archives are stored by the SHA-256 of their content, so the same archive
+    served from several URLs is only kept once. Next to them, the ``ETag``
+    and ``Last-Modified`` headers of every URL are kept, so an unchanged
+    archive is revalidated with a conditional request instead of being
+    downloaded again. Once the total size of the archives exceeds `max_size`
+    bytes the ones used longest ago are removed.
+    """
+
+    suffixes = ('.zip', '.tar')
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        """Initialize the cache with its directory and size bound in bytes."""
+        self.directory = directory
+        self.max_size = max_size
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.urls_dir = os.path.join(directory, 'urls')
+
+    def _get_key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _get_metadata_filename(self, url):
+        return os.path.join(self.urls_dir, self._get_key(url) + '.json')
+
+    def _get_object_filename(self, digest, suffix):
+        return os.path.join(self.objects_dir, digest + suffix)
+
+    def _load_metadata(self, url):
+        try:
+            with open(self._get_metadata_filename(url)) as f:
+                return json.load(f)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+        except ValueError:
+            logger.debug('Ignoring corrupt zip cache metadata of {}'.format(
+                url
+            ))
+        return None
+
+    def _dump_metadata(self, url, metadata):
+        fd, tmp_filename = tempfile.mkstemp(suffix='.tmp', dir=self.urls_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(metadata, f)
+        os.rename(tmp_filename, self._get_metadata_filename(url))
+
+    def _get_conditional_headers(self, url, suffix):
+        """Return the headers revalidating the cached archive of `url`."""
+        make_sure_path_exists(self.objects_dir)
+        make_sure_path_exists(self.urls_dir)
+
+        metadata = self._load_metadata(url)
+        headers = {}
+        if metadata and os.path.exists(
+                self._get_object_filename(metadata['sha256'], suffix)):
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+        return metadata, headers
+
+    def _add(self, url, response, download_path, suffix):
+        """Store a downloaded archive of `url` and the validators of it."""
+        digest, zip_path = self._store(download_path, suffix)
+        self._dump_metadata(url, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest,
+        })
+        self.evict(keep=zip_path)
+        return zip_path
+
+    def fetch(self, url, suffix='.zip', error_class=InvalidZipRepository):
+        """Return the path to the cached archive of `url`, updating it first.
+
+        :param url: URL of the archive.
+        :param suffix: Suffix of the cached archive, one of `suffixes`.
+        :param error_class: Exception raised when the archive cannot be
+            downloaded.
+        """
+        metadata, headers = self._get_conditional_headers(url, suffix)
+        download_path = os.path.join(
+            self.objects_dir, self._get_key(url) + '.download'
+        )
+        r = download_file(
+            url, download_path, headers=headers, error_class=error_class
+        )
+        if headers and r.status_code == 304:
+            logger.debug('Archive {} is unchanged'.format(url))
+            zip_path = self._get_object_filename(metadata['sha256'], suffix)
+            os.utime(zip_path, None)
+            return zip_path
+
+        return self._add(url, r, download_path, suffix)
+
+    @contextlib.contextmanager
+    def open(self, url, suffix='.zip', error_class=InvalidZipRepository):
+        """Read the archive of `url` while it is downloaded to the cache.
+
+        Yields a file object reading the cached archive if it is unchanged,
+        and otherwise one reading the response, which copies what it reads
+        to the cache. The rest of the response is read when the block exits,
+        and the archive is only added to the cache if the block succeeds.
+        Unlike `fetch`, an interrupted download is not resumed.
+
+        :param url: URL of the archive.
+        :param suffix: Suffix of the cached archive, one of `suffixes`.
+        :param error_class: Exception raised when the archive cannot be
+            downloaded.
+        """
+        import requests
+
+        metadata, headers = self._get_conditional_headers(url, suffix)
+        download_path = os.path.join(
+            self.objects_dir, self._get_key(url) + '.download'
+        )
+        r = get_session().get(
+            url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+        )
+        try:
+            if headers and r.status_code == 304:
+                logger.debug('Archive {} is unchanged'.format(url))
+                zip_path = self._get_object_filename(
+                    metadata['sha256'], suffix
+                )
+                os.utime(zip_path, None)
+                with open(zip_path, 'rb') as f:
+                    yield f
+                return
+
+            try:
+                r.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                raise error_class('Unable to download {}: {}'.format(url, e))
+            r.raw.decode_content = True
+            try:
+                with open(download_path, 'wb') as f:
+                    reader = TeeReader(r.raw, f)
+                    yield reader
+                    reader.drain()
+            except BaseException:
+                if os.path.exists(download_path):
+                    os.remove(download_path)
+                raise
+        finally:
+            r.close()
+
+        self._add(url, r, download_path, suffix)
+
+    def _store(self, download_path, suffix):
+        """Move a downloaded archive to the store, keyed by its content."""
+        sha256 = hashlib.sha256()
+        with open(download_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        zip_path = self._get_object_filename(digest, suffix)
+        if os.path.exists(zip_path):
+            os.remove(download_path)
+            os.utime(zip_path, None)
+        else:
+            os.rename(download_path, zip_path)
+        return digest, zip_path
+
+    def _entries(self):
+        for filename in os.listdir(self.objects_dir):
+            if not filename.endswith(self.suffixes):
+                continue
+            path = os.path.join(self.objects_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+    def evict(self, keep=None):
+        """Remove the least recently used archives beyond `max_size`.
+
+        :param keep: Path to an archive which is never removed, e.g. the one
+            which is about to be unpacked.
+        """
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            logger.debug('Evicted zip cache entry {}'.format(path))
+
+
+def get_zip_cache(config_dict):
+    """Return the zip cache enabled in the user config, or None."""
+    if not config_dict['zip_cache']:
+        return None
+    return ZipCache(
+        get_cache_dir(config_dict, 'zip'),
+        max_size=config_dict['zip_cache_max_size'],
+    )
+
+
+def _find_template_dir(zip_file, repo_dir):
+    """Return the name of the project template dir in a zip repository.
+
+    :param zip_file: `ZipFile` of the repository.
+    :param repo_dir: Name of the top-level dir of the archive, ending with a
+        slash.
+    :returns: The name without trailing slash, or None if there is none.
+    """
+    for name in zip_file.namelist():
+        if not name.startswith(repo_dir):
+            continue
+        child, sep, _ = name[len(repo_dir):].partition('/')
+        if sep and is_template_dir_name(child):
+            return repo_dir + child
+    return None
+
+
+def unzip(zip_uri, is_url, clone_to_dir='.', no_input=False, password=None,
+          zip_cache=None, extract_template=True):
     """Download and unpack a zipfile at a given URI.
 
     This will download the zipfile to the cookiecutter repository,
@@ -27,12 +429,21 @@ def unzip(zip_uri, is_url, clone_to_dir='.', no_input=False, password=None):
         to put the archive into.
     :param no_input: Supress any prompts
     :param password: The password to use when unpacking the repository.
+    :param zip_cache: `ZipCache` to download URLs through. Without it a URL
+        is downloaded into `clone_to_dir` on every call.
+    :param extract_template: Whether to extract the project template too.
+        If False, only the rest of the repository is extracted, and the
+        project template is read straight from the archive by
+        `generate_files`, see `cookiecutter.source`. Password protected
+        archives are always extracted completely.
     """
     # Ensure that clone_to_dir exists
     clone_to_dir = os.path.expanduser(clone_to_dir)
     make_sure_path_exists(clone_to_dir)
 
-    if is_url:
+    if is_url and zip_cache is not None:
+        zip_path = zip_cache.fetch(zip_uri)
+    elif is_url:
         # Build the name of the cached zipfile,
         # and prompt to delete if it already exists.
         identifier = zip_uri.rsplit('/', 1)[1]
@@ -45,11 +456,7 @@ def unzip(zip_uri, is_url, clone_to_dir='.', no_input=False, password=None):
 
         if download:
             # (Re) download the zipfile
-            r = requests.get(zip_uri, stream=True)
-            with open(zip_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:  # filter out keep-alive new chunks
-                        f.write(chunk)
+            download_file(zip_uri, zip_path)
     else:
         # Just use the local zipfile as-is.
         zip_path = os.path.abspath(zip_uri)
@@ -78,6 +485,19 @@ def unzip(zip_uri, is_url, clone_to_dir='.', no_input=False, password=None):
         unzip_base = tempfile.mkdtemp()
         unzip_path = os.path.join(unzip_base, project_name)
 
+        encrypted = any(info.flag_bits & 0x1 for info in zip_file.infolist())
+        template_dir = None
+        if not extract_template and not encrypted:
+            template_dir = _find_template_dir(zip_file, first_filename)
+        if template_dir is not None:
+            zip_file.extractall(path=unzip_base, members=[
+                name for name in zip_file.namelist()
+                if not name.startswith(template_dir + '/')
+            ])
+            make_sure_path_exists(os.path.join(unzip_base, template_dir))
+            write_zip_source(unzip_path, zip_path, template_dir)
+            return unzip_path
+
         # Extract the zip file into the temporary directory
         try:
             zip_file.extractall(path=unzip_base)
@@ -59,6 +59,9 @@ setup(
     },
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        'zstd': ['zstandard'],
+    },
     license='BSD',
     zip_safe=False,
     classifiers=[
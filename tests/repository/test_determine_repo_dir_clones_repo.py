@@ -38,6 +38,8 @@ def test_zipfile_unzip(mocker, template, is_url, user_config_data):
         clone_to_dir=user_config_data['cookiecutters_dir'],
         no_input=True,
         password=None,
+        zip_cache=None,
+        extract_template=False,
     )
 
     assert os.path.isdir(project_dir)
@@ -45,6 +47,42 @@ def test_zipfile_unzip(mocker, template, is_url, user_config_data):
     assert 'tests/fake-repo-tmpl' == project_dir
 
 
+@pytest.mark.parametrize('template, is_url', [
+    ('/path/to/template.tar.gz', False),
+    ('https://example.com/path/to/template.tar.xz', True),
+])
+def test_tarfile_untar(mocker, template, is_url, user_config_data):
+    """`untar()` should be called with correct args when
+    `determine_repo_dir()` is passed a tar archive, or a URL
+    to a tar archive.
+    """
+
+    mock_untar = mocker.patch(
+        'cookiecutter.repository.untar',
+        return_value='tests/fake-repo-tmpl',
+        autospec=True
+    )
+
+    project_dir, cleanup = repository.determine_repo_dir(
+        template,
+        abbreviations={},
+        clone_to_dir=user_config_data['cookiecutters_dir'],
+        checkout=None,
+        no_input=True,
+    )
+
+    mock_untar.assert_called_once_with(
+        tar_uri=template,
+        is_url=is_url,
+        clone_to_dir=user_config_data['cookiecutters_dir'],
+        no_input=True,
+        zip_cache=None,
+    )
+
+    assert cleanup
+    assert 'tests/fake-repo-tmpl' == project_dir
+
+
 @pytest.fixture
 def template_url():
     """URL to example Cookiecutter template on GitHub.
@@ -78,7 +116,8 @@ def test_repository_url_should_clone(
         repo_url=template_url,
         checkout=None,
         clone_to_dir=user_config_data['cookiecutters_dir'],
-        no_input=True
+        no_input=True,
+        mirror_dir=None
     )
 
     assert os.path.isdir(project_dir)
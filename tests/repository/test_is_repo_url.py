@@ -3,7 +3,7 @@ import pytest
 
 from cookiecutter.config import BUILTIN_ABBREVIATIONS
 from cookiecutter.repository import (
-    is_zip_file, is_repo_url, expand_abbreviations
+    is_tar_file, is_zip_file, is_repo_url, expand_abbreviations
 )
 
 
@@ -21,6 +21,19 @@ def test_is_zip_file(zipfile):
     assert is_zip_file(zipfile) is True
 
 
+@pytest.mark.parametrize('tar_file', [
+    '/path/to/template.tar',
+    '/path/to/template.TGZ',
+    'https://example.com/path/to/template.tar.gz',
+    'https://example.com/path/to/template.tar.bz2',
+    'https://example.com/path/to/template.tar.xz',
+    'https://example.com/path/to/template.tar.zst',
+])
+def test_is_tar_file(tar_file):
+    assert is_tar_file(tar_file) is True
+    assert is_zip_file(tar_file) is False
+
+
 @pytest.fixture(params=[
     'gitolite@server:team/repo',
     'git@github.com:audreyr/cookiecutter.git',
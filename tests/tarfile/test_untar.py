@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import tarfile
+import tempfile
+
+import pytest
+
+from cookiecutter import tarfile as cc_tarfile
+from cookiecutter.exceptions import InvalidTarRepository
+from cookiecutter.zipfile import ZipCache
+
+TAR_URL = 'https://example.com/path/to/fake-repo-tmpl.tar.gz'
+
+
+def make_tar(path, mode='w:gz', repo_dir='tests/fake-repo-tmpl',
+             arcname='fake-repo-tmpl'):
+    with tarfile.open(path, mode) as tar:
+        tar.add(repo_dir, arcname=arcname)
+    return path
+
+
+def assert_is_fake_repo(output_dir):
+    assert output_dir.startswith(tempfile.gettempdir())
+    assert os.path.basename(output_dir) == 'fake-repo-tmpl'
+    assert os.path.isfile(os.path.join(output_dir, 'cookiecutter.json'))
+
+
+@pytest.mark.parametrize('mode, extension', [
+    ('w', 'tar'),
+    ('w:gz', 'tar.gz'),
+    ('w:bz2', 'tar.bz2'),
+    ('w:xz', 'tar.xz'),
+])
+def test_untar_local_file(tmpdir, mode, extension):
+    tar_path = make_tar(str(tmpdir.join('repo.' + extension)), mode)
+
+    output_dir = cc_tarfile.untar(
+        tar_path, is_url=False, clone_to_dir=str(tmpdir.mkdir('clone'))
+    )
+
+    assert_is_fake_repo(output_dir)
+
+
+def test_untar_zstd_file(tmpdir):
+    zstandard = pytest.importorskip('zstandard')
+    tar_path = make_tar(str(tmpdir.join('repo.tar')), 'w')
+    zst_path = str(tmpdir.join('repo.tar.zst'))
+    with open(tar_path, 'rb') as src, open(zst_path, 'wb') as dst:
+        dst.write(zstandard.ZstdCompressor().compress(src.read()))
+
+    output_dir = cc_tarfile.untar(
+        zst_path, is_url=False, clone_to_dir=str(tmpdir.mkdir('clone'))
+    )
+
+    assert_is_fake_repo(output_dir)
+
+
+def test_untar_url_streams_and_keeps_archive(mocker, tmpdir):
+    with open(make_tar(str(tmpdir.join('repo.tar.gz'))), 'rb') as f:
+        content = f.read()
+    response = mocker.MagicMock()
+    response.raw = io.BytesIO(content)
+    mocker.patch('requests.Session.get', return_value=response)
+    mock_prompt_and_delete = mocker.patch(
+        'cookiecutter.tarfile.prompt_and_delete', autospec=True
+    )
+    clone_to_dir = tmpdir.mkdir('clone')
+
+    output_dir = cc_tarfile.untar(
+        TAR_URL, is_url=True, clone_to_dir=str(clone_to_dir)
+    )
+
+    assert_is_fake_repo(output_dir)
+    assert clone_to_dir.join('fake-repo-tmpl.tar.gz').read_binary() == content
+    assert os.listdir(str(clone_to_dir)) == ['fake-repo-tmpl.tar.gz']
+    assert not mock_prompt_and_delete.called
+
+
+def test_untar_url_through_cache(mocker, tmpdir):
+    with open(make_tar(str(tmpdir.join('repo.tar.gz'))), 'rb') as f:
+        content = f.read()
+
+    def get(url, headers=None, stream=False, timeout=None):
+        response = mocker.MagicMock(headers={'ETag': '"v1"'})
+        if headers:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(content)
+        return response
+
+    mock_get = mocker.patch('requests.Session.get', side_effect=get)
+    zip_cache = ZipCache(str(tmpdir.join('zip')))
+
+    for i in range(2):
+        output_dir = cc_tarfile.untar(
+            TAR_URL,
+            is_url=True,
+            clone_to_dir=str(tmpdir.mkdir('clone-{}'.format(i))),
+            zip_cache=zip_cache
+        )
+        assert_is_fake_repo(output_dir)
+
+    [tar_name] = os.listdir(zip_cache.objects_dir)
+    assert tar_name.endswith('.tar')
+    with open(os.path.join(zip_cache.objects_dir, tar_name), 'rb') as f:
+        assert f.read() == content
+    assert mock_get.call_count == 2
+
+
+def test_untar_without_top_level_dir(tmpdir):
+    tar_path = make_tar(
+        str(tmpdir.join('repo.tar.gz')),
+        repo_dir='tests/fake-repo-tmpl/cookiecutter.json',
+        arcname='cookiecutter.json'
+    )
+
+    with pytest.raises(InvalidTarRepository) as err:
+        cc_tarfile.untar(tar_path, is_url=False, clone_to_dir=str(tmpdir))
+
+    assert 'top-level directory' in str(err.value)
+
+
+def test_untar_refuses_paths_outside_top_level_dir(tmpdir):
+    tar_path = str(tmpdir.join('repo.tar.gz'))
+    with tarfile.open(tar_path, 'w:gz') as tar:
+        tar.add('tests/fake-repo-tmpl', arcname='fake-repo-tmpl',
+                recursive=False)
+        tar.add('tests/fake-repo-tmpl/cookiecutter.json',
+                arcname='fake-repo-tmpl/../evil.json')
+
+    with pytest.raises(InvalidTarRepository) as err:
+        cc_tarfile.untar(tar_path, is_url=False, clone_to_dir=str(tmpdir))
+
+    assert 'outside of its top-level directory' in str(err.value)
+    assert not os.path.exists(os.path.join(tempfile.gettempdir(), 'evil.json'))
+
+
+@pytest.mark.parametrize('content', [b'', b'This is not a tar archive'])
+def test_untar_invalid_archive(tmpdir, content):
+    tar_path = tmpdir.join('repo.tar.gz')
+    tar_path.write_binary(content)
+
+    with pytest.raises(InvalidTarRepository):
+        cc_tarfile.untar(str(tar_path), is_url=False, clone_to_dir=str(tmpdir))
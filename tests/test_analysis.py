@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_analysis
+-------------
+
+Tests for `cookiecutter.analysis` module.
+"""
+
+from __future__ import unicode_literals
+import os
+
+import pytest
+from jinja2 import Environment
+
+from cookiecutter import analysis, exceptions, generate, prompt
+from cookiecutter.config import DEFAULT_CONFIG
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.source import get_template_source
+
+TEMPLATE_FILES = {
+    'README.rst': '{{ cookiecutter.project_name }}\n',
+    'LICENSE': "{% include 'license.txt' %}\n",
+    'license.txt': '{{ cookiecutter.author }}\n',
+    'optional.txt': (
+        '{% if cookiecutter.email is defined %}{{ cookiecutter.email }}'
+        '{% endif %}{{ cookiecutter.year | default(2018) }}\n'
+    ),
+    os.path.join('{{ cookiecutter.package }}', '__init__.py'): '',
+}
+
+
+@pytest.mark.parametrize('template, variables', [
+    ('{{ cookiecutter.project_name }}', {'cookiecutter.project_name'}),
+    ("{{ cookiecutter['author'] }}", {'cookiecutter.author'}),
+    ('{{ cookiecutter.a }}{{ cookiecutter.b.c }}',
+     {'cookiecutter.a', 'cookiecutter.b'}),
+    ('{{ cookiecutter | length }}', {'cookiecutter'}),
+    ('{{ cookiecutter[key] }}', {'cookiecutter'}),
+    ('{% set c = cookiecutter %}{{ c.a }}', {'cookiecutter'}),
+    ("{{ cookiecutter.get('license', 'none') }}", {'cookiecutter'}),
+    ('{% for k, v in cookiecutter.items() %}{% endfor %}', {'cookiecutter'}),
+    ("{{ cookiecutter['items'] }}", {'cookiecutter.items'}),
+    ('{{ loop_var }}{% for x in range(3) %}{{ x }}{% endfor %}', set()),
+    ('Plain text', set()),
+])
+def test_find_variables(template, variables):
+    ast = Environment().parse(template)
+    assert analysis.find_variables(ast) == variables
+
+
+@pytest.mark.parametrize('template, optional', [
+    ('{% if cookiecutter.a is defined %}{{ cookiecutter.a }}{% endif %}',
+     {'cookiecutter.a'}),
+    ('{{ cookiecutter.a | default("x") }}{{ cookiecutter.b | d }}',
+     {'cookiecutter.a', 'cookiecutter.b'}),
+    ('{{ cookiecutter.a | lower }}', set()),
+    ("{% if cookiecutter.use_docker == 'y' %}{{ cookiecutter.docker_image }}"
+     "{% endif %}",
+     {'cookiecutter.docker_image'}),
+    ('{% if cookiecutter.a %}{% elif cookiecutter.b %}{{ cookiecutter.c }}'
+     '{% else %}{{ cookiecutter.d }}{% endif %}',
+     {'cookiecutter.b', 'cookiecutter.c', 'cookiecutter.d'}),
+    ('{% for x in cookiecutter.a %}{{ cookiecutter.b }}{% endfor %}',
+     {'cookiecutter.b'}),
+    ('{{ cookiecutter.a if cookiecutter.b else cookiecutter.c }}',
+     {'cookiecutter.a', 'cookiecutter.c'}),
+    ('{% if cookiecutter.a %}{{ cookiecutter.b }}{% endif %}'
+     '{{ cookiecutter.b }}',
+     set()),
+])
+def test_find_optional_variables(template, optional):
+    ast = Environment().parse(template)
+    assert analysis.find_optional_variables(ast) == optional
+
+
+@pytest.fixture
+def repo_dir(tmpdir):
+    repo_dir = tmpdir.mkdir('template')
+    project_template = repo_dir.mkdir('{{ cookiecutter.repo_name }}')
+    for path, contents in TEMPLATE_FILES.items():
+        project_template.join(path).write(contents, ensure=True)
+    repo_dir.join('hooks', 'post_gen_project.py').write(
+        'print("{{ cookiecutter.license }}")\n', ensure=True
+    )
+    return repo_dir
+
+
+def analyze(repo_dir):
+    source = get_template_source(str(repo_dir))
+    env = StrictEnvironment(keep_trailing_newline=True)
+    env.loader = source.get_loader()
+    return analysis.analyze_template(source, str(repo_dir), env)
+
+
+def test_analyze_template(repo_dir):
+    template_analysis = analyze(repo_dir)
+
+    assert template_analysis.files['LICENSE'] == {
+        'path': [],
+        'content': ['cookiecutter.author'],
+        'optional': [],
+    }
+    assert template_analysis.files['optional.txt']['optional'] == [
+        'cookiecutter.email', 'cookiecutter.year'
+    ]
+    assert template_analysis.files[
+        '{{ cookiecutter.package }}/__init__.py'
+    ]['path'] == ['cookiecutter.package']
+    assert template_analysis.hooks == {
+        'post_gen_project.py': {
+            'content': ['cookiecutter.license'],
+            'optional': [],
+        }
+    }
+
+
+def test_analyze_template_root_dir(repo_dir):
+    template_analysis = analyze(repo_dir)
+
+    assert template_analysis.root == {
+        'name': '{{ cookiecutter.repo_name }}',
+        'path': ['cookiecutter.repo_name'],
+    }
+    assert analysis.TemplateAnalysis.from_dict(
+        template_analysis.to_dict()
+    ).root == template_analysis.root
+
+
+def test_get_index(repo_dir):
+    index = analyze(repo_dir).get_index()
+    assert index['cookiecutter.repo_name'] == ['{{ cookiecutter.repo_name }}']
+
+    assert index['cookiecutter.author'] == ['LICENSE', 'license.txt']
+    assert index['cookiecutter.license'] == ['hooks/post_gen_project.py']
+    assert index['cookiecutter.package'] == [
+        '{{ cookiecutter.package }}/__init__.py'
+    ]
+
+
+def test_get_index_of_copy_only_files(repo_dir):
+    index = analyze(repo_dir).get_index(
+        is_copy_only=lambda path: path.endswith('.rst')
+    )
+
+    assert 'cookiecutter.project_name' not in index
+
+
+def test_find_used_keys(repo_dir):
+    cookiecutter_dict = {
+        'project_name': 'Project',
+        'repo_name': '{{ cookiecutter.project_name | lower }}',
+        'author': '{{ cookiecutter.first_name }} Smith',
+        'first_name': 'John',
+        'license': ['MIT', 'BSD'],
+        'package': 'pkg',
+        'unused': 'Not used',
+        '_copy_without_render': [],
+    }
+
+    used_keys = analyze(repo_dir).find_used_keys(
+        cookiecutter_dict, Environment()
+    )
+
+    assert used_keys == set(cookiecutter_dict) - {'unused'}
+
+
+def test_find_used_keys_of_whole_dict():
+    template_analysis = analysis.TemplateAnalysis(
+        {'a': {'path': [], 'content': ['cookiecutter'], 'optional': []}}, {}
+    )
+    assert template_analysis.find_used_keys({'b': 1}, Environment()) is None
+
+
+def test_find_undefined(repo_dir):
+    context = {'cookiecutter': {'project_name': 'Project'}}
+
+    undefined = analyze(repo_dir).find_undefined(context)
+
+    assert undefined == [
+        ('LICENSE', 'cookiecutter.author'),
+        ('license.txt', 'cookiecutter.author'),
+        ('{{ cookiecutter.package }}/__init__.py', 'cookiecutter.package'),
+    ]
+
+
+def test_find_undefined_conditional_variables(repo_dir):
+    repo_dir.join('{{ cookiecutter.repo_name }}', 'Dockerfile').write(
+        "{% if cookiecutter.use_docker == 'y' %}"
+        "FROM {{ cookiecutter.docker_image }}{% endif %}\n"
+    )
+    context = {'cookiecutter': {
+        'project_name': 'Project',
+        'author': 'Audrey',
+        'package': 'pkg',
+        'use_docker': 'n',
+    }}
+    template_analysis = analyze(repo_dir)
+
+    assert template_analysis.find_undefined(context) == []
+    del context['cookiecutter']['use_docker']
+    assert template_analysis.find_undefined(context) == [
+        ('Dockerfile', 'cookiecutter.use_docker'),
+    ]
+
+
+def test_analyze_optional_variable_required_by_include(tmpdir):
+    repo_dir = tmpdir.mkdir('template')
+    project_template = repo_dir.mkdir('{{ cookiecutter.repo_name }}')
+    project_template.join('a.txt').write(
+        "{{ cookiecutter.b }}{% include 'b.txt' %}"
+    )
+    project_template.join('b.txt').write(
+        '{% if cookiecutter.a %}{{ cookiecutter.b }}{% endif %}'
+    )
+
+    template_analysis = analyze(repo_dir)
+
+    assert template_analysis.files['a.txt']['optional'] == []
+    assert template_analysis.files['b.txt']['optional'] == ['cookiecutter.b']
+
+
+def test_get_template_analysis_is_off_by_default(repo_dir):
+    assert analysis.get_template_analysis(
+        DEFAULT_CONFIG, str(repo_dir), {}
+    ) is None
+
+
+def test_get_template_analysis_is_cached(mocker, repo_dir, tmpdir):
+    config_dict = dict(
+        DEFAULT_CONFIG,
+        cache_dir=str(tmpdir.join('cache')),
+        template_analysis=True,
+    )
+    analyze_template = mocker.patch(
+        'cookiecutter.analysis.analyze_template',
+        wraps=analysis.analyze_template
+    )
+
+    first = analysis.get_template_analysis(config_dict, str(repo_dir), {})
+    second = analysis.get_template_analysis(config_dict, str(repo_dir), {})
+
+    assert analyze_template.call_count == 1
+    assert first.to_dict() == second.to_dict()
+    assert len(tmpdir.join('cache', 'analysis').listdir()) == 1
+
+    repo_dir.join('{{ cookiecutter.repo_name }}', 'README.rst').write('New')
+    analysis.get_template_analysis(config_dict, str(repo_dir), {})
+
+    assert analyze_template.call_count == 2
+
+
+def test_prompt_for_config_skips_unused_variables(mocker, repo_dir):
+    read_user_variable = mocker.patch(
+        'cookiecutter.prompt.read_user_variable',
+        side_effect=lambda key, default: 'Prompted'
+    )
+    context = {'cookiecutter': {
+        'project_name': 'Project',
+        'unused': 'Default',
+    }}
+
+    cookiecutter_dict = prompt.prompt_for_config(
+        context, analysis=analyze(repo_dir)
+    )
+
+    assert cookiecutter_dict == {
+        'project_name': 'Prompted',
+        'unused': 'Default',
+    }
+    read_user_variable.assert_called_once_with('project_name', 'Project')
+
+
+def test_generate_files_finds_undefined_variables_first(repo_dir, tmpdir):
+    output_dir = tmpdir.mkdir('output')
+    context = {'cookiecutter': {
+        'repo_name': 'project',
+        'project_name': 'Project',
+        'package': 'pkg',
+    }}
+
+    with pytest.raises(exceptions.UndefinedVariableInTemplate) as err:
+        generate.generate_files(
+            repo_dir=str(repo_dir),
+            context=context,
+            output_dir=str(output_dir),
+            analysis=analyze(repo_dir)
+        )
+
+    assert err.value.message == "Unable to create file 'LICENSE'"
+    assert 'cookiecutter.author' in err.value.error.message
+    assert output_dir.listdir() == []
+
+
+def test_generate_files_with_dict_methods(tmpdir):
+    repo_dir = tmpdir.mkdir('template')
+    repo_dir.join('{{ cookiecutter.repo_name }}', 'LICENSE').write(
+        "{{ cookiecutter.get('license', 'none') }}\n", ensure=True
+    )
+    template_analysis = analyze(repo_dir)
+    context = {'cookiecutter': {'repo_name': 'project'}}
+
+    assert template_analysis.find_used_keys(
+        context['cookiecutter'], Environment()
+    ) is None
+    generate.generate_files(
+        repo_dir=str(repo_dir),
+        context=context,
+        output_dir=str(tmpdir),
+        analysis=template_analysis
+    )
+    assert tmpdir.join('project', 'LICENSE').read() == 'none\n'
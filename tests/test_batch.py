@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_batch
+----------
+
+Tests for `cookiecutter.batch` module.
+"""
+
+from __future__ import unicode_literals
+import io
+import json
+
+import pytest
+from jinja2 import FileSystemLoader
+
+from cookiecutter import batch, exceptions, hooks
+
+
+@pytest.fixture
+def contexts():
+    return [
+        {'repo_name': 'fake-project-a', 'project_name': 'Project A'},
+        {'repo_name': 'fake-project-b', 'project_name': 'Project B'},
+        {'repo_name': 'fake-project-c', 'project_name': 'Project C'},
+    ]
+
+
+@pytest.fixture
+def contexts_file(tmpdir, contexts):
+    contexts_file = tmpdir.join('contexts.jsonl')
+    contexts_file.write_text(
+        '\n'.join(json.dumps(context) for context in contexts) + '\n\n',
+        encoding='utf-8'
+    )
+    return str(contexts_file)
+
+
+def test_load_contexts(contexts_file, contexts):
+    assert list(batch.load_contexts(contexts_file)) == contexts
+
+
+@pytest.mark.parametrize('line', ['{"repo_name": ', '["repo_name"]'])
+def test_load_contexts_invalid_line(tmpdir, line):
+    contexts_file = tmpdir.join('contexts.jsonl')
+    contexts_file.write('{}\n' + line + '\n')
+
+    contexts = batch.load_contexts(str(contexts_file))
+    assert next(contexts) == {}
+    with pytest.raises(exceptions.ContextDecodingException) as err:
+        next(contexts)
+
+    assert 'line 2' in str(err.value).lower()
+
+
+@pytest.mark.usefixtures('clean_system')
+@pytest.mark.parametrize('workers', [None, 3])
+def test_batch(tmpdir, contexts, workers):
+    results = batch.batch(
+        'tests/fake-repo-pre/',
+        contexts,
+        output_dir=str(tmpdir),
+        workers=workers
+    )
+
+    assert [result.index for result in results] == [0, 1, 2]
+    for result, name in zip(results, ['a', 'b', 'c']):
+        assert result.error is None
+        project_dir = tmpdir.join('fake-project-{}'.format(name))
+        assert result.project_dir == str(project_dir)
+        readme = io.open(str(project_dir.join('README.rst')), encoding='utf-8')
+        with readme:
+            assert 'Project {}'.format(name.upper()) in readme.read()
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_batch_does_not_abort_on_failure(tmpdir, contexts):
+    contexts.insert(1, dict(contexts[0]))
+
+    results = batch.batch(
+        'tests/fake-repo-pre/',
+        contexts,
+        output_dir=str(tmpdir)
+    )
+
+    assert [result.error is None for result in results] == [
+        True, False, True, True
+    ]
+    assert isinstance(results[1].error, exceptions.OutputDirExistsException)
+    assert results[1].project_dir is None
+    assert tmpdir.join('fake-project-c').isdir()
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_iter_batch_streams_contexts(mocker, workers):
+    prepared_template = mocker.patch('cookiecutter.batch.PreparedTemplate')
+    prepared_template.return_value.generate.side_effect = \
+        lambda extra_context, **kwargs: extra_context['repo_name']
+    consumed = []
+
+    def contexts():
+        for index in range(100):
+            consumed.append(index)
+            yield {'repo_name': 'project-{}'.format(index)}
+
+    results = batch.iter_batch(
+        'tests/fake-repo-pre/', contexts(), default_config=True,
+        workers=workers
+    )
+    first = next(results)
+
+    assert first.project_dir == 'project-0'
+    assert len(consumed) <= (workers or 1) * batch.BATCH_QUEUE_FACTOR
+    assert [result.index for result in results] == list(range(1, 100))
+    assert prepared_template.return_value.close.called
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_batch_compiles_templates_once(mocker, tmpdir, contexts):
+    get_source = mocker.spy(FileSystemLoader, 'get_source')
+
+    batch.batch('tests/fake-repo-pre/', contexts, output_dir=str(tmpdir))
+
+    loaded = [args[2] for args, _ in get_source.call_args_list]
+    assert loaded == ['README.rst']
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_batch_finds_hooks_once(mocker, tmpdir, contexts):
+    registry = mocker.spy(hooks.HookRegistry, 'from_repo_dir')
+
+    batch.batch('tests/fake-repo-pre/', contexts, output_dir=str(tmpdir))
+
+    assert registry.call_count == 1
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_binary
+-----------
+
+Tests for classifying the files of templates as binary or text.
+"""
+
+from __future__ import unicode_literals
+import os
+import pickle
+
+import pytest
+from jinja2 import FileSystemLoader
+
+from cookiecutter import binary, config, generate
+from cookiecutter.source import FileSystemSource
+
+
+BLOB = bytes(bytearray(range(256))) * 4
+
+
+@pytest.fixture
+def template_dir(tmpdir):
+    template_dir = tmpdir.mkdir('template')
+    template_dir.join('notes.unknown').write('Hello {{ cookiecutter.name }}')
+    template_dir.join('blob.unknown').write_binary(BLOB)
+    template_dir.join('image.png').write('not really an image')
+    return template_dir
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('logo.png', True),
+    ('fonts/Font.OTF', True),
+    ('setup.py', False),
+    ('README.rst', False),
+    ('Makefile', None),
+    ('data.unknown', None),
+])
+def test_classify_by_name(path, expected):
+    assert binary.classify_by_name(path) is expected
+
+
+def test_classify_by_name_binary_extensions():
+    binary_extensions = binary.normalize_extensions(['dat', '.MODEL', '.py'])
+
+    assert binary_extensions == frozenset(['.dat', '.model', '.py'])
+    assert binary.classify_by_name('x.dat', binary_extensions) is True
+    assert binary.classify_by_name('x.model', binary_extensions) is True
+    assert binary.classify_by_name('x.py', binary_extensions) is True
+
+
+@pytest.mark.parametrize('head, expected', [
+    (b'\x89PNG\r\n\x1a\nIHDR', True),
+    (b'\x1f\x8b\x08text', True),
+    (b'%PDF-1.4\nsome text', True),
+    (b'plain text {{ cookiecutter.name }}\n', False),
+    (BLOB, True),
+])
+def test_is_binary_bytes(head, expected):
+    assert binary.is_binary_bytes(head) is expected
+
+
+def test_classify_keeps_text_contents(template_dir):
+    source = FileSystemSource(str(template_dir))
+
+    assert source.classify('notes.unknown') == (
+        False, b'Hello {{ cookiecutter.name }}'
+    )
+    assert source.classify('blob.unknown') == (True, None)
+    assert source.classify('image.png') == (True, None)
+
+
+def test_classify_from_cache(mocker, template_dir, tmpdir):
+    cache_path = str(tmpdir.join('cache', 'binary.json'))
+    source = FileSystemSource(str(template_dir))
+    source.classifier = binary.BinaryClassifier(
+        cache=binary.BinaryCache(cache_path)
+    )
+    assert source.is_binary('blob.unknown')
+    assert not source.is_binary('notes.unknown')
+    source.classifier.cache.save()
+
+    source = FileSystemSource(str(template_dir))
+    source.classifier = binary.BinaryClassifier(
+        cache=binary.BinaryCache(cache_path)
+    )
+    open_file = mocker.spy(source, 'open')
+    assert source.is_binary('blob.unknown')
+    assert not source.is_binary('notes.unknown')
+    assert not open_file.called
+
+    # The cache entry of a file no longer applies once it changes
+    template_dir.join('notes.unknown').write_binary(b'\x00' * 64)
+    os.utime(str(template_dir.join('notes.unknown')), (1, 1))
+    assert source.is_binary('notes.unknown')
+    assert open_file.called
+
+
+def test_binary_cache_max_entries(tmpdir):
+    cache_path = str(tmpdir.join('binary.json'))
+    cache = binary.BinaryCache(cache_path, max_entries=2)
+    for key in ['a', 'b', 'c']:
+        cache.set(key, True)
+    cache.save()
+
+    cache = binary.BinaryCache(cache_path)
+    assert cache.get('a') is None
+    assert cache.get('b') is True
+    assert cache.get('c') is True
+
+
+def test_binary_cache_pickles(tmpdir):
+    cache = binary.BinaryCache(str(tmpdir.join('binary.json')))
+    cache.set('a', True)
+
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.path == cache.path
+    assert copy.get('a') is None
+
+
+def test_get_binary_cache(tmpdir):
+    config_dict = dict(config.DEFAULT_CONFIG, cache_dir=str(tmpdir))
+    assert binary.get_binary_cache(config_dict) is None
+
+    config_dict['binary_cache'] = True
+    cache = binary.get_binary_cache(config_dict)
+    assert cache.path == str(tmpdir.join('binary.json'))
+
+
+def test_generate_files_binary_extensions(tmpdir):
+    generate.generate_files(
+        context={
+            'cookiecutter': {
+                'repo_name': 'test_binary',
+                'render_test': 'I have been rendered!',
+                '_binary_extensions': ['.rst'],
+            }
+        },
+        repo_dir='tests/test-generate-copy-without-render',
+        output_dir=str(tmpdir)
+    )
+
+    readme = tmpdir.join('test_binary', 'README.rst').read()
+    assert '{{cookiecutter.render_test}}' in readme
+    readme = tmpdir.join('test_binary', 'README.txt').read()
+    assert 'I have been rendered!' in readme
+
+
+def test_generate_file_reads_text_once(mocker, template_dir, tmpdir):
+    get_source = mocker.spy(FileSystemLoader, 'get_source')
+    source = FileSystemSource(str(template_dir))
+    env = generate.StrictEnvironment(keep_trailing_newline=True)
+    env.loader = source.get_loader()
+
+    generate.generate_file(
+        str(tmpdir), 'notes.unknown', {'cookiecutter': {'name': 'World'}},
+        env, source=source
+    )
+
+    assert tmpdir.join('notes.unknown').read() == 'Hello World'
+    assert not get_source.called
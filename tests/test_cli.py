@@ -2,6 +2,7 @@
 
 import os
 import json
+import sys
 
 from click.testing import CliRunner
 import pytest
@@ -80,7 +81,7 @@ def test_cli_verbose(cli_runner):
 @pytest.mark.usefixtures('remove_fake_project_dir')
 def test_cli_replay(mocker, cli_runner):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter'
+        'cookiecutter.main.cookiecutter'
     )
 
     template_path = 'tests/fake-repo-pre/'
@@ -97,14 +98,20 @@ def test_cli_replay(mocker, cli_runner):
         config_file=None,
         default_config=False,
         extra_context=None,
-        password=None
+        password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
 @pytest.mark.usefixtures('remove_fake_project_dir')
 def test_cli_exit_on_noinput_and_replay(mocker, cli_runner):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter',
+        'cookiecutter.main.cookiecutter',
         side_effect=cookiecutter
     )
 
@@ -131,6 +138,12 @@ def test_cli_exit_on_noinput_and_replay(mocker, cli_runner):
         default_config=False,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
@@ -143,7 +156,7 @@ def overwrite_cli_flag(request):
 def test_run_cookiecutter_on_overwrite_if_exists_and_replay(
         mocker, cli_runner, overwrite_cli_flag):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter',
+        'cookiecutter.main.cookiecutter',
         side_effect=cookiecutter
     )
 
@@ -163,6 +176,12 @@ def test_run_cookiecutter_on_overwrite_if_exists_and_replay(
         default_config=False,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
@@ -205,7 +224,7 @@ def output_dir(tmpdir):
 
 def test_cli_output_dir(mocker, cli_runner, output_dir_flag, output_dir):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter'
+        'cookiecutter.main.cookiecutter'
     )
 
     template_path = 'tests/fake-repo-pre/'
@@ -223,6 +242,12 @@ def test_cli_output_dir(mocker, cli_runner, output_dir_flag, output_dir):
         default_config=False,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
@@ -244,7 +269,7 @@ def user_config_path(tmpdir):
 
 def test_user_config(mocker, cli_runner, user_config_path):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter'
+        'cookiecutter.main.cookiecutter'
     )
 
     template_path = 'tests/fake-repo-pre/'
@@ -262,12 +287,18 @@ def test_user_config(mocker, cli_runner, user_config_path):
         default_config=False,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
 def test_default_user_config_overwrite(mocker, cli_runner, user_config_path):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter'
+        'cookiecutter.main.cookiecutter'
     )
 
     template_path = 'tests/fake-repo-pre/'
@@ -290,12 +321,18 @@ def test_default_user_config_overwrite(mocker, cli_runner, user_config_path):
         default_config=True,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
 def test_default_user_config(mocker, cli_runner):
     mock_cookiecutter = mocker.patch(
-        'cookiecutter.cli.cookiecutter'
+        'cookiecutter.main.cookiecutter'
     )
 
     template_path = 'tests/fake-repo-pre/'
@@ -313,6 +350,12 @@ def test_default_user_config(mocker, cli_runner):
         default_config=True,
         extra_context=None,
         password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
     )
 
 
@@ -439,3 +482,172 @@ def test_debug_file_verbose(cli_runner, debug_file):
     )
     assert context_log in debug_file.readlines(cr=False)
     assert context_log in result.output
+
+
+def test_cli_jobs(mocker, cli_runner):
+    mock_cookiecutter = mocker.patch(
+        'cookiecutter.main.cookiecutter'
+    )
+
+    template_path = 'tests/fake-repo-pre/'
+    result = cli_runner(
+        template_path, '--jobs', '4', '--worker-pool', 'process'
+    )
+
+    assert result.exit_code == 0
+    mock_cookiecutter.assert_called_once_with(
+        template_path,
+        None,
+        False,
+        replay=False,
+        overwrite_if_exists=False,
+        output_dir='.',
+        config_file=None,
+        default_config=False,
+        extra_context=None,
+        password=None,
+        workers=4,
+        worker_pool='process',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        dry_run=False,
+    )
+
+
+def test_cli_manifest_and_update(mocker, cli_runner):
+    mock_cookiecutter = mocker.patch(
+        'cookiecutter.main.cookiecutter'
+    )
+
+    template_path = 'tests/fake-repo-pre/'
+    result = cli_runner(template_path, '--manifest', '--update')
+
+    assert result.exit_code == 0
+    mock_cookiecutter.assert_called_once_with(
+        template_path,
+        None,
+        False,
+        replay=False,
+        overwrite_if_exists=False,
+        output_dir='.',
+        config_file=None,
+        default_config=False,
+        extra_context=None,
+        password=None,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path='.cookiecutter-manifest.json',
+        update=True,
+        dry_run=False,
+    )
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_cli_dry_run(cli_runner, tmpdir):
+    result = cli_runner(
+        'tests/fake-repo-pre/', '--no-input', '--dry-run',
+        '-o', str(tmpdir)
+    )
+
+    assert result.exit_code == 0
+    assert 'Would generate {}'.format(
+        tmpdir.join('fake-project')
+    ) in result.output
+    assert 'README.rst' in result.output
+    assert tmpdir.listdir() == []
+
+
+def test_cli_jobs_must_be_positive(cli_runner):
+    result = cli_runner('tests/fake-repo-pre/', '--jobs', '0')
+    assert result.exit_code == 2
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_cli_batch(cli_runner, tmpdir):
+    contexts_file = tmpdir.join('contexts.jsonl')
+    contexts_file.write(
+        '{"repo_name": "fake-project-a"}\n'
+        '{"repo_name": "fake-project-a"}\n'
+        '{"repo_name": "fake-project-b"}\n'
+    )
+    output_dir = tmpdir.mkdir('output')
+
+    result = cli_runner(
+        'tests/fake-repo-pre/',
+        '--batch', str(contexts_file),
+        '--output-dir', str(output_dir),
+    )
+
+    assert result.exit_code == 1
+    assert 'Generated {}'.format(output_dir.join('fake-project-a')) \
+        in result.output
+    assert 'Error in context 2: ' in result.output
+    assert '1 of 3 projects failed' in result.output
+    assert output_dir.join('fake-project-b', 'README.rst').isfile()
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_cli_batch_jobs(mocker, cli_runner, tmpdir):
+    iter_batch = mocker.patch('cookiecutter.batch.iter_batch', return_value=[])
+    contexts_file = tmpdir.join('contexts.jsonl')
+    contexts_file.write('{}\n')
+
+    result = cli_runner(
+        'tests/fake-repo-pre/', '--batch', str(contexts_file),
+        '--batch-jobs', '4'
+    )
+
+    assert result.exit_code == 0
+    assert iter_batch.call_args[1]['workers'] == 4
+
+
+@pytest.mark.parametrize('args', [
+    ['--batch-jobs', '4'],
+    ['--batch', 'tests/fake-repo-pre/cookiecutter.json', '--jobs', '4'],
+])
+def test_cli_batch_jobs_usage(cli_runner, args):
+    result = cli_runner('tests/fake-repo-pre/', *args)
+
+    assert result.exit_code == 2
+    assert '--batch' in result.output
+
+
+def test_cli_batch_and_replay(cli_runner, tmpdir):
+    contexts_file = tmpdir.join('contexts.jsonl')
+    contexts_file.write('{}\n')
+
+    result = cli_runner(
+        'tests/fake-repo-pre/', '--batch', str(contexts_file), '--replay'
+    )
+
+    assert result.exit_code == 2
+    assert '--batch can not be used together with --replay' in result.output
+
+
+def test_cli_serve(mocker, cli_runner):
+    mock_serve = mocker.patch('cookiecutter.server.serve')
+
+    result = cli_runner(
+        'tests/fake-repo-pre/', '--serve', 'unix:/tmp/cookiecutter.sock'
+    )
+
+    assert result.exit_code == 0
+    mock_serve.assert_called_once_with(
+        'unix:/tmp/cookiecutter.sock',
+        template='tests/fake-repo-pre/',
+        config_file=None,
+        default_config=False,
+        password=None,
+    )
+
+
+def test_cli_does_not_import_server(monkeypatch, mocker, cli_runner):
+    monkeypatch.delitem(sys.modules, 'cookiecutter.server', raising=False)
+    mocker.patch('cookiecutter.main.cookiecutter')
+
+    result = cli_runner('tests/fake-repo-pre/', '--no-input')
+
+    assert result.exit_code == 0
+    assert 'cookiecutter.server' not in sys.modules
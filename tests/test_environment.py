@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import os
+
 import pytest
+from jinja2 import FileSystemLoader
 
-from cookiecutter.environment import StrictEnvironment
+from cookiecutter.environment import LRUBytecodeCache, StrictEnvironment
 from cookiecutter.exceptions import UnknownExtension
 
 
@@ -22,3 +25,85 @@ def test_env_should_raise_for_unknown_extension():
 def test_env_should_come_with_jinja2_time_extension():
     env = StrictEnvironment(keep_trailing_newline=True)
     assert 'jinja2_time.jinja2_time.TimeExtension' in env.extensions
+
+
+@pytest.fixture
+def bytecode_cache(tmpdir):
+    return LRUBytecodeCache(str(tmpdir.join('bytecode')))
+
+
+def make_env(bytecode_cache, template_dir='tests/files'):
+    env = StrictEnvironment(
+        keep_trailing_newline=True,
+        bytecode_cache=bytecode_cache,
+    )
+    env.loader = FileSystemLoader(template_dir)
+    return env
+
+
+def test_bytecode_cache_skips_compilation(mocker, bytecode_cache):
+    template = make_env(bytecode_cache).get_template('{{generate_file}}.txt')
+    assert len(os.listdir(bytecode_cache.directory)) == 1
+
+    env = make_env(bytecode_cache)
+    compile_spy = mocker.spy(env, 'compile')
+    cached_template = env.get_template('{{generate_file}}.txt')
+
+    assert not compile_spy.called
+    context = {'generate_file': 'cheese'}
+    assert cached_template.render(**context) == template.render(**context)
+
+
+def test_bytecode_cache_keyed_by_extensions(bytecode_cache):
+    make_env(bytecode_cache).get_template('{{generate_file}}.txt')
+
+    env = StrictEnvironment(
+        context={
+            'cookiecutter': {
+                '_extensions': ['jinja2.ext.do']
+            }
+        },
+        bytecode_cache=bytecode_cache,
+    )
+    env.loader = FileSystemLoader('tests/files')
+    env.get_template('{{generate_file}}.txt')
+
+    assert len(os.listdir(bytecode_cache.directory)) == 2
+
+
+def test_bytecode_cache_evicts_least_recently_used(tmpdir):
+    bytecode_cache = LRUBytecodeCache(str(tmpdir.join('bytecode')))
+    env = make_env(bytecode_cache)
+    env.get_template('{{generate_file}}.txt')
+    first_entry = os.listdir(bytecode_cache.directory)[0]
+    first_path = os.path.join(bytecode_cache.directory, first_entry)
+    os.utime(first_path, (0, 0))
+
+    bytecode_cache.max_size = os.path.getsize(first_path)
+    env.get_template('unicode.txt')
+
+    assert len(os.listdir(bytecode_cache.directory)) == 1
+    assert first_entry not in os.listdir(bytecode_cache.directory)
+
+
+def test_bytecode_cache_scans_directory_only_when_over_budget(
+        mocker, bytecode_cache):
+    entries_spy = mocker.spy(bytecode_cache, '_entries')
+    env = make_env(bytecode_cache)
+    for name in ('{{generate_file}}.txt', 'unicode.txt',
+                 '{{cookiecutter.jsonify_file}}.txt'):
+        env.get_template(name)
+
+    assert entries_spy.call_count == 1
+    assert bytecode_cache._size == sum(
+        os.path.getsize(os.path.join(bytecode_cache.directory, filename))
+        for filename in os.listdir(bytecode_cache.directory)
+    )
+
+    bytecode_cache.max_size = 0
+    env = StrictEnvironment(bytecode_cache=bytecode_cache)
+    env.loader = FileSystemLoader('tests/files')
+    env.get_template('unicode.txt')
+
+    assert entries_spy.call_count == 2
+    assert os.listdir(bytecode_cache.directory) == []
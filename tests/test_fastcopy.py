@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_fastcopy
+-------------
+
+Tests for copying files with `cookiecutter.fastcopy`.
+"""
+
+from __future__ import unicode_literals
+import errno
+import os
+import stat
+
+import pytest
+
+from cookiecutter import fastcopy, generate
+
+
+CONTENTS = os.urandom(256 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def disabled_methods(mocker):
+    """Forget the methods found unsupported by other tests."""
+    mocker.patch('cookiecutter.fastcopy._disabled', set())
+
+
+@pytest.fixture
+def src(tmpdir):
+    src = tmpdir.join('src.bin')
+    src.write_binary(CONTENTS)
+    return src
+
+
+def test_copy_file(src, tmpdir):
+    dst = tmpdir.join('dst.bin')
+    method = fastcopy.copy_file(str(src), str(dst))
+
+    assert method in (
+        'clone', 'copy_file_range', 'sendfile', 'copyfileobj'
+    )
+    assert dst.read_binary() == CONTENTS
+    assert src.stat().ino != dst.stat().ino
+
+
+def test_copy_file_link(src, tmpdir):
+    dst = tmpdir.join('dst.bin')
+    dst.write('old contents')
+
+    assert fastcopy.copy_file(str(src), str(dst), link=True) == 'link'
+    assert dst.read_binary() == CONTENTS
+    assert src.stat().ino == dst.stat().ino
+
+
+def test_copy_file_link_unsupported(mocker, src, tmpdir):
+    mocker.patch(
+        'os.link', side_effect=OSError(errno.EXDEV, 'Cross-device link')
+    )
+    dst = tmpdir.join('dst.bin')
+
+    assert fastcopy.copy_file(str(src), str(dst), link=True) != 'link'
+    assert dst.read_binary() == CONTENTS
+
+
+def partial_copy(error):
+    def method(fsrc, fdst, size):
+        fdst.write(fsrc.read(10))
+        fdst.flush()
+        raise OSError(error, os.strerror(error))
+    return method
+
+
+def test_copy_file_falls_back(mocker, src, tmpdir):
+    mocker.patch('cookiecutter.fastcopy._get_methods', return_value=[
+        ('broken', partial_copy(errno.EXDEV))
+    ])
+    dst = tmpdir.join('dst.bin')
+
+    assert fastcopy.copy_file(str(src), str(dst)) == 'copyfileobj'
+    assert dst.read_binary() == CONTENTS
+
+
+@pytest.mark.parametrize('name, method', [
+    ('copy_file_range', fastcopy._copy_file_range),
+    ('sendfile', fastcopy._sendfile),
+])
+def test_copy_file_short_copy_falls_back(mocker, src, tmpdir, name, method):
+    mocker.patch('cookiecutter.fastcopy._get_methods', return_value=[
+        (name, method)
+    ])
+    # The filesystem reports nothing copied after the first bytes
+    mocker.patch('os.' + name, create=True, side_effect=[10, 0])
+    dst = tmpdir.join('dst.bin')
+
+    assert fastcopy.copy_file(str(src), str(dst)) == 'copyfileobj'
+    assert dst.read_binary() == CONTENTS
+    assert not fastcopy._disabled
+
+
+def test_copy_file_raises_other_errors(mocker, src, tmpdir):
+    mocker.patch('cookiecutter.fastcopy._get_methods', return_value=[
+        ('broken', partial_copy(errno.EIO))
+    ])
+
+    with pytest.raises(OSError):
+        fastcopy.copy_file(str(src), str(tmpdir.join('dst.bin')))
+
+
+def test_copy_tree(src, tmpdir):
+    src_dir = tmpdir.mkdir('tree')
+    src_dir.mkdir('sub').join('script.sh').write('#!/bin/sh\n')
+    src_dir.join('sub', 'script.sh').chmod(0o755)
+    src_dir.join('data.bin').write_binary(CONTENTS)
+    dst_dir = tmpdir.join('copy')
+
+    fastcopy.copy_tree(str(src_dir), str(dst_dir))
+
+    assert dst_dir.join('data.bin').read_binary() == CONTENTS
+    script = dst_dir.join('sub', 'script.sh')
+    assert script.read() == '#!/bin/sh\n'
+    assert stat.S_IMODE(script.stat().mode) == 0o755
+    assert script.stat().mtime == src_dir.join('sub', 'script.sh').stat().mtime
+
+    with pytest.raises(OSError):
+        fastcopy.copy_tree(str(src_dir), str(dst_dir))
+
+
+@pytest.mark.parametrize('link_files', [False, True])
+def test_generate_files_link_files(tmpdir, link_files):
+    generate.generate_files(
+        context={
+            'cookiecutter': {
+                'repo_name': 'test_link',
+                'render_test': 'I have been rendered!',
+                '_copy_without_render': ['*not-rendered', '*.txt'],
+            }
+        },
+        repo_dir='tests/test-generate-copy-without-render',
+        output_dir=str(tmpdir),
+        link_files=link_files
+    )
+
+    template_dir = os.path.join(
+        'tests/test-generate-copy-without-render', '{{cookiecutter.repo_name}}'
+    )
+    for path in ['README.txt',
+                 os.path.join('{{cookiecutter.repo_name}}-not-rendered',
+                              'README.rst')]:
+        linked = os.path.samefile(
+            os.path.join(template_dir, path),
+            str(tmpdir.join('test_link', path))
+        )
+        assert linked is link_files
@@ -68,3 +68,48 @@ def test_generate_copy_without_render_extensions():
 
     with open('test_copy_without_render/rendered/not_rendered.yml') as f:
         assert '{{cookiecutter.render_test}}' in f.read()
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('README.txt', True),
+    ('{{cookiecutter.repo_name}}-not-rendered', True),
+    ('rendered/not_rendered.yml', True),
+    ('rendered/rendered.yml', False),
+    ('README.rst', False),
+])
+def test_copy_only_matcher_matches(path, expected):
+    patterns = ['*not-rendered', 'rendered/not_rendered.yml', '*.txt']
+    context = {'cookiecutter': {'_copy_without_render': patterns}}
+    matcher = generate.CopyOnlyMatcher.from_context(context)
+
+    path = os.path.join(*path.split('/'))
+    assert matcher.matches(path) is expected
+    assert generate.is_copy_only_path(path, context) is expected
+
+
+def test_copy_only_matcher_without_patterns():
+    matcher = generate.CopyOnlyMatcher.from_context({'cookiecutter': {}})
+
+    assert not matcher.matches('README.txt')
+    assert not matcher.is_copy_only('README.txt')
+
+
+def test_copy_only_matcher_dirs(mocker):
+    matcher = generate.CopyOnlyMatcher(['*-not-rendered'])
+    matches = mocker.spy(matcher, 'matches')
+
+    paths = [
+        os.path.join('a-not-rendered', 'sub', 'README.rst'),
+        os.path.join('a-not-rendered', 'sub', 'setup.py'),
+        os.path.join('a-not-rendered', 'other.py'),
+    ]
+    assert all(matcher.is_copy_only(path) for path in paths)
+    assert not matcher.is_copy_only(os.path.join('rendered', 'README.rst'))
+
+    # Every dir is tested once, files in copy-only dirs never
+    tested = [args[0] for args, _ in matches.call_args_list]
+    assert sorted(tested) == sorted([
+        'a-not-rendered',
+        'rendered',
+        os.path.join('rendered', 'README.rst'),
+    ])
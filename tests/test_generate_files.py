@@ -26,11 +26,14 @@ clean_system teardown code
 from __future__ import unicode_literals
 import os
 import io
+from multiprocessing.pool import ThreadPool
+
 import pytest
 
 from cookiecutter import generate
 from cookiecutter import exceptions
 from cookiecutter import utils
+from cookiecutter.environment import LRUBytecodeCache
 
 
 @pytest.mark.parametrize('invalid_dirname', ['', '{foo}', '{{foo', 'bar}}'])
@@ -334,3 +337,141 @@ def test_raise_undefined_variable_project_dir(tmpdir):
     assert error.context == {}
 
     assert not output_dir.join('testproject').exists()
+
+
+@pytest.mark.parametrize('worker_pool', ['thread', 'process'])
+def test_generate_files_in_parallel(tmpdir, worker_pool):
+    output_dir = tmpdir.mkdir('output')
+
+    generate.generate_files(
+        context={
+            'cookiecutter': {'binary_test': 'binary_files'}
+        },
+        repo_dir='tests/test-generate-binaries',
+        output_dir=str(output_dir),
+        workers=4,
+        worker_pool=worker_pool
+    )
+
+    project_dir = output_dir.join('inputbinary_files')
+    assert project_dir.join('logo.png').isfile()
+    assert project_dir.join('readme.txt').isfile()
+    assert project_dir.join('binary_files', 'some_font.otf').isfile()
+    assert project_dir.join(
+        'binary_files', 'binary_files', 'logo.png'
+    ).isfile()
+
+
+@pytest.mark.parametrize('worker_pool', ['thread', 'process'])
+def test_raise_undefined_variable_file_content_in_parallel(
+        tmpdir, undefined_context, worker_pool):
+    output_dir = tmpdir.mkdir('output')
+
+    with pytest.raises(exceptions.UndefinedVariableInTemplate) as err:
+        generate.generate_files(
+            repo_dir='tests/undefined-variable/file-content/',
+            output_dir=str(output_dir),
+            context=undefined_context,
+            workers=2,
+            worker_pool=worker_pool
+        )
+    error = err.value
+    assert "Unable to create file 'README.rst'" == error.message
+    assert error.context == undefined_context
+
+    assert not output_dir.join('testproject').exists()
+
+
+def test_generate_files_invalid_worker_pool(tmpdir):
+    with pytest.raises(ValueError):
+        generate.generate_files(
+            context={
+                'cookiecutter': {'food': 'pizzä'}
+            },
+            repo_dir='tests/test-generate-files',
+            output_dir=str(tmpdir),
+            workers=2,
+            worker_pool='fibers'
+        )
+
+
+def test_generate_files_does_not_change_cwd(mocker, tmpdir):
+    mocker.patch(
+        'os.chdir',
+        side_effect=AssertionError('generate_files changed the CWD')
+    )
+
+    generate.generate_files(
+        context={
+            'cookiecutter': {'food': 'pizzä'}
+        },
+        repo_dir='tests/test-generate-files',
+        output_dir=str(tmpdir)
+    )
+    assert tmpdir.join('inputpizzä', 'simple.txt').isfile()
+
+
+def test_generate_files_from_threads(tmpdir):
+    foods = ['pizzä', 'pasta', 'salad', 'soup']
+
+    def generate_food(food):
+        return generate.generate_files(
+            context={
+                'cookiecutter': {'food': food}
+            },
+            repo_dir='tests/test-generate-files',
+            output_dir=str(tmpdir)
+        )
+
+    pool = ThreadPool(len(foods))
+    try:
+        project_dirs = pool.map(generate_food, foods)
+    finally:
+        pool.close()
+        pool.join()
+
+    for food, project_dir in zip(foods, project_dirs):
+        assert project_dir == str(tmpdir.join('input{}'.format(food)))
+        simple_file = tmpdir.join('input{}'.format(food), 'simple.txt')
+        assert simple_file.read_text('utf-8') == u'I eat {}'.format(food)
+
+
+def test_generate_files_with_bytecode_cache(tmpdir):
+    bytecode_cache = LRUBytecodeCache(str(tmpdir.join('bytecode')))
+
+    for output in ('first', 'second'):
+        generate.generate_files(
+            context={
+                'cookiecutter': {'food': 'pizzä'}
+            },
+            repo_dir='tests/test-generate-files',
+            output_dir=str(tmpdir.mkdir(output)),
+            bytecode_cache=bytecode_cache
+        )
+        simple_file = tmpdir.join(output, 'inputpizzä', 'simple.txt')
+        assert simple_file.read_text('utf-8') == u'I eat pizzä'
+
+    assert len(os.listdir(bytecode_cache.directory)) == 2
+
+
+def test_generate_files_with_options(mocker, tmpdir):
+    plan_files = mocker.patch('cookiecutter.generate.plan_files')
+    options = generate.GenerateOptions(dry_run=True)
+    context = {'cookiecutter': {'food': 'pizza'}}
+
+    assert generate.generate_files(
+        'tests/test-generate-files', context, str(tmpdir), options=options,
+        render_contents=True
+    ) == plan_files.return_value
+    plan_files.assert_called_once_with(
+        'tests/test-generate-files', context, str(tmpdir), env=None,
+        render_contents=True
+    )
+    assert not options.render_contents
+
+
+def test_generate_files_unknown_option():
+    with pytest.raises(TypeError) as excinfo:
+        generate.generate_files('tests/test-generate-files', colour='red')
+
+    assert 'colour' in str(excinfo.value)
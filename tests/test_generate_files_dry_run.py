@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_generate_files_dry_run
+---------------------------
+
+Tests for planning a project with ``generate_files(dry_run=True)``.
+"""
+
+from __future__ import unicode_literals
+import os
+
+import pytest
+
+from cookiecutter import exceptions, generate
+
+
+CONTEXT = {
+    'cookiecutter': {
+        'repo_name': 'test_dry_run',
+        'render_test': 'I have been rendered!',
+        '_copy_without_render': [
+            '*not-rendered',
+            'rendered/not_rendered.yml',
+            '*.txt',
+        ]}
+}
+
+
+def plan_project(output_dir, **kwargs):
+    return generate.generate_files(
+        context=CONTEXT,
+        repo_dir='tests/test-generate-copy-without-render',
+        output_dir=str(output_dir),
+        dry_run=True,
+        **kwargs
+    )
+
+
+def test_dry_run_plans_paths(tmpdir):
+    plan = plan_project(tmpdir)
+
+    assert plan.project_dir == str(tmpdir.join('test_dry_run'))
+    kinds = dict((p.path, p.kind) for p in plan.paths)
+    assert kinds == {
+        'README.rst': generate.PLAN_RENDERED,
+        'README.txt': generate.PLAN_COPIED,
+        'rendered': generate.PLAN_DIR,
+        os.path.join('rendered', 'not_rendered.yml'): generate.PLAN_COPIED,
+        'test_dry_run-rendered': generate.PLAN_DIR,
+        os.path.join('test_dry_run-rendered', 'README.rst'):
+            generate.PLAN_RENDERED,
+        os.path.join('test_dry_run-rendered', 'README.txt'):
+            generate.PLAN_COPIED,
+        '{{cookiecutter.repo_name}}-not-rendered': generate.PLAN_DIR,
+        os.path.join('{{cookiecutter.repo_name}}-not-rendered', 'README.rst'):
+            generate.PLAN_COPIED,
+    }
+    assert tmpdir.listdir() == []
+
+
+def test_dry_run_sizes(tmpdir):
+    plan = plan_project(tmpdir)
+
+    for planned_path in plan.paths:
+        if planned_path.kind == generate.PLAN_COPIED:
+            assert planned_path.size == os.path.getsize(os.path.join(
+                'tests/test-generate-copy-without-render',
+                '{{cookiecutter.repo_name}}',
+                planned_path.source
+            ))
+        else:
+            assert planned_path.size is None
+        assert planned_path.contents is None
+
+
+def test_dry_run_render_contents(tmpdir):
+    plan = plan_project(tmpdir, render_contents=True)
+
+    readme = [
+        p for p in plan.paths
+        if p.path == 'README.rst'
+    ][0]
+    assert 'I have been rendered!' in readme.contents
+    assert readme.size == len(
+        readme.contents.replace('\n', os.linesep).encode('utf-8')
+    )
+    assert tmpdir.listdir() == []
+
+
+def test_dry_run_matches_generation(tmpdir):
+    plan = plan_project(tmpdir.join('plan'), render_contents=True)
+    generate.generate_files(
+        context=CONTEXT,
+        repo_dir='tests/test-generate-copy-without-render',
+        output_dir=str(tmpdir),
+    )
+
+    for planned_path in plan.paths:
+        outpath = tmpdir.join('test_dry_run', planned_path.path)
+        if planned_path.kind == generate.PLAN_DIR:
+            assert outpath.isdir()
+        else:
+            assert outpath.size() == planned_path.size
+
+
+def test_dry_run_undefined_variable(tmpdir):
+    with pytest.raises(exceptions.UndefinedVariableInTemplate) as err:
+        generate.generate_files(
+            context={'cookiecutter': {}},
+            repo_dir='tests/test-generate-copy-without-render',
+            output_dir=str(tmpdir),
+            dry_run=True,
+        )
+    assert 'Unable to create project directory' in err.value.message
+    assert tmpdir.listdir() == []
+
+
+def test_dry_run_does_not_run_hooks(tmpdir, mocker):
+    run_hook = mocker.patch('cookiecutter.generate.run_hook')
+
+    plan = generate.generate_files(
+        context={'cookiecutter': {'pyhooks': 'pyhooks'}},
+        repo_dir='tests/test-pyhooks',
+        output_dir=str(tmpdir),
+        dry_run=True,
+    )
+
+    assert not run_hook.called
+    assert [p.path for p in plan.paths] == ['README.rst']
+    assert tmpdir.listdir() == []
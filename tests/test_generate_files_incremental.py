@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_generate_files_incremental
+-------------------------------
+
+Tests for regenerating a project with ``generate_files(incremental=True)``.
+"""
+
+from __future__ import unicode_literals
+import logging
+import os
+import stat
+
+import pytest
+
+from cookiecutter import generate
+
+
+OLD_MTIME = 1000000000
+
+
+def copy_without_render_context(render_test):
+    return {
+        'cookiecutter': {
+            'repo_name': 'test_incremental',
+            'render_test': render_test,
+            '_copy_without_render': [
+                '*not-rendered',
+                'rendered/not_rendered.yml',
+                '*.txt',
+            ]}
+    }
+
+
+def generate_project(output_dir, render_test, **kwargs):
+    return generate.generate_files(
+        context=copy_without_render_context(render_test),
+        repo_dir='tests/test-generate-copy-without-render',
+        output_dir=str(output_dir),
+        **kwargs
+    )
+
+
+def age_files(project_dir):
+    """Set the mtime of every file of the project to `OLD_MTIME`."""
+    for root, dirs, files in os.walk(project_dir):
+        for f in files:
+            os.utime(os.path.join(root, f), (OLD_MTIME, OLD_MTIME))
+
+
+def changed_files(project_dir):
+    """Return the files of the project written since `age_files`."""
+    return sorted(
+        os.path.relpath(os.path.join(root, f), project_dir)
+        for root, dirs, files in os.walk(project_dir)
+        for f in files
+        if os.path.getmtime(os.path.join(root, f)) != OLD_MTIME
+    )
+
+
+@pytest.fixture
+def output_dir(tmpdir):
+    return tmpdir.mkdir('output')
+
+
+def test_incremental_leaves_unchanged_files_alone(output_dir, caplog):
+    project_dir = generate_project(output_dir, 'I have been rendered!')
+    age_files(project_dir)
+
+    with caplog.at_level(logging.INFO):
+        generate_project(output_dir, 'I have been rendered!', incremental=True)
+
+    assert changed_files(project_dir) == []
+    assert '6 files unchanged, 0 updated, 0 created' in caplog.text
+
+
+def test_incremental_rewrites_changed_files(output_dir, caplog):
+    project_dir = generate_project(output_dir, 'I have been rendered!')
+    age_files(project_dir)
+    os.remove(os.path.join(project_dir, 'README.txt'))
+
+    with caplog.at_level(logging.INFO):
+        generate_project(output_dir, 'I have changed!', incremental=True)
+
+    assert changed_files(project_dir) == [
+        'README.rst',
+        'README.txt',
+        os.path.join('test_incremental-rendered', 'README.rst'),
+    ]
+    readme = os.path.join(project_dir, 'README.rst')
+    with open(readme) as f:
+        assert 'I have changed!' in f.read()
+    assert '3 files unchanged, 2 updated, 1 created' in caplog.text
+
+
+def test_incremental_restores_permissions(output_dir):
+    project_dir = generate_project(output_dir, 'I have been rendered!')
+    age_files(project_dir)
+    readme = os.path.join(project_dir, 'README.rst')
+    os.chmod(readme, stat.S_IRUSR)
+
+    generate_project(output_dir, 'I have been rendered!', incremental=True)
+
+    template_readme = os.path.join(
+        'tests', 'test-generate-copy-without-render',
+        '{{cookiecutter.repo_name}}', 'README.rst'
+    )
+    template_mode = stat.S_IMODE(os.stat(template_readme).st_mode)
+    assert stat.S_IMODE(os.stat(readme).st_mode) == template_mode
+    # Only the permissions differed, so the contents were not rewritten
+    assert changed_files(project_dir) == []
+
+
+@pytest.mark.parametrize('worker_pool', ['thread', 'process'])
+def test_incremental_in_parallel(output_dir, worker_pool, caplog):
+    project_dir = generate_project(output_dir, 'I have been rendered!')
+    age_files(project_dir)
+
+    with caplog.at_level(logging.INFO):
+        generate_project(
+            output_dir,
+            'I have changed!',
+            incremental=True,
+            workers=2,
+            worker_pool=worker_pool
+        )
+
+    assert len(changed_files(project_dir)) == 2
+    assert '4 files unchanged, 2 updated, 0 created' in caplog.text
+
+
+def test_incremental_into_new_output_dir(output_dir, caplog):
+    with caplog.at_level(logging.INFO):
+        generate_project(output_dir, 'I have been rendered!', incremental=True)
+
+    assert '0 files unchanged, 0 updated, 6 created' in caplog.text
+
+
+def test_generate_file_returns_outcome(tmpdir):
+    env = generate.StrictEnvironment(keep_trailing_newline=True)
+    env.loader = generate.FileSystemSource('tests/files').get_loader()
+    context = {'generate_file': 'cheese'}
+
+    def generate_cheese():
+        return generate.generate_file(
+            project_dir=str(tmpdir),
+            infile='{{generate_file}}.txt',
+            context=context,
+            env=env,
+            template_dir='tests/files',
+            incremental=True
+        )
+
+    assert generate_cheese() == generate.FILE_CREATED
+    assert generate_cheese() == generate.FILE_UNCHANGED
+    tmpdir.join('cheese.txt').write('Stale cheese')
+    assert generate_cheese() == generate.FILE_UPDATED
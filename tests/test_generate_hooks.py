@@ -16,6 +16,7 @@ import errno
 import os
 import sys
 import stat
+import subprocess
 import pytest
 
 from cookiecutter import generate
@@ -69,6 +70,25 @@ def test_run_python_hooks():
     assert os.path.exists('tests/test-pyhooks/inputpyhooks/python_post.txt')
 
 
+@pytest.mark.parametrize('workers', [None, 4])
+@pytest.mark.usefixtures('clean_system', 'remove_additional_folders')
+def test_run_python_hooks_inprocess(mocker, workers):
+    popen = mocker.spy(subprocess, 'Popen')
+
+    generate.generate_files(
+        context={
+            'cookiecutter': {'pyhooks': 'pyhooks', '_hooks_mode': 'inprocess'}
+        },
+        repo_dir='tests/test-pyhooks/',
+        output_dir='tests/test-pyhooks/',
+        workers=workers
+    )
+
+    assert os.path.exists('tests/test-pyhooks/inputpyhooks/python_pre.txt')
+    assert os.path.exists('tests/test-pyhooks/inputpyhooks/python_post.txt')
+    assert not popen.called
+
+
 @pytest.mark.usefixtures('clean_system', 'remove_additional_folders')
 def test_run_python_hooks_cwd():
     generate.generate_files(
@@ -67,7 +67,21 @@ def test_get_config():
             'gl': 'https://gitlab.com/{0}.git',
             'bb': 'https://bitbucket.org/{0}',
             'helloworld': 'https://github.com/hackebrot/helloworld'
-        }
+        },
+        'cache_dir': None,
+        'bytecode_cache': False,
+        'bytecode_cache_max_size': 64 * 1024 * 1024,
+        'git_mirror_cache': False,
+        'zip_cache': False,
+        'zip_cache_max_size': 256 * 1024 * 1024,
+        'template_analysis': False,
+        'binary_cache': False,
+        'hooks_timeout': None,
+        'hooks_cpu_limit': None,
+        'hooks_memory_limit': None,
+        'server_templates': [],
+        'server_output_dir': None,
+        'server_max_templates': 16,
     }
     assert conf == expected_conf
 
@@ -115,6 +129,44 @@ def test_get_config_with_defaults():
             'gh': 'https://github.com/{0}.git',
             'gl': 'https://gitlab.com/{0}.git',
             'bb': 'https://bitbucket.org/{0}',
-        }
+        },
+        'cache_dir': None,
+        'bytecode_cache': False,
+        'bytecode_cache_max_size': 64 * 1024 * 1024,
+        'git_mirror_cache': False,
+        'zip_cache': False,
+        'zip_cache_max_size': 256 * 1024 * 1024,
+        'template_analysis': False,
+        'binary_cache': False,
+        'hooks_timeout': None,
+        'hooks_cpu_limit': None,
+        'hooks_memory_limit': None,
+        'server_templates': [],
+        'server_output_dir': None,
+        'server_max_templates': 16,
     }
     assert conf == expected_conf
+
+
+def test_get_cache_dir_defaults_to_cookiecutters_dir():
+    conf = config.get_config('tests/test-config/valid-config.yaml')
+    assert config.get_cache_dir(conf, 'bytecode') == os.path.join(
+        '/home/example/some-path-to-templates', '.cache', 'bytecode'
+    )
+
+
+def test_get_cache_dir_from_config(tmpdir):
+    config_file = tmpdir.join('config.yaml')
+    config_file.write(
+        'cache_dir: "~/cache"\n'
+        'bytecode_cache: true\n'
+        'bytecode_cache_max_size: 1024\n'
+    )
+
+    conf = config.get_config(str(config_file))
+
+    assert conf['bytecode_cache'] is True
+    assert conf['bytecode_cache_max_size'] == 1024
+    assert config.get_cache_dir(conf, 'bytecode') == os.path.join(
+        os.path.expanduser('~/cache'), 'bytecode'
+    )
@@ -72,7 +72,21 @@ def custom_config():
             'gl': 'https://gitlab.com/{0}.git',
             'bb': 'https://bitbucket.org/{0}',
             'helloworld': 'https://github.com/hackebrot/helloworld',
-        }
+        },
+        'cache_dir': None,
+        'bytecode_cache': False,
+        'bytecode_cache_max_size': 64 * 1024 * 1024,
+        'git_mirror_cache': False,
+        'zip_cache': False,
+        'zip_cache_max_size': 256 * 1024 * 1024,
+        'template_analysis': False,
+        'binary_cache': False,
+        'hooks_timeout': None,
+        'hooks_cpu_limit': None,
+        'hooks_memory_limit': None,
+        'server_templates': [],
+        'server_output_dir': None,
+        'server_max_templates': 16,
     }
 
 
@@ -7,13 +7,18 @@ test_hooks
 Tests for `cookiecutter.hooks` module.
 """
 
+import io
 import os
 import pytest
 import stat
+import subprocess
 import sys
 import textwrap
+import threading
+import time
 
 from cookiecutter import hooks, utils, exceptions
+from cookiecutter.environment import StrictEnvironment
 
 
 def make_test_repo(name):
@@ -179,6 +184,17 @@ class TestExternalHooks(object):
             hooks.run_hook('post_gen_project', tests_dir, {})
             assert os.path.isfile(os.path.join(tests_dir, 'shell_post.txt'))
 
+    def test_run_hook_from_repo_dir(self):
+        """Execute hook from a template dir that is not the CWD."""
+        tests_dir = os.path.join(self.repo_path, 'input{{hooks}}')
+        curdir = os.getcwd()
+
+        hooks.run_hook(
+            'pre_gen_project', tests_dir, {}, repo_dir=self.repo_path
+        )
+        assert os.path.isfile(os.path.join(tests_dir, 'python_pre.txt'))
+        assert os.getcwd() == curdir
+
     def test_run_failing_hook(self):
         hook_path = os.path.join(self.hooks_path, 'pre_gen_project.py')
         tests_dir = os.path.join(self.repo_path, 'input{{hooks}}')
@@ -233,3 +249,414 @@ def test_ignore_hook_backup_files(monkeypatch, dir_with_hooks):
     monkeypatch.chdir(dir_with_hooks)
     assert hooks.find_hook('pre_gen_project') is None
     assert hooks.find_hook('post_gen_project') is None
+
+
+@pytest.fixture
+def inprocess_hook(tmpdir):
+    """Return the path to a Python hook which is run in-process."""
+    hooks_dir = tmpdir.mkdir('hooks')
+    hook_file = hooks_dir.join('post_gen_project.py')
+    hook_file.write(textwrap.dedent(
+        u"""
+        import os
+        import sys
+
+        print('running in', os.path.basename(os.getcwd()))
+        assert __name__ == '__main__'
+        with open('{{ cookiecutter.file }}', 'w') as f:
+            f.write(sys.argv[0])
+        {% if cookiecutter.exit_status is defined %}
+        sys.stderr.write('failing\\n')
+        sys.exit({{ cookiecutter.exit_status }})
+        {% endif %}
+        """
+    ))
+    return str(hook_file)
+
+
+def inprocess_context(**variables):
+    variables.setdefault('file', 'inprocess.txt')
+    return {'cookiecutter': dict(variables, _hooks_mode='inprocess')}
+
+
+def test_run_script_with_context_inprocess(
+        mocker, capsys, tmpdir, inprocess_hook):
+    popen = mocker.patch('subprocess.Popen')
+    project_dir = tmpdir.mkdir('project')
+    curdir = os.getcwd()
+
+    hooks.run_script_with_context(
+        inprocess_hook, str(project_dir), inprocess_context()
+    )
+
+    assert not popen.called
+    assert project_dir.join('inprocess.txt').read() == inprocess_hook
+    assert os.getcwd() == curdir
+    assert capsys.readouterr()[0] == 'running in project\n'
+
+
+def test_run_script_with_context_inprocess_while_threaded(
+        mocker, caplog, tmpdir, inprocess_hook):
+    run_script = mocker.patch('cookiecutter.hooks.run_script')
+    run_python_in_process = mocker.patch(
+        'cookiecutter.hooks.run_python_in_process'
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        hooks.run_script_with_context(
+            inprocess_hook, str(tmpdir), inprocess_context()
+        )
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not run_python_in_process.called
+    assert run_script.call_count == 1
+    assert run_script.call_args[0][1] == str(tmpdir)
+    assert 'single-threaded' in caplog.text
+
+
+def test_run_script_with_context_inprocess_with_limits(
+        mocker, tmpdir, inprocess_hook):
+    run_script = mocker.patch('cookiecutter.hooks.run_script')
+    limits = hooks.HookLimits(timeout=10)
+
+    hooks.run_script_with_context(
+        inprocess_hook, str(tmpdir), inprocess_context(), limits=limits
+    )
+
+    assert run_script.call_count == 1
+    assert run_script.call_args[0][1:] == (str(tmpdir), limits)
+
+
+@pytest.mark.parametrize('exit_status, failed', [
+    (0, False),
+    (None, False),
+    (3, True),
+    ('"Invalid name"', True),
+])
+def test_run_script_with_context_inprocess_exit(
+        capsys, tmpdir, inprocess_hook, exit_status, failed):
+    context = inprocess_context(exit_status=exit_status)
+
+    if failed:
+        with pytest.raises(exceptions.FailedHookException) as excinfo:
+            hooks.run_script_with_context(
+                inprocess_hook, str(tmpdir), context
+            )
+        assert 'Hook script failed (exit status:' in str(excinfo.value)
+    else:
+        hooks.run_script_with_context(inprocess_hook, str(tmpdir), context)
+    assert 'failing' in capsys.readouterr()[1]
+
+
+def test_run_python_in_process_error(capsys, tmpdir):
+    curdir = os.getcwd()
+    with pytest.raises(exceptions.FailedHookException) as excinfo:
+        hooks.run_python_in_process(
+            'secret = 1\nraise KeyError("broken")\n', 'hook.py', str(tmpdir)
+        )
+
+    assert 'broken' in str(excinfo.value)
+    assert 'Traceback' in capsys.readouterr()[1]
+    assert os.getcwd() == curdir
+    assert 'secret' not in globals()
+
+
+def test_get_hooks_mode():
+    assert hooks.get_hooks_mode({}) == 'subprocess'
+    assert hooks.get_hooks_mode(inprocess_context()) == 'inprocess'
+    with pytest.raises(exceptions.FailedHookException):
+        hooks.get_hooks_mode({'cookiecutter': {'_hooks_mode': 'thread'}})
+
+
+def test_rendered_hook_cache(mocker, tmpdir):
+    hook_file = tmpdir.join('post_gen_project.sh')
+    hook_file.write('echo {{ cookiecutter.name }}\n')
+    env = StrictEnvironment(keep_trailing_newline=True)
+    from_string = mocker.spy(env, 'from_string')
+    cache = hooks.RenderedHookCache()
+
+    context = {'cookiecutter': {'name': 'one', 'other': 1}}
+    assert cache.render(str(hook_file), context, env)[1] == 'echo one\n'
+    assert cache.render(str(hook_file), context, env)[1] == 'echo one\n'
+    assert from_string.call_count == 1
+
+    # Variables the hook does not use do not matter
+    context['cookiecutter']['other'] = 2
+    cache.render(str(hook_file), context, env)
+    assert from_string.call_count == 1
+
+    # A hook is rendered again once it or the variables it uses change
+    assert cache.render(
+        str(hook_file), {'cookiecutter': {'name': 'two'}}, env
+    )[1] == 'echo two\n'
+    hook_file.write('echo {{ cookiecutter.name }}!\n')
+    assert cache.render(str(hook_file), context, env)[1] == 'echo one!\n'
+    assert from_string.call_count == 3
+
+
+def test_rendered_hook_cache_key():
+    env = StrictEnvironment()
+    contents = '{{ cookiecutter.a }}{{ b }}'
+    cache = hooks.RenderedHookCache()
+
+    def get_key(context):
+        return cache.get_key(contents, context, env)
+
+    key = get_key({'cookiecutter': {'a': 1, 'c': 2}, 'b': 3})
+    assert get_key({'cookiecutter': {'a': 1}, 'b': 3}) == key
+    assert get_key({'cookiecutter': {'a': 2}, 'b': 3}) != key
+    assert get_key({'cookiecutter': {'a': 1}, 'b': 4}) != key
+    assert get_key({'cookiecutter': {'a': None}, 'b': 3}) != \
+        get_key({'cookiecutter': {}, 'b': 3})
+    assert cache.get_key(
+        '{{ cookiecutter | jsonify }}', {'cookiecutter': {'c': 1}}, env
+    ) != cache.get_key(
+        '{{ cookiecutter | jsonify }}', {'cookiecutter': {'c': 2}}, env
+    )
+
+
+def test_rendered_hook_cache_max_entries(mocker, tmpdir):
+    hook_file = tmpdir.join('post_gen_project.sh')
+    hook_file.write('echo {{ cookiecutter.name }}\n')
+    env = StrictEnvironment(keep_trailing_newline=True)
+    from_string = mocker.spy(env, 'from_string')
+    cache = hooks.RenderedHookCache(max_entries=2)
+
+    for name in ['one', 'two', 'three', 'three', 'two', 'one']:
+        cache.render(str(hook_file), {'cookiecutter': {'name': name}}, env)
+
+    assert from_string.call_count == 4
+
+
+def test_rendered_hook_cache_file(tmpdir):
+    hook_file = tmpdir.join('post_gen_project.sh')
+    hook_file.write('echo {{ cookiecutter.name }}\n')
+    env = StrictEnvironment(keep_trailing_newline=True)
+    context = {'cookiecutter': {'name': 'one'}}
+    cache = hooks.RenderedHookCache()
+
+    with cache.rendered_file(str(hook_file), context, env) as path:
+        assert path.endswith('.sh')
+        assert io.open(path).read() == 'echo one\n'
+        # Another run of the same hook shares the file
+        with cache.rendered_file(str(hook_file), context, env) as other:
+            assert other == path
+        assert os.path.exists(path)
+
+    assert not os.path.exists(path)
+    assert not os.path.exists(os.path.dirname(path))
+
+
+def test_run_script_with_context_removes_file(mocker, tmpdir):
+    def run_script(path, cwd, limits):
+        assert io.open(path).read() == 'touch context_post.txt\n'
+        paths.append(path)
+
+    paths = []
+    mocker.patch('cookiecutter.hooks.run_script', side_effect=run_script)
+    hook_file = tmpdir.join('post_gen_project.sh')
+    hook_file.write('touch {{ cookiecutter.file }}\n')
+    context = {'cookiecutter': {'file': 'context_post.txt'}}
+
+    hooks.run_script_with_context(str(hook_file), str(tmpdir), context)
+
+    assert len(paths) == 1
+    assert not paths[0].startswith(str(tmpdir))
+    assert not os.path.exists(paths[0])
+
+
+@pytest.fixture
+def staged_hooks(tmpdir):
+    """Return a template dir with several scripts per hook."""
+    hooks_dir = tmpdir.mkdir('template').mkdir('hooks')
+    hooks_dir.join('post_gen_project.py').write(
+        "open('order.txt', 'a').write('main\\n')\n"
+    )
+    stage_dir = hooks_dir.mkdir('post_gen_project.d')
+    for name in ['20-second.py', '10-first.py', '30-third.py~', '.hidden']:
+        stage_dir.join(name).write(
+            "open('order.txt', 'a').write('{}\\n')\n".format(name)
+        )
+    stage_dir.mkdir('99-dir')
+    hooks_dir.mkdir('pre_gen_project.d')
+    return hooks_dir.dirpath()
+
+
+def test_hook_registry(staged_hooks):
+    registry = hooks.HookRegistry.from_repo_dir(str(staged_hooks))
+
+    assert registry
+    assert registry.get('pre_gen_project') == []
+    assert [registry.get_name(p) for p in registry] == [
+        'post_gen_project.py',
+        'post_gen_project.d/10-first.py',
+        'post_gen_project.d/20-second.py',
+    ]
+    assert registry.get('post_gen_project') == list(registry)
+    assert hooks.find_hook(
+        'pre_gen_project', str(staged_hooks.join('hooks'))
+    ) is None
+
+
+def test_hook_registry_without_hooks(tmpdir):
+    assert not hooks.HookRegistry.from_repo_dir(str(tmpdir))
+    assert not hooks.has_hooks(str(tmpdir))
+
+
+def test_run_hook_runs_scripts_in_order(tmpdir, staged_hooks):
+    project_dir = tmpdir.mkdir('project')
+    hooks.run_hook(
+        'post_gen_project', str(project_dir), {}, repo_dir=str(staged_hooks)
+    )
+
+    assert project_dir.join('order.txt').read().splitlines() == [
+        'main', '10-first.py', '20-second.py'
+    ]
+
+
+def test_run_hook_stops_at_failing_script(tmpdir, staged_hooks):
+    staged_hooks.join('hooks', 'post_gen_project.d', '10-first.py').write(
+        'import sys; sys.exit(1)\n'
+    )
+    project_dir = tmpdir.mkdir('project')
+
+    with pytest.raises(exceptions.FailedHookException):
+        hooks.run_hook(
+            'post_gen_project', str(project_dir), {},
+            repo_dir=str(staged_hooks)
+        )
+    assert project_dir.join('order.txt').read().splitlines() == ['main']
+
+
+def test_get_template_hook_limits():
+    context = {'cookiecutter': {'_hooks_limits': {
+        'timeout': 60,
+        'memory_limit': 2 ** 30,
+        'post_gen_project': {'timeout': 600},
+    }}}
+    user_limits = hooks.HookLimits(timeout=300, cpu_limit=10)
+
+    assert hooks.get_template_hook_limits({}, 'pre_gen_project') == \
+        hooks.HookLimits()
+    assert hooks.get_template_hook_limits(
+        context, 'pre_gen_project', user_limits
+    ) == hooks.HookLimits(60, 10, 2 ** 30)
+    assert hooks.get_template_hook_limits(
+        context, 'post_gen_project', user_limits
+    ) == hooks.HookLimits(300, 10, 2 ** 30)
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason='Uses process groups')
+def test_run_script_timeout_kills_process_group(tmpdir):
+    hook_file = tmpdir.join('hook.sh')
+    hook_file.write(
+        '#!/bin/sh\n'
+        'sleep 30 &\n'
+        'echo $! > child.pid\n'
+        'sleep 30\n'
+    )
+
+    with pytest.raises(exceptions.HookTimeoutException) as excinfo:
+        hooks.run_script(
+            str(hook_file), str(tmpdir), hooks.HookLimits(timeout=0.5)
+        )
+    assert 'timed out after 0.5 seconds' in str(excinfo.value)
+
+    child_pid = int(tmpdir.join('child.pid').read())
+    for _ in range(50):
+        try:
+            os.kill(child_pid, 0)
+        except OSError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail('Child process of the hook is still running')
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason='Uses resource limits')
+def test_run_script_memory_limit(tmpdir):
+    hook_file = tmpdir.join('hook.py')
+    hook_file.write('data = bytearray(1024 * 1024 * 1024)\n')
+
+    with pytest.raises(exceptions.FailedHookException) as excinfo:
+        hooks.run_script(
+            str(hook_file), str(tmpdir),
+            hooks.HookLimits(memory_limit=512 * 1024 * 1024)
+        )
+    assert not isinstance(excinfo.value, exceptions.HookTimeoutException)
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason='Uses resource limits')
+def test_run_script_limits_set_before_exec(mocker, tmpdir):
+    popen = mocker.spy(subprocess, 'Popen')
+    hook_file = tmpdir.join('hook.py')
+    hook_file.write(
+        'import resource\n'
+        'with open("limit.txt", "w") as f:\n'
+        '    f.write(str(resource.getrlimit(resource.RLIMIT_CPU)[0]))\n'
+    )
+
+    hooks.run_script(
+        str(hook_file), str(tmpdir), hooks.HookLimits(cpu_limit=10)
+    )
+
+    assert tmpdir.join('limit.txt').read() == '10'
+    popen_args, popen_kwargs = popen.call_args
+    assert popen_args[0][:3] == [
+        sys.executable, '-c', hooks._LIMITS_LAUNCHER
+    ]
+    assert popen_args[0][-2:] == [sys.executable, str(hook_file)]
+    assert 'preexec_fn' not in popen_kwargs
+    assert popen_kwargs['start_new_session']
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason='Uses resource limits')
+def test_run_post_gen_task_limits_set_before_exec(tmpdir):
+    hooks.run_post_gen_tasks(
+        [hooks.PostGenTask('limit', 'ulimit -t > limit.txt', [])],
+        str(tmpdir),
+        limits=hooks.HookLimits(cpu_limit=10)
+    )
+
+    assert tmpdir.join('limit.txt').read().strip() == '10'
+
+
+def test_run_script_limits_not_supported(monkeypatch, tmpdir):
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    hook_file = tmpdir.join('hook.py')
+    hook_file.write('open("ran.txt", "w").close()\n')
+
+    with pytest.raises(exceptions.FailedHookException) as excinfo:
+        hooks.run_script(
+            str(hook_file), str(tmpdir), hooks.HookLimits(cpu_limit=10)
+        )
+    assert 'not supported' in str(excinfo.value)
+    assert not tmpdir.join('ran.txt').exists()
+
+
+def test_run_hook_records_metrics(mocker, tmpdir):
+    mocker.patch('cookiecutter.hooks.metrics', hooks.HookMetrics())
+    hooks_dir = tmpdir.mkdir('hooks')
+    hooks_dir.join('pre_gen_project.py').write('pass\n')
+    hooks_dir.join('post_gen_project.py').write('import sys; sys.exit(1)\n')
+    project_dir = tmpdir.mkdir('project')
+
+    hooks.run_hook('pre_gen_project', str(project_dir), {},
+                   repo_dir=str(tmpdir))
+    with pytest.raises(exceptions.FailedHookException):
+        hooks.run_hook('post_gen_project', str(project_dir), {},
+                       repo_dir=str(tmpdir))
+
+    recorded = hooks.metrics.as_dict()
+    assert sorted(recorded) == ['post_gen_project', 'pre_gen_project']
+    assert recorded['pre_gen_project']['succeeded'] == 1
+    assert recorded['post_gen_project']['failed'] == 1
+    assert recorded['post_gen_project']['timed_out'] == 0
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_import_time
+----------------
+
+Tests to make sure the `cookiecutter` CLI starts quickly, by only importing
+heavy dependencies on the code paths that need them.
+"""
+
+import json
+import re
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time of `cookiecutter.cli` in microseconds. It took
+# about 240ms when everything was imported eagerly and about 40ms since.
+IMPORT_TIME_BUDGET = 120000
+
+HEAVY_MODULES = [
+    'binaryornot',
+    'cookiecutter.main',
+    'jinja2',
+    'poyo',
+    'requests',
+    'whichcraft',
+]
+
+
+def test_cli_does_not_import_heavy_modules():
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import json, sys; '
+        'import cookiecutter.cli; '
+        'print(json.dumps(sorted(sys.modules)))'
+    ])
+    imported = json.loads(output.decode('utf-8'))
+
+    assert [m for m in HEAVY_MODULES if m in imported] == []
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason='-X importtime requires Python 3.7'
+)
+def test_version_import_time():
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-m', 'cookiecutter',
+         '--version'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    out, err = process.communicate()
+    assert process.returncode == 0
+    assert b'Cookiecutter' in out
+
+    match = re.search(
+        r'^import time:\s+\d+ \|\s+(\d+) \| cookiecutter\.cli$',
+        err.decode('utf-8'),
+        re.MULTILINE
+    )
+    assert match
+    assert int(match.group(1)) < IMPORT_TIME_BUDGET
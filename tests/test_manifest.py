@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_manifest
+-------------
+
+Tests for `cookiecutter.manifest` and for updating projects with it.
+"""
+
+from __future__ import unicode_literals
+import json
+import logging
+import os
+
+import pytest
+
+from cookiecutter import generate, manifest
+
+
+OLD_MTIME = 1000000000
+
+TEMPLATE_FILES = {
+    'README.rst': '{{ cookiecutter.project_name }}\n',
+    'LICENSE': "{{ cookiecutter['author'] }}\n",
+    'context.json': '{{ cookiecutter | jsonify }}\n',
+    'static.txt': 'Static\n',
+    'partial.rst': '{{ cookiecutter.author }}\n',
+    os.path.join('docs', 'index.rst'): "{% include 'partial.rst' %}\n",
+    os.path.join('{{ cookiecutter.package }}', '__init__.py'): '',
+}
+
+ALL_FILES = sorted(
+    path.replace('{{ cookiecutter.package }}', 'pkg')
+    for path in TEMPLATE_FILES
+)
+
+
+@pytest.mark.parametrize('new_context, changed', [
+    ({'cookiecutter': {'a': 1, 'b': 2}}, set()),
+    ({'cookiecutter': {'a': 1, 'b': 3}}, {'cookiecutter', 'cookiecutter.b'}),
+    ({'cookiecutter': {'a': 1}}, {'cookiecutter', 'cookiecutter.b'}),
+    ({'cookiecutter': {'a': 1, 'b': 2}, 'other': 1}, {'other'}),
+    ({'cookiecutter': {'a': 1, 'b': 2, '_extensions': ['x']}}, None),
+])
+def test_changed_variables(new_context, changed):
+    old_context = {'cookiecutter': {'a': 1, 'b': 2}}
+    assert manifest.changed_variables(old_context, new_context) == changed
+
+
+@pytest.fixture
+def template_dir(tmpdir):
+    repo_dir = tmpdir.mkdir('template')
+    project_template = repo_dir.mkdir('{{ cookiecutter.repo_name }}')
+    for path, contents in TEMPLATE_FILES.items():
+        project_template.join(path).write(contents, ensure=True)
+    return repo_dir
+
+
+def make_context(**kwargs):
+    context = {
+        'repo_name': 'project',
+        'project_name': 'Project',
+        'author': 'Audrey',
+        'package': 'pkg',
+    }
+    context.update(kwargs)
+    return {'cookiecutter': context}
+
+
+def generate_project(template_dir, output_dir, context, **kwargs):
+    return generate.generate_files(
+        context=context,
+        repo_dir=str(template_dir),
+        output_dir=str(output_dir),
+        **kwargs
+    )
+
+
+def age_files(project_dir):
+    for root, dirs, files in os.walk(project_dir):
+        for f in files:
+            os.utime(os.path.join(root, f), (OLD_MTIME, OLD_MTIME))
+
+
+def changed_files(project_dir):
+    changed = []
+    for root, dirs, files in os.walk(project_dir):
+        for f in files:
+            path = os.path.join(root, f)
+            if f != manifest.MANIFEST_FILENAME and \
+                    os.path.getmtime(path) != OLD_MTIME:
+                changed.append(os.path.relpath(path, project_dir))
+    return sorted(changed)
+
+
+def read_manifest(project_dir):
+    manifest_file = os.path.join(project_dir, manifest.MANIFEST_FILENAME)
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def test_generate_files_writes_manifest(template_dir, tmpdir):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(),
+        manifest_path=manifest.MANIFEST_FILENAME
+    )
+
+    project_manifest = read_manifest(project_dir)
+    assert project_manifest['context'] == make_context()
+    files = project_manifest['files']
+    assert sorted(files) == [path.replace(os.sep, '/') for path in ALL_FILES]
+    assert files['README.rst']['source'] == 'README.rst'
+    assert files['README.rst']['variables'] == ['cookiecutter.project_name']
+    assert files['LICENSE']['variables'] == ['cookiecutter.author']
+    assert files['context.json']['variables'] == ['cookiecutter']
+    assert files['docs/index.rst']['sources'] == [
+        'docs/index.rst', 'partial.rst'
+    ]
+    assert files['docs/index.rst']['variables'] == ['cookiecutter.author']
+    assert files['pkg/__init__.py']['source'] == \
+        '{{ cookiecutter.package }}/__init__.py'
+    assert files['pkg/__init__.py']['variables'] == ['cookiecutter.package']
+    assert set(project_manifest['sources']) == set(
+        entry['source'] for entry in files.values()
+    )
+
+
+def test_generate_files_writes_manifest_elsewhere(template_dir, tmpdir):
+    manifest_file = tmpdir.join('manifest.json')
+    generate_project(
+        template_dir, tmpdir.mkdir('output'), make_context(),
+        manifest_path=str(manifest_file)
+    )
+
+    assert 'README.rst' in json.loads(manifest_file.read())['files']
+
+
+@pytest.mark.parametrize('context, changed', [
+    (make_context(), []),
+    (make_context(project_name='Renamed'), ['README.rst', 'context.json']),
+    (make_context(author='Daniel'), [
+        'LICENSE', 'context.json', os.path.join('docs', 'index.rst'),
+        'partial.rst'
+    ]),
+])
+def test_update_renders_files_of_changed_variables(
+        template_dir, tmpdir, context, changed, caplog):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(),
+        manifest_path=manifest.MANIFEST_FILENAME
+    )
+    age_files(project_dir)
+
+    with caplog.at_level(logging.INFO):
+        generate_project(template_dir, tmpdir, context, update=True)
+
+    assert changed_files(project_dir) == changed
+    assert '{} files unchanged, {} updated, 0 created'.format(
+        len(ALL_FILES) - len(changed), len(changed)
+    ) in caplog.text
+    assert read_manifest(project_dir)['context'] == context
+
+
+def test_update_renders_files_of_changed_sources(template_dir, tmpdir):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(), update=True
+    )
+    age_files(project_dir)
+    template_dir.join('{{ cookiecutter.repo_name }}', 'partial.rst').write(
+        'By {{ cookiecutter.author }}\n'
+    )
+
+    generate_project(template_dir, tmpdir, make_context(), update=True)
+
+    assert changed_files(project_dir) == [
+        os.path.join('docs', 'index.rst'), 'partial.rst'
+    ]
+    with open(os.path.join(project_dir, 'docs', 'index.rst')) as f:
+        assert f.read() == 'By Audrey\n\n'
+
+
+def test_update_restores_missing_files(template_dir, tmpdir):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(), update=True
+    )
+    age_files(project_dir)
+    os.remove(os.path.join(project_dir, 'LICENSE'))
+
+    generate_project(template_dir, tmpdir, make_context(), update=True)
+
+    assert changed_files(project_dir) == ['LICENSE']
+
+
+def test_update_restores_modified_files(template_dir, tmpdir):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(), update=True
+    )
+    license_file = os.path.join(project_dir, 'LICENSE')
+    with open(license_file, 'w') as f:
+        f.write('Modified\n')
+    age_files(project_dir)
+
+    generate_project(template_dir, tmpdir, make_context(), update=True)
+
+    assert changed_files(project_dir) == ['LICENSE']
+    with open(license_file) as f:
+        assert f.read() == 'Audrey\n'
+
+
+@pytest.mark.parametrize('manifest_contents', ['Not JSON', '[]'])
+def test_update_with_invalid_manifest_renders_everything(
+        template_dir, tmpdir, manifest_contents):
+    project_dir = generate_project(template_dir, tmpdir, make_context())
+    age_files(project_dir)
+    with open(os.path.join(project_dir, manifest.MANIFEST_FILENAME), 'w') \
+            as f:
+        f.write(manifest_contents)
+
+    generate_project(template_dir, tmpdir, make_context(), update=True)
+
+    assert changed_files(project_dir) == ALL_FILES
+    assert 'README.rst' in read_manifest(project_dir)['files']
+
+
+def test_update_renders_everything_when_private_variables_change(
+        template_dir, tmpdir):
+    project_dir = generate_project(
+        template_dir, tmpdir, make_context(), update=True
+    )
+    age_files(project_dir)
+
+    generate_project(
+        template_dir, tmpdir,
+        make_context(_copy_without_render=['static.txt']),
+        update=True
+    )
+
+    assert changed_files(project_dir) == ALL_FILES
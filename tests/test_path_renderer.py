@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_path_renderer
+------------------
+
+Tests for `cookiecutter.generate.PathRenderer`.
+"""
+
+from __future__ import unicode_literals
+import os
+
+import pytest
+
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.generate import PathRenderer
+
+
+@pytest.fixture
+def context():
+    return {
+        'cookiecutter': {
+            'project_slug': 'pizza',
+            'generate': 'y',
+        }
+    }
+
+
+@pytest.fixture
+def env(context):
+    return StrictEnvironment(context=context, keep_trailing_newline=True)
+
+
+@pytest.fixture
+def path_renderer(env, context):
+    return PathRenderer(env, context)
+
+
+def naive_render(env, context, path):
+    """Render a path the way `generate_files` used to."""
+    return env.from_string(path).render(**context)
+
+
+@pytest.mark.parametrize('path', [
+    os.path.join('docs', 'index.rst'),
+    os.path.join('{{cookiecutter.project_slug}}', '__init__.py'),
+    os.path.join(
+        '{{cookiecutter.project_slug}}',
+        '{{cookiecutter.project_slug}}_{{ "tests" }}',
+        'test_{{cookiecutter.project_slug}}.py'
+    ),
+    os.path.join(
+        '{% if cookiecutter.generate == "y" %}docs',
+        'conf.py{% endif %}'
+    ),
+    os.path.join('{# comment #}docs', '{{cookiecutter.project_slug}}.rst'),
+    '{{ cookiecutter.project_slug }}',
+])
+def test_render_matches_rendering_whole_path(env, context, path_renderer,
+                                             path):
+    assert path_renderer.render(path) == naive_render(env, context, path)
+
+
+def test_render_literal_path_without_compiling(mocker, env, path_renderer):
+    from_string = mocker.spy(env, 'from_string')
+    path = os.path.join('docs', 'index.rst')
+
+    assert path_renderer.render(path) == path
+    assert not from_string.called
+
+
+def test_render_prefix_once(mocker, env, path_renderer):
+    from_string = mocker.spy(env, 'from_string')
+
+    for name in ('a.py', 'b.py', 'c.py'):
+        rendered = path_renderer.render(
+            os.path.join('{{cookiecutter.project_slug}}', name)
+        )
+        assert rendered == os.path.join('pizza', name)
+
+    from_string.assert_called_once_with('{{cookiecutter.project_slug}}')
+
+
+def make_template_paths(count):
+    """Return `count` paths shaped like those of a large template."""
+    return [
+        os.path.join(
+            '{{cookiecutter.project_slug}}',
+            'module_{}'.format(i // 100),
+            '{{cookiecutter.project_slug}}_%d.py' % (i % 100),
+        )
+        for i in range(count)
+    ]
+
+
+def test_render_10k_paths_compiles_each_name_once(mocker, env, context):
+    """Render a 10k path template, checking a tenth of it naively.
+
+    Rendering every path naively compiles a template per path, whereas the
+    renderer compiles each distinct templated name once: the project
+    directory and the 100 file names.
+    """
+    paths = make_template_paths(10000)
+    naive = [naive_render(env, context, p) for p in paths[:1000]]
+    from_string = mocker.spy(env, 'from_string')
+
+    path_renderer = PathRenderer(env, context)
+    rendered = [path_renderer.render(p) for p in paths]
+
+    assert rendered[:1000] == naive
+    assert from_string.call_count == 101
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_post_gen_tasks
+-------------------
+
+Tests for the post-generation tasks of `cookiecutter.hooks`.
+"""
+
+from __future__ import unicode_literals
+import os
+import sys
+import time
+
+import pytest
+
+from cookiecutter import generate, hooks
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.exceptions import FailedHookException, HookTimeoutException
+
+
+def python_command(code):
+    return [sys.executable, '-c', code]
+
+
+def get_tasks(raw_tasks, **variables):
+    context = {
+        'cookiecutter': dict(variables, _post_gen_tasks=raw_tasks)
+    }
+    return hooks.get_post_gen_tasks(context, StrictEnvironment())
+
+
+def test_get_post_gen_tasks():
+    tasks = get_tasks([
+        {'name': 'init', 'command': 'git init {{ cookiecutter.name }}'},
+        {'name': 'commit', 'command': ['git', 'commit'],
+         'depends_on': 'init'},
+    ], name='project')
+
+    assert tasks == [
+        hooks.PostGenTask('init', 'git init project', ()),
+        hooks.PostGenTask('commit', ['git', 'commit'], ('init',)),
+    ]
+    assert get_tasks([]) == []
+
+
+@pytest.mark.parametrize('raw_tasks', [
+    {'name': 'init'},
+    [{'name': 'init'}],
+    [{'name': 'a', 'command': 'true'}, {'name': 'a', 'command': 'true'}],
+    [{'name': 'a', 'command': 'true', 'depends_on': ['b']}],
+    [
+        {'name': 'a', 'command': 'true', 'depends_on': ['b']},
+        {'name': 'b', 'command': 'true', 'depends_on': ['a']},
+    ],
+])
+def test_get_post_gen_tasks_invalid(raw_tasks):
+    with pytest.raises(FailedHookException):
+        get_tasks(raw_tasks)
+
+
+def test_run_post_gen_tasks(capsys, tmpdir):
+    tasks = get_tasks([
+        {'name': 'read', 'depends_on': ['write'], 'command': python_command(
+            'print(open("data.txt").read())'
+        )},
+        {'name': 'write', 'command': python_command(
+            'open("data.txt", "w").write("written")'
+        )},
+        {'name': 'other', 'command': python_command('print("other")')},
+    ])
+
+    hooks.run_post_gen_tasks(tasks, str(tmpdir))
+
+    output = capsys.readouterr()[0].splitlines()
+    assert sorted(output) == ['[other] other', '[read] written']
+
+
+def test_run_post_gen_tasks_fails_fast(capsys, tmpdir):
+    tasks = get_tasks([
+        {'name': 'fail', 'command': python_command(
+            'import sys; sys.exit(3)'
+        )},
+        {'name': 'after', 'depends_on': ['fail'], 'command': python_command(
+            'open("after.txt", "w")'
+        )},
+        {'name': 'slow', 'command': python_command(
+            'import time; time.sleep(30)'
+        )},
+    ])
+
+    with pytest.raises(FailedHookException) as excinfo:
+        hooks.run_post_gen_tasks(tasks, str(tmpdir), workers=2)
+
+    assert 'task fail failed (exit status: 3)' in str(excinfo.value)
+    assert not tmpdir.join('after.txt').exists()
+
+
+def assert_exits(pid):
+    for _ in range(50):
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return
+        time.sleep(0.1)
+    pytest.fail('Process {} is still running'.format(pid))
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason='Uses process groups')
+def test_run_post_gen_tasks_cancels_process_groups(mocker, tmpdir):
+    mocker.patch('cookiecutter.hooks.CANCEL_GRACE_PERIOD', 0.5)
+    tasks = get_tasks([
+        {'name': 'fail', 'command': python_command(
+            'import os, sys, time\n'
+            'while len(os.listdir(".")) < 2: time.sleep(0.1)\n'
+            'sys.exit(1)'
+        )},
+        {'name': 'child', 'command': 'sleep 30 & echo $! > child.pid; wait'},
+        {'name': 'stubborn', 'command': python_command(
+            'import os, signal, time\n'
+            'signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+            'open("stubborn.pid", "w").write(str(os.getpid()))\n'
+            'time.sleep(30)'
+        )},
+    ])
+
+    start = time.time()
+    with pytest.raises(FailedHookException):
+        hooks.run_post_gen_tasks(tasks, str(tmpdir), workers=3)
+
+    assert time.time() - start < 10
+    assert_exits(int(tmpdir.join('child.pid').read()))
+    assert_exits(int(tmpdir.join('stubborn.pid').read()))
+
+
+def test_generate_files_runs_post_gen_tasks(tmpdir):
+    project_dir = generate.generate_files(
+        context={'cookiecutter': {
+            'pyhooks': 'tasks',
+            '_post_gen_tasks': [{'name': 'touch', 'command': python_command(
+                'open("{{ cookiecutter.pyhooks }}.txt", "w")'
+            )}],
+        }},
+        repo_dir='tests/test-pyhooks',
+        output_dir=str(tmpdir)
+    )
+
+    assert tmpdir.join('inputtasks', 'tasks.txt').exists()
+    assert project_dir == str(tmpdir.join('inputtasks'))
+
+
+def test_generate_files_failing_task_removes_project(tmpdir):
+    with pytest.raises(FailedHookException):
+        generate.generate_files(
+            context={'cookiecutter': {
+                'pyhooks': 'tasks',
+                '_post_gen_tasks': [{'name': 'fail', 'command': python_command(
+                    'import sys; sys.exit(1)'
+                )}],
+            }},
+            repo_dir='tests/test-pyhooks',
+            output_dir=str(tmpdir)
+        )
+
+    assert not tmpdir.join('inputtasks').exists()
+
+
+def test_run_post_gen_tasks_timeout(mocker, tmpdir):
+    mocker.patch('cookiecutter.hooks.metrics', hooks.HookMetrics())
+    tasks = get_tasks([{'name': 'hang', 'command': python_command(
+        'import time; time.sleep(30)'
+    )}])
+
+    with pytest.raises(HookTimeoutException) as excinfo:
+        hooks.run_post_gen_tasks(
+            tasks, str(tmpdir), limits=hooks.HookLimits(timeout=0.5)
+        )
+
+    assert 'task hang failed (timed out after 0.5 seconds)' in \
+        str(excinfo.value)
+    assert hooks.metrics.as_dict()['post_gen_tasks']['timed_out'] == 1
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_server
+-----------
+
+Tests for `cookiecutter.server` module.
+"""
+
+from __future__ import unicode_literals
+import io
+import json
+import os
+import socket
+import tarfile
+import threading
+
+import pytest
+
+from cookiecutter import config, server
+from cookiecutter.batch import PreparedTemplate
+
+
+@pytest.fixture
+def template_pool():
+    template_pool = server.TemplatePool(config.DEFAULT_CONFIG)
+    yield template_pool
+    template_pool.close()
+
+
+@pytest.fixture
+def running_server(tmpdir, template_pool):
+    generation_server = server.make_server(
+        'localhost:0', template_pool, 'tests/fake-repo-pre/',
+        allowed_templates=['tests/fake-repo-bad/'], output_root=str(tmpdir)
+    )
+    thread = threading.Thread(target=generation_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield generation_server
+    generation_server.shutdown()
+    generation_server.server_close()
+    thread.join()
+
+
+def post(generation_server, body, path='/generate', headers=None):
+    """Send a raw HTTP request and return the status and body of the reply."""
+    if isinstance(body, dict):
+        body = json.dumps(body)
+    body = body.encode('utf-8')
+    headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+    headers['Content-Length'] = len(body)
+    request = 'POST {} HTTP/1.0\r\n{}\r\n'.format(path, ''.join(
+        '{}: {}\r\n'.format(name, value) for name, value in headers.items()
+    )).encode('ascii') + body
+
+    if isinstance(generation_server.server_address, tuple):
+        sock = socket.create_connection(generation_server.server_address[:2])
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(generation_server.server_address)
+    try:
+        sock.sendall(request)
+        reply = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        sock.close()
+
+    head, _, reply_body = reply.partition(b'\r\n\r\n')
+    status = int(head.split(b' ')[1])
+    return status, reply_body
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_generate_dir(tmpdir, running_server):
+    status, body = post(running_server, {
+        'extra_context': {'repo_name': 'fake-project-a'},
+        'output_dir': str(tmpdir),
+    })
+
+    assert status == 200
+    project_dir = tmpdir.join('fake-project-a')
+    assert json.loads(body.decode('utf-8')) == {
+        'project_dir': str(project_dir)
+    }
+    assert project_dir.join('README.rst').isfile()
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_generate_tar(running_server):
+    status, body = post(running_server, {
+        'extra_context': {'repo_name': 'fake-project-tar'},
+        'format': 'tar',
+    })
+
+    assert status == 200
+    with tarfile.open(fileobj=io.BytesIO(body), mode='r:gz') as tar:
+        names = tar.getnames()
+    assert 'fake-project-tar/README.rst' in names
+    assert not os.path.exists('fake-project-tar')
+
+
+@pytest.mark.usefixtures('clean_system')
+def test_generate_reuses_prepared_template(mocker, tmpdir, running_server):
+    prepare = mocker.spy(PreparedTemplate, '__init__')
+
+    for name in ('a', 'b'):
+        status, _ = post(running_server, {
+            'extra_context': {'repo_name': 'fake-project-{}'.format(name)},
+            'output_dir': str(tmpdir),
+        })
+        assert status == 200
+
+    assert prepare.call_count == 1
+
+
+@pytest.mark.parametrize('body, path, expected_status', [
+    ({}, '/other', 404),
+    ('{"template": ', '/generate', 400),
+    ('["template"]', '/generate', 400),
+    ({'template': 'tests/fake-repo-bad/'}, '/generate', 400),
+    ({'template': 'tests/fake-repo-tmpl/'}, '/generate', 403),
+    ({'output_dir': '..'}, '/generate', 403),
+    ({'output_dir': '/'}, '/generate', 403),
+])
+@pytest.mark.usefixtures('clean_system')
+def test_generate_bad_request(running_server, body, path, expected_status):
+    status, body = post(running_server, body, path=path)
+
+    assert status == expected_status
+    assert 'error' in json.loads(body.decode('utf-8'))
+
+
+@pytest.mark.parametrize('headers, expected_status', [
+    ({'Content-Type': 'text/plain'}, 415),
+    ({'Content-Type': 'application/x-www-form-urlencoded'}, 415),
+    ({'Origin': 'http://localhost'}, 403),
+    ({'Host': 'attacker.example.com'}, 403),
+    ({'Host': 'attacker.example.com:8000'}, 403),
+])
+@pytest.mark.usefixtures('clean_system')
+def test_generate_foreign_request(tmpdir, running_server, headers,
+                                  expected_status):
+    status, body = post(running_server, {
+        'extra_context': {'repo_name': 'fake-project-a'},
+    }, headers=headers)
+
+    assert status == expected_status
+    assert 'error' in json.loads(body.decode('utf-8'))
+    assert not tmpdir.join('fake-project-a').exists()
+
+
+@pytest.mark.parametrize('host', ['localhost', '127.0.0.1:8000', '[::1]'])
+@pytest.mark.usefixtures('clean_system')
+def test_generate_local_host(tmpdir, running_server, host):
+    status, _ = post(running_server, {
+        'extra_context': {'repo_name': 'fake-project-a'},
+        'output_dir': 'projects',
+    }, headers={'Host': host})
+
+    assert status == 200
+    assert tmpdir.join('projects', 'fake-project-a').isdir()
+
+
+@pytest.mark.skipif(
+    not hasattr(socket, 'AF_UNIX'), reason='Unix sockets are not available'
+)
+@pytest.mark.usefixtures('clean_system')
+def test_generate_on_unix_socket(tmpdir, template_pool):
+    socket_path = str(tmpdir.join('cookiecutter.sock'))
+    generation_server = server.make_server(
+        'unix:' + socket_path, template_pool, 'tests/fake-repo-pre/',
+        output_root=str(tmpdir)
+    )
+    thread = threading.Thread(target=generation_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        status, _ = post(generation_server, {
+            'extra_context': {'repo_name': 'fake-project-a'},
+            'output_dir': str(tmpdir),
+        })
+    finally:
+        generation_server.shutdown()
+        generation_server.server_close()
+        thread.join()
+
+    assert status == 200
+    assert tmpdir.join('fake-project-a').isdir()
+    assert not os.path.exists(socket_path)
+
+
+def test_template_pool_use(mocker, template_pool):
+    prepare = mocker.patch(
+        'cookiecutter.server.PreparedTemplate',
+        side_effect=lambda *args, **kwargs: mocker.Mock()
+    )
+
+    with template_pool.use('foo') as prepared_template:
+        pass
+    with template_pool.use('foo') as other:
+        assert other is prepared_template
+    assert prepare.call_count == 1
+
+    template_pool.close()
+    assert prepared_template.close.called
+
+
+def test_template_pool_clones_into_own_dirs(mocker, template_pool):
+    prepare = mocker.patch(
+        'cookiecutter.server.PreparedTemplate',
+        side_effect=lambda *args, **kwargs: mocker.Mock()
+    )
+
+    with template_pool.use('foo', checkout='a'):
+        pass
+    with template_pool.use('foo', checkout='b'):
+        pass
+
+    clone_dirs = [
+        kwargs['clone_to_dir'] for _, kwargs in prepare.call_args_list
+    ]
+    assert len(set(clone_dirs)) == 2
+    assert all(os.path.isdir(clone_dir) for clone_dir in clone_dirs)
+
+    template_pool.close()
+    assert not any(os.path.exists(clone_dir) for clone_dir in clone_dirs)
+
+
+def test_template_pool_refresh_closes_unused_template(mocker, template_pool):
+    mocker.patch(
+        'cookiecutter.server.PreparedTemplate',
+        side_effect=lambda *args, **kwargs: mocker.Mock()
+    )
+
+    with template_pool.use('foo') as old:
+        with template_pool.use('foo', refresh=True) as new:
+            assert new is not old
+            # Still in use by the outer request
+            assert not old.close.called
+        assert not new.close.called
+    assert old.close.called
+
+    with template_pool.use('foo') as current:
+        assert current is new
+
+
+def test_template_pool_closes_least_recently_used(mocker):
+    mocker.patch(
+        'cookiecutter.server.PreparedTemplate',
+        side_effect=lambda *args, **kwargs: mocker.Mock()
+    )
+    template_pool = server.TemplatePool(config.DEFAULT_CONFIG, max_templates=2)
+
+    with template_pool.use('foo') as foo:
+        pass
+    with template_pool.use('bar') as bar:
+        pass
+    with template_pool.use('foo'):
+        pass
+    with template_pool.use('baz') as baz:
+        pass
+
+    assert bar.close.called
+    assert not foo.close.called
+    assert not baz.close.called
+
+    template_pool.close()
+    assert foo.close.called
+
+
+def test_template_pool_closes_evicted_template_once_unused(mocker):
+    mocker.patch(
+        'cookiecutter.server.PreparedTemplate',
+        side_effect=lambda *args, **kwargs: mocker.Mock()
+    )
+    template_pool = server.TemplatePool(config.DEFAULT_CONFIG, max_templates=1)
+
+    with template_pool.use('foo') as foo:
+        with template_pool.use('bar') as bar:
+            # Still in use by the outer request
+            assert not foo.close.called
+    assert foo.close.called
+    assert not bar.close.called
+
+    template_pool.close()
+    assert bar.close.called
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_sink
+---------
+
+Tests for generating projects into the sinks of `cookiecutter.sink`.
+"""
+
+from __future__ import unicode_literals
+import io
+import os
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from cookiecutter import generate, sink
+
+
+CONTEXT = {
+    'cookiecutter': {
+        'repo_name': 'test_sink',
+        'render_test': 'I have been rendered!',
+        '_copy_without_render': [
+            '*not-rendered',
+            'rendered/not_rendered.yml',
+            '*.txt',
+        ]}
+}
+
+FILES = [
+    'test_sink/README.rst',
+    'test_sink/README.txt',
+    'test_sink/rendered/not_rendered.yml',
+    'test_sink/test_sink-rendered/README.rst',
+    'test_sink/test_sink-rendered/README.txt',
+    'test_sink/{{cookiecutter.repo_name}}-not-rendered/README.rst',
+]
+
+
+def generate_project(project_sink, **kwargs):
+    return generate.generate_files(
+        context=CONTEXT,
+        repo_dir='tests/test-generate-copy-without-render',
+        sink=project_sink,
+        **kwargs
+    )
+
+
+def test_memory_sink(tmpdir):
+    memory_sink = sink.MemorySink()
+    project_dir = generate_project(memory_sink, output_dir=str(tmpdir))
+
+    assert project_dir == str(tmpdir.join('test_sink'))
+    assert tmpdir.listdir() == []
+    prefix = memory_sink.get_name(str(tmpdir)) + '/'
+    assert sorted(memory_sink.files) == [prefix + f for f in FILES]
+    assert 'I have been rendered!' in memory_sink.files[
+        prefix + 'test_sink/README.rst'
+    ].decode('utf-8')
+    assert '{{cookiecutter.render_test}}' in memory_sink.files[
+        prefix + 'test_sink/README.txt'
+    ].decode('utf-8')
+    assert prefix + 'test_sink/rendered' in memory_sink.dirs
+
+
+def test_memory_sink_matches_filesystem(tmpdir):
+    memory_sink = sink.MemorySink()
+    generate_project(memory_sink)
+    generate_project(None, output_dir=str(tmpdir))
+
+    for name, contents in memory_sink.files.items():
+        outfile = tmpdir.join(*name.split('/'))
+        assert outfile.read_binary() == contents
+        assert memory_sink.modes[name] == stat.S_IMODE(outfile.stat().mode)
+
+
+def test_memory_sink_existing_project():
+    memory_sink = sink.MemorySink()
+    generate_project(memory_sink)
+
+    with pytest.raises(generate.OutputDirExistsException):
+        generate_project(memory_sink)
+    generate_project(memory_sink, overwrite_if_exists=True)
+
+
+def test_zip_sink():
+    buf = io.BytesIO()
+    with sink.ZipSink(buf) as zip_sink:
+        generate_project(zip_sink)
+
+    with zipfile.ZipFile(buf) as zf:
+        names = zf.namelist()
+        assert 'test_sink/' in names
+        assert 'test_sink/rendered/' in names
+        assert sorted(n for n in names if not n.endswith('/')) == FILES
+        assert b'I have been rendered!' in zf.read('test_sink/README.rst')
+        mode = zf.getinfo('test_sink/README.rst').external_attr >> 16
+        assert stat.S_ISREG(mode)
+
+
+def test_tar_sink_binaries():
+    buf = io.BytesIO()
+    with sink.TarSink(buf) as tar_sink:
+        generate.generate_files(
+            context={
+                'cookiecutter': {
+                    'binary_test': 'binary_files',
+                    '_copy_without_render': ['*-not-rendered']
+                }
+            },
+            repo_dir='tests/test-generate-binaries',
+            sink=tar_sink
+        )
+
+    buf.seek(0)
+    with tarfile.open(fileobj=buf, mode='r:gz') as tar:
+        logo = tar.getmember('inputbinary_files/logo.png')
+        assert logo.isfile()
+        with io.open(os.path.join(
+                'tests/test-generate-binaries',
+                'input{{cookiecutter.binary_test}}', 'logo.png'), 'rb') as f:
+            assert tar.extractfile(logo).read() == f.read()
+        assert tar.getmember('inputbinary_files/binary_files').isdir()
+    assert not os.path.exists('inputbinary_files')
+
+
+def test_sink_does_not_run_hooks(mocker, caplog):
+    run_hook = mocker.patch('cookiecutter.generate.run_hook')
+
+    memory_sink = sink.MemorySink()
+    generate.generate_files(
+        context={'cookiecutter': {'pyhooks': 'pyhooks'}},
+        repo_dir='tests/test-pyhooks',
+        sink=memory_sink
+    )
+
+    assert not run_hook.called
+    assert list(memory_sink.files) == ['inputpyhooks/README.rst']
+    assert 'Not running the hooks' in caplog.text
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'incremental': True},
+    {'update': True},
+    {'manifest_path': 'manifest.json'},
+    {'workers': 2, 'worker_pool': 'process'},
+])
+def test_sink_unsupported_options(kwargs):
+    with pytest.raises(ValueError):
+        generate_project(sink.MemorySink(), **kwargs)
+
+
+def test_memory_sink_thread_workers():
+    memory_sink = sink.MemorySink()
+    generate_project(memory_sink, workers=4)
+
+    assert sorted(memory_sink.files) == FILES
+
+
+def test_entry_sink_is_abstract():
+    class IncompleteSink(sink._EntrySink):
+        def _add_dir(self, name, mode):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteSink()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+test_source
+-----------
+
+Tests for `cookiecutter.source` module.
+"""
+
+from __future__ import unicode_literals
+import os
+import zipfile as stdlib_zipfile
+
+import pytest
+
+from cookiecutter import generate, source, zipfile
+
+TEMPLATES = [
+    ('tests/test-generate-copy-without-render', {
+        'repo_name': 'test_copy_without_render',
+        'render_test': 'I have been rendered!',
+        '_copy_without_render': [
+            '*not-rendered',
+            'rendered/not_rendered.yml',
+            '*.txt',
+        ],
+    }),
+    ('tests/test-generate-binaries', {'binary_test': 'binary_files'}),
+    ('tests/test-generate-files-permissions', {'permissions': 'permissions'}),
+]
+
+
+def make_zip_repo(repo_dir, zip_path):
+    """Zip `repo_dir` as a repository with a top-level dir named ``repo``."""
+    with stdlib_zipfile.ZipFile(zip_path, 'w') as zf:
+        zf.write(repo_dir, 'repo/')
+        for root, dirs, files in os.walk(repo_dir):
+            for name in sorted(dirs) + sorted(files):
+                path = os.path.join(root, name)
+                zf.write(path, 'repo/' + os.path.relpath(path, repo_dir))
+    return zip_path
+
+
+def snapshot(top):
+    """Return the files below `top` with their contents and permissions."""
+    files = {}
+    for root, dirs, filenames in os.walk(top):
+        for name in dirs + filenames:
+            path = os.path.join(root, name)
+            contents = None
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    contents = f.read()
+            files[os.path.relpath(path, top)] = (
+                contents, os.stat(path).st_mode & 0o777
+            )
+    return files
+
+
+@pytest.fixture
+def zip_repo(tmpdir):
+    return make_zip_repo(
+        'tests/test-generate-copy-without-render',
+        str(tmpdir.join('repo.zip'))
+    )
+
+
+def test_unzip_leaves_template_in_archive(tmpdir, zip_repo):
+    repo_dir = zipfile.unzip(
+        zip_repo,
+        is_url=False,
+        clone_to_dir=str(tmpdir),
+        extract_template=False
+    )
+
+    assert sorted(os.listdir(repo_dir)) == [
+        source.ZIP_SOURCE_FILENAME, '{{cookiecutter.repo_name}}'
+    ]
+    assert os.listdir(
+        os.path.join(repo_dir, '{{cookiecutter.repo_name}}')
+    ) == []
+    template_source = source.get_template_source(repo_dir)
+    assert isinstance(template_source, source.ZipSource)
+    assert template_source.name == '{{cookiecutter.repo_name}}'
+
+
+def test_get_template_source_of_dir():
+    template_source = source.get_template_source('tests/fake-repo-pre')
+
+    assert isinstance(template_source, source.FileSystemSource)
+    assert template_source.template_dir == os.path.abspath(
+        'tests/fake-repo-pre/{{cookiecutter.repo_name}}'
+    )
+
+
+@pytest.mark.parametrize('repo_dir, context', TEMPLATES)
+@pytest.mark.parametrize('workers, worker_pool', [
+    (None, 'thread'),
+    (3, 'thread'),
+    (2, 'process'),
+])
+def test_generate_files_from_zip(tmpdir, repo_dir, context, workers,
+                                 worker_pool):
+    context = {'cookiecutter': context}
+    zip_repo_dir = zipfile.unzip(
+        make_zip_repo(repo_dir, str(tmpdir.join('repo.zip'))),
+        is_url=False,
+        clone_to_dir=str(tmpdir),
+        extract_template=False
+    )
+
+    expected = generate.generate_files(
+        repo_dir, context=context, output_dir=str(tmpdir.mkdir('from_dir'))
+    )
+    project_dir = generate.generate_files(
+        zip_repo_dir,
+        context=context,
+        output_dir=str(tmpdir.mkdir('from_zip')),
+        workers=workers,
+        worker_pool=worker_pool
+    )
+
+    assert os.path.basename(project_dir) == os.path.basename(expected)
+    assert snapshot(project_dir) == snapshot(expected)
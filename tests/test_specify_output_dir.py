@@ -2,7 +2,7 @@
 
 import pytest
 
-from cookiecutter import main
+from cookiecutter import hooks, main
 
 
 @pytest.fixture
@@ -54,7 +54,18 @@ def test_api_invocation(mocker, template, output_dir, context):
         repo_dir=template,
         context=context,
         overwrite_if_exists=False,
-        output_dir=output_dir
+        output_dir=output_dir,
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        analysis=None,
+        dry_run=False,
+        bytecode_cache=None,
+        binary_cache=None,
+        hook_limits=hooks.HookLimits(),
+        link_files=False
     )
 
 
@@ -67,5 +78,16 @@ def test_default_output_dir(mocker, template, context):
         repo_dir=template,
         context=context,
         overwrite_if_exists=False,
-        output_dir='.'
+        output_dir='.',
+        workers=None,
+        worker_pool='thread',
+        incremental=False,
+        manifest_path=None,
+        update=False,
+        analysis=None,
+        dry_run=False,
+        bytecode_cache=None,
+        binary_cache=None,
+        hook_limits=hooks.HookLimits(),
+        link_files=False
     )
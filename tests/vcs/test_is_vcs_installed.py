@@ -12,7 +12,7 @@ from cookiecutter import vcs
 ])
 def test_is_vcs_installed(mocker, which_return, result):
     mocker.patch(
-        'cookiecutter.vcs.which',
+        'whichcraft.which',
         autospec=True,
         return_value=which_return
     )
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import subprocess
+
+import pytest
+
+from cookiecutter import config, vcs
+
+
+def git(*args, **kwargs):
+    return subprocess.check_output(
+        ('git',) + args, stderr=subprocess.STDOUT, **kwargs
+    ).decode('utf-8').strip()
+
+
+def commit_readme(repo_dir, text):
+    with io.open(os.path.join(repo_dir, 'README.rst'), 'w') as f:
+        f.write(text)
+    git('add', 'README.rst', cwd=repo_dir)
+    git(
+        '-c', 'user.name=Cookiecutter', '-c', 'user.email=cc@example.com',
+        'commit', '-q', '-m', text, cwd=repo_dir
+    )
+    return git('rev-parse', 'HEAD', cwd=repo_dir)
+
+
+@pytest.fixture
+def origin(tmpdir):
+    """Git repo standing in for a remote template repo."""
+    origin = str(tmpdir.mkdir('origin.git'))
+    git('init', '-q', origin)
+    commit_readme(origin, 'first')
+    return origin
+
+
+@pytest.fixture
+def mirror_dir(tmpdir):
+    return str(tmpdir.join('mirrors'))
+
+
+@pytest.fixture
+def clone_dir(tmpdir):
+    return str(tmpdir.mkdir('clone_dir'))
+
+
+def read_readme(repo_dir):
+    with io.open(os.path.join(repo_dir, 'README.rst')) as f:
+        return f.read()
+
+
+def test_clone_from_mirror(origin, mirror_dir, clone_dir):
+    repo_dir = vcs.clone(
+        'git+' + origin,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+
+    assert repo_dir == os.path.join(clone_dir, 'origin')
+    assert read_readme(repo_dir) == 'first'
+    [mirror] = os.listdir(mirror_dir)
+    assert mirror.startswith('origin-')
+    assert git('rev-parse', '--is-bare-repository',
+               cwd=os.path.join(mirror_dir, mirror)) == 'true'
+
+
+def test_clone_from_mirror_fetches_new_commits(mocker, origin, mirror_dir,
+                                               clone_dir):
+    vcs.clone(
+        'git+' + origin,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+    commit_readme(origin, 'second')
+    check_output = mocker.spy(vcs.subprocess, 'check_output')
+
+    repo_dir = vcs.clone(
+        'git+' + origin,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+
+    assert read_readme(repo_dir) == 'second'
+    commands = [args[0][:2] for args, _ in check_output.call_args_list]
+    assert ['git', 'fetch'] in commands
+    assert ['git', 'clone'] in commands
+
+
+def test_clone_known_commit_from_mirror_offline(mocker, origin, mirror_dir,
+                                                clone_dir):
+    first_commit = git('rev-parse', 'HEAD', cwd=origin)
+    commit_readme(origin, 'second')
+    vcs.clone(
+        'git+' + origin,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+    check_output = mocker.spy(vcs.subprocess, 'check_output')
+
+    repo_dir = vcs.clone(
+        'git+' + origin,
+        checkout=first_commit,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+
+    assert read_readme(repo_dir) == 'first'
+    commands = [args[0][:2] for args, _ in check_output.call_args_list]
+    assert ['git', 'fetch'] not in commands
+
+
+def test_update_mirror_fetches_branch_named_like_commit(mocker, origin,
+                                                        mirror_dir):
+    git('branch', 'cafe', cwd=origin)
+    vcs.update_mirror(origin, mirror_dir)
+    check_output = mocker.spy(vcs.subprocess, 'check_output')
+
+    vcs.update_mirror(origin, mirror_dir, checkout='cafe')
+
+    commands = [args[0][:2] for args, _ in check_output.call_args_list]
+    assert ['git', 'fetch'] in commands
+
+
+def test_get_mirror_dir(tmpdir):
+    config_dict = dict(config.DEFAULT_CONFIG, cache_dir=str(tmpdir))
+
+    assert vcs.get_mirror_dir(config_dict) is None
+
+    config_dict['git_mirror_cache'] = True
+    assert vcs.get_mirror_dir(config_dict) == str(tmpdir.join('git'))
+
+
+def test_clone_from_mirror_points_origin_at_repo(origin, mirror_dir,
+                                                 clone_dir):
+    commit_readme(origin, 'second')
+
+    repo_dir = vcs.clone(
+        'git+' + origin,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+
+    assert git('remote', 'get-url', 'origin', cwd=repo_dir) == origin
+    assert git('rev-list', '--count', 'HEAD', cwd=repo_dir) == '1'
+
+
+def test_clone_commit_from_mirror_without_old_contents(origin, mirror_dir,
+                                                       clone_dir):
+    first_commit = git('rev-parse', 'HEAD', cwd=origin)
+    commit_readme(origin, 'second')
+
+    repo_dir = vcs.clone(
+        'git+' + origin,
+        checkout=first_commit,
+        clone_to_dir=clone_dir,
+        no_input=True,
+        mirror_dir=mirror_dir
+    )
+
+    assert read_readme(repo_dir) == 'first'
+    assert git('remote', 'get-url', 'origin', cwd=repo_dir) == origin
+    assert git('config', 'remote.origin.promisor', cwd=repo_dir) == 'true'
+
+
+def test_clone_from_mirror_replaces_unmodified_clone(mocker, origin,
+                                                     mirror_dir, clone_dir):
+    vcs.clone('git+' + origin, clone_to_dir=clone_dir, mirror_dir=mirror_dir)
+    prompt_and_delete = mocker.patch('cookiecutter.vcs.prompt_and_delete')
+
+    repo_dir = vcs.clone(
+        'git+' + origin, clone_to_dir=clone_dir, mirror_dir=mirror_dir
+    )
+
+    assert read_readme(repo_dir) == 'first'
+    assert not prompt_and_delete.called
+
+
+def test_clone_from_mirror_prompts_for_modified_clone(mocker, origin,
+                                                      mirror_dir, clone_dir):
+    repo_dir = vcs.clone(
+        'git+' + origin, clone_to_dir=clone_dir, mirror_dir=mirror_dir
+    )
+    with io.open(os.path.join(repo_dir, 'README.rst'), 'w') as f:
+        f.write('changed')
+    prompt_and_delete = mocker.patch(
+        'cookiecutter.vcs.prompt_and_delete', return_value=False
+    )
+
+    vcs.clone('git+' + origin, clone_to_dir=clone_dir, mirror_dir=mirror_dir)
+
+    prompt_and_delete.assert_called_once_with(repo_dir, no_input=False)
+    assert read_readme(repo_dir) == 'changed'
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from requests.exceptions import ChunkedEncodingError, HTTPError
+
+from cookiecutter import zipfile
+from cookiecutter.exceptions import InvalidZipRepository
+
+URL = 'https://example.com/path/to/fake-repo-tmpl.zip'
+CONTENT = bytes(bytearray(range(256))) * 64
+
+
+class FakeServer(object):
+    """Serve `CONTENT`, supporting ranges and failing on demand."""
+
+    def __init__(self, mocker, status_code=200, interrupt=0):
+        self.mocker = mocker
+        self.status_code = status_code
+        self.interrupt = interrupt
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        response = self.mocker.MagicMock()
+        response.headers = {'ETag': '"v1"'}
+        response.status_code = self.status_code
+        if self.status_code >= 400:
+            response.raise_for_status.side_effect = HTTPError(
+                '{} Error'.format(self.status_code)
+            )
+        body = CONTENT
+        if 'Range' in headers and headers.get('If-Range') == '"v1"':
+            offset = int(headers['Range'][len('bytes='):-1])
+            response.status_code = 206
+            body = CONTENT[offset:]
+        response.iter_content.side_effect = (
+            lambda chunk_size: self.stream(body, chunk_size)
+        )
+        return response
+
+    def stream(self, body, chunk_size):
+        for i in range(0, len(body), chunk_size):
+            if self.interrupt and i >= 4096:
+                self.interrupt -= 1
+                raise ChunkedEncodingError('Connection broken')
+            yield body[i:i + chunk_size]
+
+
+@pytest.fixture
+def server(mocker):
+    server = FakeServer(mocker)
+    mocker.patch('requests.Session.get', side_effect=server.get)
+    return server
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_download_file(tmpdir, server):
+    path = str(tmpdir.join('fake-repo-tmpl.zip'))
+
+    response = zipfile.download_file(URL, path, chunk_size=1024)
+
+    assert response.status_code == 200
+    assert read(path) == CONTENT
+    assert os.listdir(str(tmpdir)) == ['fake-repo-tmpl.zip']
+
+
+def test_download_file_resumes_after_interruption(tmpdir, server):
+    server.interrupt = 1
+    path = str(tmpdir.join('fake-repo-tmpl.zip'))
+
+    zipfile.download_file(URL, path, chunk_size=1024)
+
+    assert read(path) == CONTENT
+    assert server.requests[1]['Range'] == 'bytes=4096-'
+
+
+def test_download_file_resumes_earlier_download(tmpdir, server):
+    server.interrupt = 1
+    path = str(tmpdir.join('fake-repo-tmpl.zip'))
+
+    with pytest.raises(ChunkedEncodingError):
+        zipfile.download_file(URL, path, chunk_size=1024, attempts=1)
+    assert not os.path.exists(path)
+
+    zipfile.download_file(URL, path, chunk_size=1024)
+
+    assert read(path) == CONTENT
+    assert server.requests[1]['Range'] == 'bytes=4096-'
+
+
+def test_download_file_http_error(tmpdir, server):
+    server.status_code = 404
+    path = str(tmpdir.join('fake-repo-tmpl.zip'))
+
+    with pytest.raises(InvalidZipRepository):
+        zipfile.download_file(URL, path)
+
+    assert not os.path.exists(path)
+
+
+def test_get_session_is_shared():
+    assert zipfile.get_session() is zipfile.get_session()
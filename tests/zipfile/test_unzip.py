@@ -213,10 +213,12 @@ def test_unzip_url(mocker, tmpdir):
     )
 
     request = mocker.MagicMock()
+    request.status_code = 200
+    request.headers = {}
     request.iter_content.return_value = mock_download()
 
     mocker.patch(
-        'cookiecutter.zipfile.requests.get',
+        'requests.Session.get',
         return_value=request,
         autospec=True,
     )
@@ -244,10 +246,12 @@ def test_unzip_url_existing_cache(mocker, tmpdir):
     )
 
     request = mocker.MagicMock()
+    request.status_code = 200
+    request.headers = {}
     request.iter_content.return_value = mock_download()
 
     mocker.patch(
-        'cookiecutter.zipfile.requests.get',
+        'requests.Session.get',
         return_value=request,
         autospec=True,
     )
@@ -272,10 +276,12 @@ def test_unzip_url_existing_cache_no_input(mocker, tmpdir):
     """In `unzip()`, if no_input is provided, the existing file will be removed.
     """
     request = mocker.MagicMock()
+    request.status_code = 200
+    request.headers = {}
     request.iter_content.return_value = mock_download()
 
     mocker.patch(
-        'cookiecutter.zipfile.requests.get',
+        'requests.Session.get',
         return_value=request,
         autospec=True,
     )
@@ -307,7 +313,7 @@ def test_unzip_should_abort_if_no_redownload(mocker, tmpdir):
     )
 
     mock_requests_get = mocker.patch(
-        'cookiecutter.zipfile.requests.get',
+        'requests.Session.get',
         autospec=True,
     )
 
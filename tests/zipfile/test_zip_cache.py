@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import tempfile
+
+import pytest
+
+from requests.exceptions import HTTPError
+
+from cookiecutter import config, zipfile
+from cookiecutter.exceptions import InvalidTarRepository
+
+ZIP_URL = 'https://example.com/path/to/fake-repo-tmpl.zip'
+
+
+def read_zip(path='tests/files/fake-repo-tmpl.zip'):
+    with open(path, 'rb') as zf:
+        return zf.read()
+
+
+@pytest.fixture
+def zip_cache(tmpdir):
+    return zipfile.ZipCache(str(tmpdir.join('zip')))
+
+
+@pytest.fixture
+def mock_get(mocker):
+    """Serve the fake repo zip, answering conditional requests with 304."""
+    def get(url, headers=None, stream=False, timeout=None):
+        response = mocker.MagicMock()
+        response.headers = {
+            'ETag': '"v1"',
+            'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        }
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            content = read_zip()
+            response.iter_content.return_value = [
+                content[i:i + 1024] for i in range(0, len(content), 1024)
+            ]
+        return response
+
+    return mocker.patch('requests.Session.get', side_effect=get)
+
+
+def test_fetch_downloads_once(zip_cache, mock_get):
+    zip_path = zip_cache.fetch(ZIP_URL)
+
+    assert read_zip(zip_path) == read_zip()
+    assert zip_cache.fetch(ZIP_URL) == zip_path
+
+    assert mock_get.call_count == 2
+    _, kwargs = mock_get.call_args
+    assert kwargs['headers'] == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT',
+    }
+
+
+def test_fetch_dedupes_by_content(zip_cache, mock_get):
+    zip_path = zip_cache.fetch(ZIP_URL)
+
+    assert zip_cache.fetch(ZIP_URL + '?mirror=1') == zip_path
+    assert os.listdir(zip_cache.objects_dir) == [os.path.basename(zip_path)]
+
+
+def test_fetch_downloads_again_when_evicted(zip_cache, mock_get):
+    zip_path = zip_cache.fetch(ZIP_URL)
+    os.remove(zip_path)
+
+    assert zip_cache.fetch(ZIP_URL) == zip_path
+    assert os.path.exists(zip_path)
+    _, kwargs = mock_get.call_args
+    assert kwargs['headers'] == {}
+
+
+def test_evict_keeps_recent_archives(tmpdir, mock_get):
+    zip_cache = zipfile.ZipCache(str(tmpdir.join('zip')), max_size=1)
+    old_object = os.path.join(zip_cache.objects_dir, 'old.zip')
+    os.makedirs(zip_cache.objects_dir)
+    with open(old_object, 'wb') as f:
+        f.write(b'old')
+
+    zip_path = zip_cache.fetch(ZIP_URL)
+
+    assert os.path.exists(zip_path)
+    assert not os.path.exists(old_object)
+
+
+def test_fetch_tar_archive(zip_cache, mock_get):
+    tar_url = 'https://example.com/path/to/fake-repo-tmpl.tar.gz'
+    tar_path = zip_cache.fetch(
+        tar_url, suffix='.tar', error_class=InvalidTarRepository
+    )
+
+    assert tar_path.endswith('.tar')
+    assert zip_cache.fetch(
+        tar_url, suffix='.tar', error_class=InvalidTarRepository
+    ) == tar_path
+    assert mock_get.call_count == 2
+
+    zip_cache.max_size = 1
+    zip_path = zip_cache.fetch(ZIP_URL + '?other=1')
+    assert os.listdir(zip_cache.objects_dir) == [os.path.basename(zip_path)]
+
+
+def test_fetch_raises_error_class(mocker, zip_cache):
+    response = mocker.MagicMock(status_code=404)
+    response.raise_for_status.side_effect = HTTPError('404 Not Found')
+    mocker.patch('requests.Session.get', return_value=response)
+
+    with pytest.raises(InvalidTarRepository):
+        zip_cache.fetch(
+            'https://example.com/missing.tar.gz', suffix='.tar',
+            error_class=InvalidTarRepository
+        )
+
+
+def test_open_caches_what_is_read(mocker, zip_cache):
+    content = read_zip()
+    response = mocker.MagicMock(status_code=200, headers={'ETag': '"v1"'})
+    response.raw = io.BytesIO(content)
+    mocker.patch('requests.Session.get', return_value=response)
+
+    with zip_cache.open(ZIP_URL) as f:
+        assert f.read(1024) == content[:1024]
+
+    [zip_name] = os.listdir(zip_cache.objects_dir)
+    assert read_zip(os.path.join(zip_cache.objects_dir, zip_name)) == content
+
+
+def test_open_does_not_cache_on_error(mocker, zip_cache):
+    response = mocker.MagicMock(status_code=200, headers={})
+    response.raw = io.BytesIO(read_zip())
+    mocker.patch('requests.Session.get', return_value=response)
+
+    with pytest.raises(ValueError):
+        with zip_cache.open(ZIP_URL) as f:
+            f.read(1024)
+            raise ValueError
+
+    assert os.listdir(zip_cache.objects_dir) == []
+
+
+def test_unzip_url_through_cache(mocker, zip_cache, mock_get, tmpdir):
+    mock_prompt_and_delete = mocker.patch(
+        'cookiecutter.zipfile.prompt_and_delete',
+        autospec=True
+    )
+
+    for i in range(2):
+        output_dir = zipfile.unzip(
+            ZIP_URL,
+            is_url=True,
+            clone_to_dir=str(tmpdir.mkdir('clone-{}'.format(i))),
+            zip_cache=zip_cache
+        )
+        assert output_dir.startswith(tempfile.gettempdir())
+        assert os.path.isfile(os.path.join(output_dir, 'cookiecutter.json'))
+
+    assert not mock_prompt_and_delete.called
+    assert mock_get.call_count == 2
+
+
+def test_get_zip_cache(tmpdir):
+    config_dict = dict(config.DEFAULT_CONFIG, cache_dir=str(tmpdir))
+
+    assert zipfile.get_zip_cache(config_dict) is None
+
+    config_dict['zip_cache'] = True
+    zip_cache = zipfile.get_zip_cache(config_dict)
+    assert zip_cache.directory == str(tmpdir.join('zip'))
+    assert zip_cache.max_size == 256 * 1024 * 1024